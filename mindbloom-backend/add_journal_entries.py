@@ -1,6 +1,7 @@
 import asyncio
 import random
 from datetime import datetime, timedelta
+from pymongo.errors import BulkWriteError
 from database import Database, Collections
 
 # Sample journal entry templates
@@ -55,7 +56,7 @@ async def add_journal_entries():
         print("❌ No patients found in database")
         return
     
-    entries_added = 0
+    entries = []
     
     for patient in patients:
         patient_id = str(patient['_id'])
@@ -101,11 +102,16 @@ async def add_journal_entries():
                 "updated_at": entry_date
             }
             
-            try:
-                await db[Collections.JOURNALS].insert_one(journal_entry)
-                entries_added += 1
-            except Exception as e:
-                print(f"⚠️ Error adding entry for {patient_name}: {e}")
+            entries.append(journal_entry)
+    
+    # One unordered insert for all patients; a failing entry does not stop the others
+    entries_added = len(entries)
+    try:
+        await db[Collections.JOURNALS].insert_many(entries, ordered=False)
+    except BulkWriteError as e:
+        entries_added = e.details.get("nInserted", 0)
+        for error in e.details.get("writeErrors", []):
+            print(f"⚠️ Error adding entry {error['index']}: {error.get('errmsg')}")
     
     print(f"✅ Successfully added {entries_added} journal entries!")
     print(f"📊 Added entries for {len(patients)} patients")
@@ -1,5 +1,6 @@
 import asyncio
 from database import Database, Collections
+from services.bulk_writes import bulk_write_items
 from datetime import datetime, timedelta
 import random
 
@@ -223,19 +224,16 @@ async def add_more_memories():
         }
     ]
     
-    # Add memories to database
-    for memory in sample_memories:
-        memory["id"] = str(memory["_id"]) if "_id" in memory else None
-        memory["updated_at"] = memory["created_at"]
-        
-        # Remove _id if it exists (let MongoDB generate it)
-        if "_id" in memory:
-            del memory["_id"]
-        
-        result = await db[Collections.MEMORIES].insert_one(memory)
-        print(f"✅ Added memory: {memory['title']} for patient {memory['patient_id']}")
+    # Add memories in one bulk write; re-running the script skips memories that already exist
+    result = await bulk_write_items(db, Collections.MEMORIES, sample_memories)
+    for outcome in result["results"]:
+        memory = sample_memories[outcome["index"]]
+        if outcome["status"] == "created":
+            print(f"✅ Added memory: {memory['title']} for patient {memory['patient_id']}")
+        else:
+            print(f"ℹ️ Skipped memory: {memory['title']} ({outcome['status']}: {outcome.get('error')})")
     
-    print(f"\n🎉 Successfully added {len(sample_memories)} memories to the database!")
+    print(f"\n🎉 Successfully added {result['created']} memories to the database!")
     
     # Check total memories now
     total_memories = await db[Collections.MEMORIES].count_documents({})
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Compare the database indexes with the index manifest in indexes.py.
+
+Reports missing, extra, unused ($indexStats) and redundant (prefix-covered)
+indexes. --apply creates missing indexes; --drop removes the extra
+indexes listed in RETIRED_INDEXES. Other extras, such as indexes the
+server creates for time-series collections or ones added by hand, are
+only reported.
+"""
+
+import argparse
+import asyncio
+import json
+
+from database import Database
+from indexes import RETIRED_INDEXES, check_index_drift, drop_retired_indexes, ensure_indexes
+
+async def main(apply: bool, drop: bool):
+    await Database.connect_db()
+    try:
+        db = Database.get_db()
+        report = await check_index_drift(db)
+        
+        for category in ("missing", "extra", "unused", "redundant"):
+            print(f"{category:10}: {len(report[category])}")
+        print(json.dumps(report, indent=2, default=str))
+        
+        if apply and report["missing"]:
+            print("🔧 Creating missing indexes...")
+            await ensure_indexes(db)
+        if drop:
+            for name in await drop_retired_indexes(db):
+                print(f"🗑️ Dropped retired index {name}")
+            for index in report["extra"]:
+                if index["name"] not in RETIRED_INDEXES.get(index["collection"], []):
+                    print(f"ℹ️ Kept {index['collection']}.{index['name']} (not in the manifest and not retired)")
+        
+        if not any(report.values()):
+            print("✅ Indexes match the manifest")
+    finally:
+        await Database.close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check database indexes against the manifest")
+    parser.add_argument("--apply", action="store_true", help="Create missing indexes")
+    parser.add_argument("--drop", action="store_true", help="Drop retired indexes (see RETIRED_INDEXES)")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.apply, args.drop))
@@ -1,13 +1,152 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional
+from pymongo import monitoring
+from collections import deque
+from typing import Dict, List, Optional
+import importlib.util
+import threading
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Connection pool configuration (size it for uvicorn workers x concurrent requests)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "0")) or None
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "zstd,snappy,zlib")
+
+# Python packages each wire compressor needs (zlib is built in)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+WAIT_SAMPLE_SIZE = 1000  # Recent checkout waits kept for percentiles
+
+
+def available_compressors(configured: str = MONGODB_COMPRESSORS) -> List[str]:
+    """Configured compressors whose library is installed, in preference order"""
+    compressors = []
+    for name in (c.strip() for c in configured.split(",") if c.strip()):
+        if name not in COMPRESSOR_MODULES:
+            print(f"Warning: unknown MongoDB compressor '{name}'")
+        elif COMPRESSOR_MODULES[name] is None or importlib.util.find_spec(COMPRESSOR_MODULES[name]):
+            compressors.append(name)
+    return compressors
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool statistics per server.
+
+    pymongo calls listeners from its own threads, so counters are guarded
+    by a lock. Checkout wait times come from the checked-out and
+    check-out-failed events.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pools: Dict[str, Dict] = {}
+        self.waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    @staticmethod
+    def _key(address) -> str:
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+    def _pool(self, address) -> Dict:
+        key = self._key(address)
+        if key not in self.pools:
+            self.pools[key] = {
+                "open": 0, "checked_out": 0, "checkouts": 0, "checkout_failures": 0,
+                "wait_total_ms": 0.0, "wait_max_ms": 0.0, "cleared": 0,
+            }
+        return self.pools[key]
+
+    def _record_wait(self, pool: Dict, event):
+        duration = getattr(event, "duration", None)  # Seconds, reported by pymongo 4.7+
+        if duration is None:
+            return
+        wait_ms = duration * 1000.0
+        pool["wait_total_ms"] += wait_ms
+        pool["wait_max_ms"] = max(pool["wait_max_ms"], wait_ms)
+        self.waits.append(wait_ms)
+
+    def pool_created(self, event):
+        with self.lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self.lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        with self.lock:
+            self.pools.pop(self._key(event.address), None)
+
+    def connection_created(self, event):
+        with self.lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self.lock:
+            pool = self._pool(event.address)
+            pool["open"] = max(0, pool["open"] - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            pool = self._pool(event.address)
+            pool["checkout_failures"] += 1
+            self._record_wait(pool, event)
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] += 1
+            pool["checkouts"] += 1
+            self._record_wait(pool, event)
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] = max(0, pool["checked_out"] - 1)
+
+    def snapshot(self) -> Dict:
+        """Current pool state for the health endpoint"""
+        with self.lock:
+            servers = {}
+            for address, pool in self.pools.items():
+                servers[address] = {
+                    **pool,
+                    "available": max(0, pool["open"] - pool["checked_out"]),
+                    "wait_avg_ms": round(pool["wait_total_ms"] / pool["checkouts"], 3) if pool["checkouts"] else 0.0,
+                    "wait_total_ms": round(pool["wait_total_ms"], 1),
+                    "wait_max_ms": round(pool["wait_max_ms"], 3),
+                }
+            waits = sorted(self.waits)
+
+        def percentile(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))], 3) if waits else 0.0
+
+        return {
+            "max_pool_size": MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": MONGODB_MIN_POOL_SIZE,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_p99_ms": percentile(0.99),
+            "servers": servers,
+        }
+
+
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     database: Optional[AsyncIOMotorDatabase] = None
+    pool_metrics = PoolMetrics()
 
     @classmethod
     async def connect_db(cls):
@@ -19,10 +158,22 @@ class Database:
         )
         
         # Add SSL configuration to handle certificate issues
+        options = {
+            "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        }
+        compressors = available_compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        
         cls.client = AsyncIOMotorClient(
             mongodb_url,
             tlsAllowInvalidCertificates=True,
-            tlsAllowInvalidHostnames=True
+            tlsAllowInvalidHostnames=True,
+            event_listeners=[cls.pool_metrics],
+            **options
         )
         cls.database = cls.client.mindbloom_db
         
@@ -56,55 +207,25 @@ class Collections:
     MEMORIES = "memories"
     CALENDAR = "calendar"
     MEDIA = "media"
+    MEDIA_BLOBS = "media_blobs"
+    MEDIA_ANALYSIS_BATCHES = "media_analysis_batches"
+    MEDIA_RESCORE_JOBS = "media_rescore_jobs"
     INTERVIEWS = "interviews"
     INTERVIEW_FLOWS = "interview_flows"
+    INTERVIEW_CONTEXTS = "interview_contexts"
+    COGNITIVE_SCORES = "cognitive_scores"
+    COGNITIVE_SCORE_ROLLUPS = "cognitive_score_rollups"
     AI_CHAT = "ai_chat"
     AI_TRAINING = "ai_training"
     PATIENTS = "patients"
     CAREGIVERS = "caregivers"
+    MIGRATIONS = "_migrations"
+    CHANGE_STREAM_TOKENS = "change_stream_tokens"
 
 # Initialize database connection
 async def init_database():
+    """Connect and ping only; indexes and data changes are applied by migrations.py"""
     await Database.connect_db()
-    await create_indexes()
-
-async def create_indexes():
-    """Create database indexes for better performance."""
-    try:
-        db = Database.get_db()
-        
-        # Users collection indexes
-        await db[Collections.USERS].create_index("auth0_id", unique=True)
-        await db[Collections.USERS].create_index("email")
-        
-        # Journals collection indexes
-        await db[Collections.JOURNALS].create_index("user_id")
-        await db[Collections.JOURNALS].create_index("created_at")
-        await db[Collections.JOURNALS].create_index("mood")
-        
-        # Memories collection indexes
-        await db[Collections.MEMORIES].create_index("user_id")
-        await db[Collections.MEMORIES].create_index("created_at")
-        await db[Collections.MEMORIES].create_index("category")
-        
-        # Calendar collection indexes
-        await db[Collections.CALENDAR].create_index("user_id")
-        await db[Collections.CALENDAR].create_index("date")
-        await db[Collections.CALENDAR].create_index("event_type")
-        
-        # Interviews collection indexes
-        await db[Collections.INTERVIEWS].create_index("patient_id")
-        await db[Collections.INTERVIEWS].create_index("status")
-        await db[Collections.INTERVIEWS].create_index("created_at")
-        
-        # AI Chat collection indexes
-        await db[Collections.AI_CHAT].create_index("user_id")
-        await db[Collections.AI_CHAT].create_index("created_at")
-        
-        print("✅ Database indexes created successfully!")
-    except Exception as e:
-        print(f"⚠️ Could not create database indexes: {e}")
-        print("⚠️ Continuing without indexes...")
 
 async def migrate_existing_data():
     """Migrate existing JSON data to MongoDB (only if collections are empty)."""
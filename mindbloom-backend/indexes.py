@@ -0,0 +1,204 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database import Collections
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """One index the application relies on, and the query it serves"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    serves: str
+    unique: bool = False
+    options: Dict = field(default_factory=dict, hash=False, compare=False)
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{k}_{d}" for k, d in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique, **self.options)
+
+
+def _spec(collection: str, *keys, serves: str, unique: bool = False, **options) -> IndexSpec:
+    normalized = tuple((k, ASCENDING) if isinstance(k, str) else k for k in keys)
+    return IndexSpec(collection, normalized, serves, unique, options)
+
+
+def _newest_first(collection: str, *prefix, serves: str, sort_field: str = "created_at") -> IndexSpec:
+    """Index matching pagination.fetch_page: equality prefix, then (sort_field, _id) descending"""
+    return _spec(collection, *prefix, (sort_field, DESCENDING), ("_id", DESCENDING), serves=serves)
+
+
+# Every index the code needs, next to the access path it exists for.
+# Single-field indexes that are a prefix of a compound index are left out on purpose.
+INDEX_MANIFEST: List[IndexSpec] = [
+    # Users
+    _spec(Collections.USERS, "auth0_id", unique=True, serves="auth lookups by auth0_id"),
+    _spec(Collections.USERS, "email", serves="duplicate check on POST /api/users"),
+    _spec(Collections.USERS, "id", serves="GET /api/users/{id}"),
+    _newest_first(Collections.USERS, serves="paginated user listing"),
+
+    # Journals
+    _spec(Collections.JOURNALS, "id", serves="main.py journal CRUD by id"),
+    _newest_first(Collections.JOURNALS, "user_id", serves="paginated journal listing per user"),
+    _newest_first(Collections.JOURNALS, "patient_id", serves="paginated journal listing per patient"),
+    _newest_first(Collections.JOURNALS, serves="unfiltered journal listing"),
+    _spec(Collections.JOURNALS, "mood", serves="mood filters"),
+
+    # Memories
+    _spec(Collections.MEMORIES, "id", serves="main.py memory CRUD by id"),
+    _newest_first(Collections.MEMORIES, "user_id", serves="GET /api/memories?user_id"),
+    _newest_first(Collections.MEMORIES, "patient_id",
+                  serves="GET /api/memories?patient_id and find_relevant_memories"),
+    _newest_first(Collections.MEMORIES, serves="unfiltered memory listing"),
+    _spec(Collections.MEMORIES, "category", serves="category filters"),
+
+    # Calendar
+    _spec(Collections.CALENDAR, "id", serves="main.py calendar CRUD by id"),
+    _spec(Collections.CALENDAR, "user_id", "date", "start_time",
+          serves="calendar listing and overdue events per user, by date and time"),
+    _spec(Collections.CALENDAR, "patient_id", "date", serves="GET /api/calendar?patient_id&date"),
+    _newest_first(Collections.CALENDAR, "user_id", serves="GET /api/calendar?user_id"),
+    _newest_first(Collections.CALENDAR, "patient_id", serves="GET /api/calendar?patient_id"),
+    _newest_first(Collections.CALENDAR, serves="unfiltered calendar listing"),
+    _spec(Collections.CALENDAR, "event_type", serves="event type filters"),
+
+    # Interviews
+    _spec(Collections.INTERVIEWS, "id", serves="ribbon interview lookups by id"),
+    _newest_first(Collections.INTERVIEWS, "patient_id", serves="interview listing and counts per patient"),
+    _newest_first(Collections.INTERVIEWS, "created_by", serves="interviews per creator"),
+    _newest_first(Collections.INTERVIEWS, serves="unfiltered interview listing"),
+    _spec(Collections.INTERVIEWS, "status", serves="status filters"),
+    _newest_first(Collections.INTERVIEW_FLOWS, "created_by", serves="flows per creator"),
+
+    # Patients and caregivers
+    _spec(Collections.PATIENTS, "id", serves="GET /api/patients/{id}"),
+    _newest_first(Collections.PATIENTS, "caregiver_id", serves="patients per caregiver"),
+    _newest_first(Collections.PATIENTS, serves="unfiltered patient listing"),
+    _spec(Collections.CAREGIVERS, "id", serves="GET /api/caregivers/{id}"),
+    _newest_first(Collections.CAREGIVERS, serves="caregiver listing"),
+
+    # AI chat history is sorted on timestamp
+    _newest_first(Collections.AI_CHAT, "user_id", sort_field="timestamp", serves="chat history per user"),
+    _newest_first(Collections.AI_CHAT, "patient_id", sort_field="timestamp", serves="chat history per patient"),
+    _newest_first(Collections.AI_CHAT, sort_field="timestamp", serves="unfiltered chat history"),
+
+    # Media
+    _spec(Collections.MEDIA, "user_id", ("created_at", DESCENDING), ("_id", DESCENDING),
+          serves="paginated media listing"),
+    _spec(Collections.MEDIA, "user_id", "sha256", serves="per-user duplicate detection"),
+    _spec(Collections.MEDIA, "sha256", serves="blob reference fan-out and rescoring"),
+    _spec(Collections.MEDIA, "analysis_status", serves="pending uploads picked up by the analysis sweeper"),
+    _spec(Collections.MEDIA_BLOBS, "analysis_status", serves="image analysis claims and sweeps"),
+    _spec(Collections.MEDIA_ANALYSIS_BATCHES, "user_id", serves="reanalysis batches per user"),
+    _spec(Collections.MEDIA_ANALYSIS_BATCHES, "status", serves="interrupted batch sweep"),
+
+    # Cognitive score series
+    _spec(Collections.COGNITIVE_SCORES, "meta.patient_id", "timestamp", serves="raw trend points"),
+    _spec(Collections.COGNITIVE_SCORE_ROLLUPS, "patient_id", "granularity", "period_start", unique=True,
+          serves="rollup upserts and trend reads"),
+]
+
+
+# Indexes the pre-manifest create_indexes() built that a manifest entry now covers,
+# dropped by the manifest migration once the replacement exists
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    Collections.JOURNALS: ["user_id_1", "created_at_1"],
+    Collections.MEMORIES: ["user_id_1", "created_at_1"],
+    Collections.CALENDAR: ["user_id_1"],
+    Collections.INTERVIEWS: ["patient_id_1", "created_at_1"],
+    Collections.AI_CHAT: ["user_id_1", "created_at_1"],  # Chat history sorts on timestamp
+}
+
+
+APP_COLLECTIONS = {value for name, value in vars(Collections).items() if name.isupper()}
+
+
+def manifest_by_collection(manifest: List[IndexSpec] = INDEX_MANIFEST) -> Dict[str, List[IndexSpec]]:
+    grouped: Dict[str, List[IndexSpec]] = {}
+    for spec in manifest:
+        grouped.setdefault(spec.collection, []).append(spec)
+    return grouped
+
+
+async def ensure_indexes(db, manifest: List[IndexSpec] = INDEX_MANIFEST) -> Dict[str, List[str]]:
+    """Create all manifest indexes, one createIndexes command per collection"""
+    created = {}
+    for collection, specs in manifest_by_collection(manifest).items():
+        created[collection] = await db[collection].create_indexes([spec.model() for spec in specs])
+    return created
+
+
+async def drop_retired_indexes(db, retired: Dict[str, List[str]] = RETIRED_INDEXES) -> List[str]:
+    """Drop retired indexes that still exist; returns collection.name of each one dropped"""
+    dropped = []
+    for collection, names in retired.items():
+        existing = {ix["name"] async for ix in db[collection].list_indexes()}
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
+                dropped.append(f"{collection}.{name}")
+    return dropped
+
+
+def _key_tuple(index: Dict) -> Tuple[Tuple[str, int], ...]:
+    return tuple((k, int(v)) if isinstance(v, (int, float)) else (k, v) for k, v in index["key"].items())
+
+
+async def check_index_drift(db, manifest: List[IndexSpec] = INDEX_MANIFEST) -> Dict:
+    """
+    Compare the manifest with the indexes that exist.
+
+    missing    in the manifest but not in the database
+    extra      in the database but not in the manifest
+    unused     no recorded accesses in $indexStats since the server started tracking
+    redundant  key pattern is a prefix of another index on the same collection
+    """
+    report = {"missing": [], "extra": [], "unused": [], "redundant": []}
+    grouped = manifest_by_collection(manifest)
+    existing_collections = set(await db.list_collection_names())
+
+    for collection in sorted(set(grouped) | (existing_collections & APP_COLLECTIONS)):
+        specs = grouped.get(collection, [])
+        if collection not in existing_collections:
+            report["missing"].extend({"collection": collection, "name": s.name, "serves": s.serves} for s in specs)
+            continue
+
+        indexes = [ix async for ix in db[collection].list_indexes()]
+        existing = {_key_tuple(ix): ix for ix in indexes if ix["name"] != "_id_"}
+        wanted = {spec.keys: spec for spec in specs}
+
+        for keys, spec in wanted.items():
+            if keys not in existing:
+                report["missing"].append({"collection": collection, "name": spec.name, "serves": spec.serves})
+        for keys, ix in existing.items():
+            if keys not in wanted:
+                report["extra"].append({"collection": collection, "name": ix["name"]})
+
+        # Prefix redundancy: {a: 1} is covered by {a: 1, b: 1} unless it enforces uniqueness
+        for keys, ix in existing.items():
+            if ix.get("unique"):
+                continue
+            for other in existing:
+                if other != keys and other[:len(keys)] == keys:
+                    report["redundant"].append({
+                        "collection": collection, "name": ix["name"], "covered_by": existing[other]["name"]
+                    })
+                    break
+
+        try:
+            async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats.get("accesses", {}).get("ops", 0) == 0:
+                    report["unused"].append({
+                        "collection": collection,
+                        "name": stats["name"],
+                        "since": stats.get("accesses", {}).get("since"),
+                    })
+        except Exception as e:
+            print(f"⚠️ $indexStats unavailable for {collection}: {e}")
+
+    return report
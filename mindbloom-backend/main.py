@@ -16,7 +16,20 @@ load_dotenv()
 
 # Import database and routers
 from database import Database, Collections, init_database
+from pagination import parse_fields, fetch_listing, listing_response
 from routers import interview_analysis, ai_training
+from services.media_analysis import image_analysis_pipeline
+from services.thumbnails import thumbnail_service
+from services.transcription import transcription_pool
+from services.audio_decoding import audio_frontend
+from services.change_events import change_event_bus
+from services.bulk_writes import (
+    bulk_write_items, journal_document, memory_document, calendar_document, BULK_MAX_ITEMS
+)
+from migrations import (
+    run_required_migrations, start_background_migrations, stop_background_migrations,
+    migration_status, MIGRATIONS_ON_STARTUP
+)
 
 # Create data directory if it doesn't exist (for uploads)
 data_dir = Path("data")
@@ -57,15 +70,31 @@ async def startup_event():
     """Initialize database on startup."""
     try:
         await init_database()
-        print("🚀 MindBloom API started successfully!")
     except Exception as e:
         print(f"❌ Failed to initialize database: {e}")
         print("⚠️ Continuing with limited functionality...")
+        return
+    
+    if MIGRATIONS_ON_STARTUP != "off":
+        # The cognitive_scores time-series collection must exist before anything records a score,
+        # so a failure here stops the worker instead of serving without it
+        await run_required_migrations(Database.get_db())
+    start_background_migrations()
+    change_event_bus.start()
+    # The pipeline's sweeper claims jobs left unfinished by earlier processes
+    image_analysis_pipeline.start()
+    print("🚀 MindBloom API started successfully!")
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown."""
+    await stop_background_migrations()
+    await change_event_bus.stop()
+    await image_analysis_pipeline.stop()
+    thumbnail_service.shutdown()
+    transcription_pool.shutdown()
+    audio_frontend.shutdown()
     await Database.close_db()
 
 # Helper functions for file operations (for uploads)
@@ -317,6 +346,24 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "MindBloom API"}
 
+@app.get("/health/db-pool")
+async def db_pool_stats():
+    """MongoDB connection pool usage of this worker"""
+    return Database.pool_metrics.snapshot()
+
+@app.get("/health/change-streams")
+async def change_stream_stats():
+    """State of this worker's cache invalidation bus"""
+    return change_event_bus.snapshot()
+
+@app.get("/health/migrations")
+async def migrations_health():
+    """Applied and pending schema/index migrations"""
+    try:
+        return await migration_status(Database.get_db())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read migration status: {str(e)}")
+
 @app.get("/api/test/journals")
 async def test_journals():
     """Test endpoint to check journal data without authentication"""
@@ -383,10 +430,12 @@ async def create_user(user_data: dict):
     return user
 
 @app.get("/api/users")
-async def get_users():
+async def get_users(limit: int = None, cursor: str = None):
     db = Database.get_db()
-    users = await db[Collections.USERS].find({}).to_list(length=100)
-    return users
+    users, next_cursor, paged = await fetch_listing(db[Collections.USERS], {}, limit, cursor)
+    for user in users:
+        user["_id"] = str(user["_id"])
+    return listing_response(users, next_cursor, paged)
 
 @app.get("/api/users/{user_id}")
 async def get_user(user_id: str):
@@ -396,41 +445,64 @@ async def get_user(user_id: str):
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+# Bulk writes for imports and scripts
+async def _bulk_write(collection: str, bulk_data: dict, label: str):
+    items = bulk_data.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    
+    try:
+        return await bulk_write_items(
+            Database.get_db(), collection, items, upsert=bool(bulk_data.get("upsert", False))
+        )
+    except Exception as e:
+        print(f"Error in bulk {label} write: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to write {label}: {str(e)}")
+
 # Journal endpoints with MongoDB
+JOURNAL_FIELDS = {
+    "id", "user_id", "patient_id", "title", "content", "mood", "tags", "media_urls",
+    "location", "people", "is_pinned", "created_at", "updated_at"
+}
+JOURNAL_SUMMARY_FIELDS = [
+    "id", "user_id", "patient_id", "title", "content", "mood", "tags", "is_pinned", "created_at"
+]
+
 @app.post("/api/journal")
 async def create_journal_entry(entry_data: dict):
     db = Database.get_db()
     
-    entry = {
-        "id": str(ObjectId()),
-        "user_id": entry_data.get("user_id", "1"),
-        "title": entry_data.get("title", ""),
-        "content": entry_data.get("content", ""),
-        "mood": entry_data.get("mood", "neutral"),
-        "tags": entry_data.get("tags", []),
-        "media_urls": entry_data.get("media_urls", []),
-        "location": entry_data.get("location"),
-        "people": entry_data.get("people", []),
-        "is_pinned": entry_data.get("is_pinned", False),
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat()
-    }
+    entry = journal_document(entry_data, str(ObjectId()), datetime.utcnow().isoformat())
     
     result = await db[Collections.JOURNALS].insert_one(entry)
     entry["_id"] = str(result.inserted_id)
     
     return entry
 
+@app.post("/api/journal/bulk")
+async def bulk_create_journal_entries(bulk_data: dict):
+    """
+    Create (or with upsert=true update) journal entries keyed by user_id, title and created_at.
+    
+    Entries without created_at have no key and are always created.
+    """
+    return await _bulk_write(Collections.JOURNALS, bulk_data, "journal entries")
+
 @app.get("/api/journal")
-async def get_journal_entries(user_id: str = None):
+async def get_journal_entries(user_id: str = None, fields: str = None,
+                              limit: int = None, cursor: str = None):
+    """Page of journal entries, newest first; fields= picks the returned fields (default: summary, * for all)"""
     db = Database.get_db()
+    projection = parse_fields(fields, JOURNAL_FIELDS, default=JOURNAL_SUMMARY_FIELDS)
     
-    if user_id:
-        journals = await db[Collections.JOURNALS].find({"user_id": user_id}).to_list(length=100)
-    else:
-        journals = await db[Collections.JOURNALS].find({}).to_list(length=100)
+    filter_query = {"user_id": user_id} if user_id else {}
+    journals, next_cursor, paged = await fetch_listing(db[Collections.JOURNALS], filter_query, limit, cursor, projection)
+    for journal in journals:
+        journal["_id"] = str(journal["_id"])
     
-    return journals
+    return listing_response(journals, next_cursor, paged)
 
 @app.get("/api/journal/{journal_id}")
 async def get_journal_entry(journal_id: str):
@@ -481,6 +553,17 @@ async def delete_journal_entry(journal_id: str):
     return {"message": "Journal entry deleted successfully"}
 
 # Memory endpoints with MongoDB and AI visualization
+# visualization and interview_data are large and only needed on detail views
+MEMORY_FIELDS = {
+    "id", "user_id", "patient_id", "title", "description", "content", "category", "type",
+    "importance", "mood", "tags", "date", "is_pinned", "source", "created_at", "updated_at",
+    "visualization", "interview_data"
+}
+MEMORY_SUMMARY_FIELDS = [
+    "id", "user_id", "patient_id", "title", "description", "content", "category", "type",
+    "importance", "mood", "tags", "date", "is_pinned", "source", "created_at"
+]
+
 @app.post("/api/memories")
 async def create_memory(memory_data: dict):
     try:
@@ -488,19 +571,7 @@ async def create_memory(memory_data: dict):
         if db is None:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
-        memory = {
-            "id": str(ObjectId()),
-            "user_id": memory_data.get("user_id", "1"),
-            "title": memory_data.get("title", ""),
-            "description": memory_data.get("description", ""),
-            "category": memory_data.get("category", "general"),
-            "importance": memory_data.get("importance", "medium"),
-            "mood": memory_data.get("mood", "neutral"),
-            "tags": memory_data.get("tags", []),
-            "patient_id": memory_data.get("patient_id"),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
+        memory = memory_document(memory_data, str(ObjectId()), datetime.utcnow().isoformat())
         
         # Generate AI visualization for the memory
         try:
@@ -527,26 +598,41 @@ async def create_memory(memory_data: dict):
         print(f"Error in create_memory: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create memory: {str(e)}")
 
+@app.post("/api/memories/bulk")
+async def bulk_create_memories(bulk_data: dict):
+    """
+    Create (or with upsert=true update) memories keyed by user_id, title and created_at.
+    Memories without created_at have no key and are always created.
+    
+    Visualizations are not generated here; GET /api/memories/{id}/visualization builds them on demand.
+    """
+    return await _bulk_write(Collections.MEMORIES, bulk_data, "memories")
+
 @app.get("/api/memories")
-async def get_memories(user_id: str = None, patient_id: str = None):
+async def get_memories(user_id: str = None, patient_id: str = None, fields: str = None,
+                       limit: int = None, cursor: str = None):
+    """Page of memories, newest first; fields= picks the returned fields (default: summary, * for all)"""
     try:
         db = Database.get_db()
         if db is None:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
+        projection = parse_fields(fields, MEMORY_FIELDS, default=MEMORY_SUMMARY_FIELDS)
         filter_query = {}
         if user_id:
             filter_query["user_id"] = user_id
         if patient_id:
             filter_query["patient_id"] = patient_id
         
-        memories = await db[Collections.MEMORIES].find(filter_query).to_list(length=100)
+        memories, next_cursor, paged = await fetch_listing(db[Collections.MEMORIES], filter_query, limit, cursor, projection)
         
         # Convert ObjectId to string for JSON serialization
         for memory in memories:
             memory["_id"] = str(memory["_id"])
         
-        return memories
+        return listing_response(memories, next_cursor, paged)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_memories: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to load memories: {str(e)}")
@@ -680,39 +766,41 @@ async def get_memory_visualization(memory_id: str, fresh: bool = False):
         raise HTTPException(status_code=500, detail=f"Failed to generate visualization: {str(e)}")
 
 # Calendar endpoints with MongoDB
+CALENDAR_FIELDS = {
+    "id", "user_id", "patient_id", "title", "description", "date", "start_time", "end_time",
+    "event_type", "priority", "completed", "recurring", "reminders", "created_at", "updated_at"
+}
+CALENDAR_SUMMARY_FIELDS = [
+    "id", "user_id", "patient_id", "title", "description", "date", "start_time", "end_time",
+    "event_type", "priority", "completed", "recurring"
+]
+
 @app.post("/api/calendar")
 async def create_calendar_event(event_data: dict):
     db = Database.get_db()
     
-    event = {
-        "id": str(ObjectId()),
-        "user_id": event_data.get("user_id", "1"),
-        "title": event_data.get("title", ""),
-        "description": event_data.get("description", ""),
-        "date": event_data.get("date", ""),
-        "start_time": event_data.get("start_time", ""),
-        "end_time": event_data.get("end_time", ""),
-        "event_type": event_data.get("event_type", "activity"),
-        "priority": event_data.get("priority", "medium"),
-        "completed": event_data.get("completed", False),
-        "patient_id": event_data.get("patient_id"),
-        "reminders": event_data.get("reminders", []),
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat()
-    }
+    event = calendar_document(event_data, str(ObjectId()), datetime.utcnow().isoformat())
     
     result = await db[Collections.CALENDAR].insert_one(event)
     event["_id"] = str(result.inserted_id)
     
     return event
 
+@app.post("/api/calendar/bulk")
+async def bulk_create_calendar_events(bulk_data: dict):
+    """Create (or with upsert=true update) calendar events keyed by user_id, title and date"""
+    return await _bulk_write(Collections.CALENDAR, bulk_data, "calendar events")
+
 @app.get("/api/calendar")
-async def get_calendar_events(user_id: str = None, patient_id: str = None, date: str = None):
+async def get_calendar_events(user_id: str = None, patient_id: str = None, date: str = None,
+                              fields: str = None, limit: int = None, cursor: str = None):
+    """Page of calendar events, newest first; fields= picks the returned fields (default: summary, * for all)"""
     try:
         db = Database.get_db()
         if db is None:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
+        projection = parse_fields(fields, CALENDAR_FIELDS, default=CALENDAR_SUMMARY_FIELDS)
         filter_query = {}
         if user_id:
             filter_query["user_id"] = user_id
@@ -721,13 +809,15 @@ async def get_calendar_events(user_id: str = None, patient_id: str = None, date:
         if date:
             filter_query["date"] = date
         
-        events = await db[Collections.CALENDAR].find(filter_query).to_list(length=100)
+        events, next_cursor, paged = await fetch_listing(db[Collections.CALENDAR], filter_query, limit, cursor, projection)
         
         # Convert ObjectId to string for JSON serialization
         for event in events:
             event["_id"] = str(event["_id"])
         
-        return events
+        return listing_response(events, next_cursor, paged)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_calendar_events: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to load calendar events: {str(e)}")
@@ -838,7 +928,8 @@ async def chat_with_ai(chat_data: dict):
     }
 
 @app.get("/api/ai/chat")
-async def get_chat_history(user_id: str = None, patient_id: str = None):
+async def get_chat_history(user_id: str = None, patient_id: str = None,
+                           limit: int = None, cursor: str = None):
     db = Database.get_db()
     
     filter_query = {}
@@ -847,8 +938,12 @@ async def get_chat_history(user_id: str = None, patient_id: str = None):
     if patient_id:
         filter_query["patient_id"] = patient_id
     
-    chat_history = await db[Collections.AI_CHAT].find(filter_query).sort("timestamp", -1).to_list(length=50)
-    return chat_history
+    chat_history, next_cursor, paged = await fetch_listing(
+        db[Collections.AI_CHAT], filter_query, limit, cursor, sort_field="timestamp"
+    )
+    for message in chat_history:
+        message["_id"] = str(message["_id"])
+    return listing_response(chat_history, next_cursor, paged)
 
 # Ribbon interview endpoints with MongoDB
 @app.post("/api/ribbon/memory-interview/{patient_id}")
@@ -890,16 +985,18 @@ async def create_memory_interview(patient_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to create memory interview: {str(e)}")
 
 @app.get("/api/ribbon/interviews")
-async def get_interviews(patient_id: str = None):
-    """Get all interviews"""
+async def get_interviews(patient_id: str = None, limit: int = None, cursor: str = None):
+    """Page of interviews, newest first"""
     db = Database.get_db()
     
     filter_query = {}
     if patient_id:
         filter_query["patient_id"] = patient_id
     
-    interviews = await db[Collections.INTERVIEWS].find(filter_query).sort("created_at", -1).to_list(length=100)
-    return interviews
+    interviews, next_cursor, paged = await fetch_listing(db[Collections.INTERVIEWS], filter_query, limit, cursor)
+    for interview in interviews:
+        interview["_id"] = str(interview["_id"])
+    return listing_response(interviews, next_cursor, paged)
 
 @app.get("/api/ribbon/interviews/{interview_id}")
 async def get_interview(interview_id: str):
@@ -929,15 +1026,17 @@ async def update_interview_status(interview_id: str, status_data: dict):
 
 # Patient and Caregiver endpoints
 @app.get("/api/patients")
-async def get_patients(caregiver_id: str = None):
+async def get_patients(caregiver_id: str = None, limit: int = None, cursor: str = None):
     db = Database.get_db()
     
     filter_query = {}
     if caregiver_id:
         filter_query["caregiver_id"] = caregiver_id
     
-    patients = await db[Collections.PATIENTS].find(filter_query).to_list(length=100)
-    return patients
+    patients, next_cursor, paged = await fetch_listing(db[Collections.PATIENTS], filter_query, limit, cursor)
+    for patient in patients:
+        patient["_id"] = str(patient["_id"])
+    return listing_response(patients, next_cursor, paged)
 
 @app.get("/api/patients/{patient_id}")
 async def get_patient(patient_id: str):
@@ -969,10 +1068,12 @@ async def create_patient(patient_data: dict):
     return patient
 
 @app.get("/api/caregivers")
-async def get_caregivers():
+async def get_caregivers(limit: int = None, cursor: str = None):
     db = Database.get_db()
-    caregivers = await db[Collections.CAREGIVERS].find({}).to_list(length=100)
-    return caregivers
+    caregivers, next_cursor, paged = await fetch_listing(db[Collections.CAREGIVERS], {}, limit, cursor)
+    for caregiver in caregivers:
+        caregiver["_id"] = str(caregiver["_id"])
+    return listing_response(caregivers, next_cursor, paged)
 
 @app.get("/api/caregivers/{caregiver_id}")
 async def get_caregiver(caregiver_id: str):
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema, index and data migrations (see migrations.py).
+
+Run this from a deploy step with MIGRATIONS_ON_STARTUP=off so API workers
+never build indexes themselves. Use --status to list applied and pending
+migrations without changing anything, and --import-json to load the legacy
+JSON files from data/ into an empty database.
+"""
+
+import argparse
+import asyncio
+import json
+
+from database import Database, migrate_existing_data
+from migrations import migration_status, run_migrations
+
+async def main(status_only: bool, target: int, import_json: bool):
+    await Database.connect_db()
+    try:
+        db = Database.get_db()
+        if import_json:
+            await migrate_existing_data()
+        if not status_only:
+            applied = await run_migrations(db, target=target)
+            if not applied:
+                print("✅ No migrations to apply")
+        print(json.dumps(await migration_status(db), indent=2, default=str))
+    finally:
+        await Database.close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending database migrations")
+    parser.add_argument("--status", action="store_true", help="Only show applied and pending migrations")
+    parser.add_argument("--to", type=int, default=None, help="Apply migrations up to this version")
+    parser.add_argument("--import-json", action="store_true", help="Import legacy JSON data if the database is empty")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.status, args.to, args.import_json))
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from database import Database, Collections, migrate_existing_data
+from indexes import ensure_indexes, drop_retired_indexes
+
+# Migration runner configuration
+MIGRATIONS_ON_STARTUP = os.getenv("MIGRATIONS_ON_STARTUP", "background").lower()  # background or off
+MIGRATION_LOCK_SECONDS = int(os.getenv("MIGRATION_LOCK_SECONDS", "600"))
+IMPORT_LEGACY_JSON = os.getenv("IMPORT_LEGACY_JSON", "false").lower() == "true"
+
+LOCK_ID = "lock"
+REQUIRED_BEFORE_SERVING = 1  # Migrations up to this version are applied before requests are served
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema, index or data change, applied once per database"""
+    version: int
+    name: str
+    apply: Callable[[object], Awaitable[None]]
+
+
+async def _create_cognitive_scores(db):
+    # Time-series collections must be created explicitly before anything writes to them
+    existing = await db.list_collections(filter={"name": Collections.COGNITIVE_SCORES}).to_list(length=1)
+    if not existing:
+        await db.create_collection(
+            Collections.COGNITIVE_SCORES,
+            timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "hours"}
+        )
+    elif "timeseries" not in existing[0].get("options", {}):
+        raise RuntimeError(
+            f"{Collections.COGNITIVE_SCORES} exists as a regular collection; rename or drop it "
+            "and rerun migrations so it can be created as a time-series collection"
+        )
+
+
+async def _apply_index_manifest(db):
+    # Build the manifest indexes before dropping the ones they replace
+    await ensure_indexes(db)
+    for name in await drop_retired_indexes(db):
+        print(f"🗑️ Dropped retired index {name}")
+
+
+async def _import_json_data(db):
+    # Opt-in: a fresh database must not pick up whatever JSON files are lying around.
+    # Later imports go through `python migrate.py --import-json`.
+    if IMPORT_LEGACY_JSON:
+        await migrate_existing_data()
+    else:
+        print("ℹ️ Skipping legacy JSON import (IMPORT_LEGACY_JSON is not true)")
+
+
+# Append only; never renumber or edit an applied migration. Index manifest
+# changes ship as a new migration calling ensure_indexes again.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create cognitive_scores time-series collection", _create_cognitive_scores),
+    Migration(2, "apply index manifest", _apply_index_manifest),
+    Migration(3, "import legacy JSON data", _import_json_data),
+]
+
+
+def _collection(db):
+    return db[Collections.MIGRATIONS]
+
+
+async def applied_versions(db) -> Dict[int, Dict]:
+    """Applied migrations by version"""
+    cursor = _collection(db).find({"_id": {"$type": "int"}})
+    return {doc["_id"]: doc async for doc in cursor}
+
+
+async def pending_migrations(db, migrations: List[Migration] = MIGRATIONS) -> List[Migration]:
+    applied = await applied_versions(db)
+    return [m for m in sorted(migrations, key=lambda m: m.version) if m.version not in applied]
+
+
+async def _acquire_lock(db, holder: str) -> bool:
+    """Take or renew the runner lock; a lock left by a crashed runner expires"""
+    now = datetime.utcnow()
+    try:
+        await _collection(db).find_one_and_update(
+            {"_id": LOCK_ID, "$or": [{"holder": holder}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Another runner holds an unexpired lock
+        return False
+
+
+async def _release_lock(db, holder: str):
+    await _collection(db).delete_one({"_id": LOCK_ID, "holder": holder})
+
+
+async def run_migrations(db, target: Optional[int] = None,
+                         migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Apply pending migrations in version order, up to target if given.
+
+    Runs under a lock in the _migrations collection so several workers
+    starting at once apply each migration exactly once. Stops at the first
+    failure; the failed migration stays pending and is retried next run.
+    Returns the versions applied by this call.
+    """
+    pending = [m for m in await pending_migrations(db, migrations) if target is None or m.version <= target]
+    if not pending:
+        return []
+
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    if not await _acquire_lock(db, holder):
+        print("ℹ️ Migrations are being applied by another process")
+        return []
+
+    done = []
+    try:
+        # Re-read under the lock; another runner may have finished in between
+        for migration in await pending_migrations(db, migrations):
+            if target is not None and migration.version > target:
+                break
+            if not await _acquire_lock(db, holder):
+                print("⚠️ Migration lock was taken over by another process; stopping")
+                break
+            print(f"🔧 Applying migration {migration.version}: {migration.name}")
+            started = time.perf_counter()
+            await migration.apply(db)
+            await _collection(db).insert_one({
+                "_id": migration.version,
+                "name": migration.name,
+                "applied_at": datetime.utcnow(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "applied_by": holder,
+            })
+            done.append(migration.version)
+    finally:
+        await _release_lock(db, holder)
+
+    print(f"✅ Applied {len(done)} migration(s)")
+    return done
+
+
+async def migration_status(db, migrations: List[Migration] = MIGRATIONS) -> Dict:
+    applied = await applied_versions(db)
+    lock = await _collection(db).find_one({"_id": LOCK_ID})
+    return {
+        "latest": max((m.version for m in migrations), default=0),
+        "applied": [
+            {"version": v, "name": doc.get("name"), "applied_at": doc.get("applied_at"),
+             "duration_ms": doc.get("duration_ms")}
+            for v, doc in sorted(applied.items())
+        ],
+        "pending": [{"version": m.version, "name": m.name} for m in migrations if m.version not in applied],
+        "locked_by": lock.get("holder") if lock and lock.get("expires_at", datetime.min) > datetime.utcnow() else None,
+    }
+
+
+async def run_required_migrations(db):
+    """
+    Apply the migrations requests depend on before serving.
+
+    If another process holds the lock, waits (up to MIGRATION_LOCK_SECONDS)
+    for it to apply them instead of serving against a missing schema.
+    """
+    required = [m for m in MIGRATIONS if m.version <= REQUIRED_BEFORE_SERVING]
+    deadline = time.monotonic() + MIGRATION_LOCK_SECONDS
+    while await pending_migrations(db, required):
+        if await run_migrations(db, target=REQUIRED_BEFORE_SERVING, migrations=required):
+            continue
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Migrations up to {REQUIRED_BEFORE_SERVING} were not applied in time")
+        await asyncio.sleep(1)
+
+
+_background_task: Optional[asyncio.Task] = None
+
+
+async def _run_in_background():
+    try:
+        await run_migrations(Database.get_db())
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Background migrations failed: {e}")
+
+
+def start_background_migrations() -> Optional[asyncio.Task]:
+    """Apply pending migrations without blocking startup, unless MIGRATIONS_ON_STARTUP=off"""
+    global _background_task
+    if MIGRATIONS_ON_STARTUP == "off" or Database.database is None:
+        return None
+    _background_task = asyncio.create_task(_run_in_background())
+    return _background_task
+
+
+async def stop_background_migrations():
+    if _background_task is not None and not _background_task.done():
+        _background_task.cancel()
+        try:
+            await _background_task
+        except asyncio.CancelledError:
+            pass
@@ -80,4 +80,9 @@ class JournalResponse(BaseModel):
     people: List[str]
     is_pinned: bool
     created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+    updated_at: datetime 
+
+
+class JournalPage(BaseModel):
+    items: List[JournalResponse]
+    next_cursor: Optional[str] = None
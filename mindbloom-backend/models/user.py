@@ -62,4 +62,9 @@ class UserResponse(BaseModel):
     caregiver_id: Optional[str] = None
     patients: List[str] = []
     created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+    updated_at: datetime 
+
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,191 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+# Pagination defaults
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ALL_FIELDS = "*"  # fields=* returns whole documents
+
+# BSON sort order of the value types a cursor can carry (missing sorts as null)
+BSON_TYPE_ORDER = ["null", "number", "string", "objectId", "bool", "date"]
+
+
+def _encode_value(value: Any) -> List:
+    """Tag a cursor value with its type so it round-trips exactly"""
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, ObjectId):
+        return ["oid", str(value)]
+    return ["raw", value]
+
+
+def _decode_value(tagged: List) -> Any:
+    kind, value = tagged
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "oid":
+        return ObjectId(value)
+    return value
+
+
+def encode_cursor(document: Dict, sort_field: str = "created_at") -> str:
+    """Build an opaque cursor pointing just after a document"""
+    payload = [_encode_value(document.get(sort_field)), _encode_value(document["_id"])]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Decode a cursor into its (sort value, _id) pair"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return _decode_value(sort_value), _decode_value(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _bson_type(value: Any) -> Optional[str]:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def keyset_filter(cursor: Optional[str], sort_field: str = "created_at", descending: bool = True) -> Dict:
+    """Query fragment selecting documents after the cursor in (sort_field, _id) order"""
+    if not cursor:
+        return {}
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    clauses = [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, "_id": {op: doc_id}}
+    ]
+
+    # Range operators only compare within one BSON type, but sorting orders the
+    # type groups too; older documents store created_at as ISO strings, newer
+    # ones as dates, so the groups after the cursor's type are matched explicitly
+    kind = _bson_type(sort_value)
+    if kind is not None:
+        rank = BSON_TYPE_ORDER.index(kind)
+        later = BSON_TYPE_ORDER[:rank] if descending else BSON_TYPE_ORDER[rank + 1:]
+        if "null" in later:
+            clauses.append({sort_field: None})
+        other_types = [t for t in later if t != "null"]
+        if other_types:
+            clauses.append({sort_field: {"$type": other_types}})
+    return {"$or": clauses}
+
+
+def keyset_sort(sort_field: str = "created_at", descending: bool = True) -> List[Tuple[str, int]]:
+    direction = -1 if descending else 1
+    return [(sort_field, direction), ("_id", direction)]
+
+
+def merge_filters(*filters: Dict) -> Dict:
+    """AND together query fragments, skipping empty ones"""
+    parts = [f for f in filters if f]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], default: Optional[Iterable[str]] = None,
+                 required: Iterable[str] = ("_id",)) -> Optional[Dict]:
+    """
+    Turn a comma-separated fields= parameter into a Mongo projection.
+
+    Unknown field names are rejected. Returns None (all fields) for fields=*
+    or when neither fields nor a default is given.
+    """
+    allowed = set(allowed)
+    if fields and fields.strip() == ALL_FIELDS:
+        return None
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    elif default is not None:
+        requested = list(default)
+    else:
+        return None
+
+    projection = {f: 1 for f in requested}
+    for f in required:
+        projection[f] = 1
+    return projection
+
+
+async def fetch_page(collection, query: Dict, limit: int, cursor: Optional[str] = None,
+                     projection: Optional[Dict] = None, sort_field: str = "created_at",
+                     descending: bool = True) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one keyset page.
+
+    Reads limit + 1 documents to know whether another page exists, so the
+    cost per page is independent of how deep the client has paged.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if projection is not None:
+        projection = {**projection, sort_field: 1, "_id": 1}
+
+    find_query = merge_filters(query, keyset_filter(cursor, sort_field, descending))
+    docs = await collection.find(find_query, projection) \
+        .sort(keyset_sort(sort_field, descending)) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+
+async def fetch_listing(collection, query: Dict, limit: Optional[int], cursor: Optional[str] = None,
+                        projection: Optional[Dict] = None, sort_field: str = "created_at",
+                        descending: bool = True) -> Tuple[List[Dict], Optional[str], bool]:
+    """
+    Fetch a keyset page, or the whole listing for callers that predate pagination.
+
+    Requests with neither limit nor cursor get every document (read page by
+    page) and paged=False, so the endpoint can keep answering them with the
+    bare list they expect. Returns (documents, next_cursor, paged).
+    """
+    if limit is not None or cursor is not None:
+        docs, next_cursor = await fetch_page(collection, query, limit or DEFAULT_PAGE_SIZE, cursor,
+                                             projection, sort_field, descending)
+        return docs, next_cursor, True
+
+    docs, page_cursor = [], None
+    while True:
+        page, page_cursor = await fetch_page(collection, query, MAX_PAGE_SIZE, page_cursor,
+                                             projection, sort_field, descending)
+        docs.extend(page)
+        if page_cursor is None:
+            return docs, None, False
+
+
+def listing_response(items: List, next_cursor: Optional[str], paged: bool):
+    """{items, next_cursor} for paginated requests, the bare list otherwise"""
+    if paged:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Reconcile the uploads directory with the media collections.
+
+Reports orphaned blobs, stale temporary files and dangling media records.
+Run with --delete to remove orphans and repair refcounts.
+"""
+
+import argparse
+import asyncio
+import json
+
+from database import Database
+from services.media_reconciler import reconcile_media, RECONCILE_BATCH_SIZE, RECONCILE_GRACE_SECONDS
+
+async def main(delete: bool, grace_seconds: int, batch_size: int):
+    await Database.connect_db()
+    try:
+        db = Database.get_db()
+        print(f"🔍 Reconciling media ({'delete' if delete else 'report only'})...")
+        report = await reconcile_media(db, delete=delete, grace_seconds=grace_seconds, batch_size=batch_size)
+        
+        counts = report["counts"]
+        if not counts:
+            print("✅ Uploads and media records are in sync")
+        for category, count in sorted(counts.items()):
+            print(f"{category:20}: {count}")
+        print(json.dumps(report["samples"], indent=2))
+        
+        if counts and not delete:
+            print("ℹ️ Re-run with --delete to apply fixes")
+    finally:
+        await Database.close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile uploaded media with the database")
+    parser.add_argument("--delete", action="store_true", help="Delete orphans and repair refcounts")
+    parser.add_argument("--grace-seconds", type=int, default=RECONCILE_GRACE_SECONDS,
+                        help="Ignore files newer than this (in-flight uploads)")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.delete, args.grace_seconds, args.batch_size))
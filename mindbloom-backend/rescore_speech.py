@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Rescore stored interview recordings with the current speech heuristics.
+
+Decodes every .wav/.mp3 in the media store, extracts acoustic features and
+(optionally) a transcript, and stores the result as speech_analysis on the
+media documents. Interrupted runs resume from the last checkpoint.
+Recordings that failed are skipped until a run with --retry-failed.
+"""
+
+import argparse
+import asyncio
+import json
+
+from database import Database
+from services.speech_rescoring import rescore_recordings, RESCORE_WORKERS, RESCORE_BATCH_SIZE
+from services.transcription import STT_ENGINE, ENGINES
+
+async def main(restart: bool, retry_failed: bool, workers: int, batch_size: int, engine):
+    await Database.connect_db()
+    try:
+        db = Database.get_db()
+        print(f"🎧 Rescoring recordings with {workers} workers (transcription: {engine or 'off'})...")
+        summary = await rescore_recordings(db, restart=restart, retry_failed=retry_failed, workers=workers,
+                                           batch_size=batch_size, engine=engine)
+        print(json.dumps(summary, indent=2))
+    finally:
+        await Database.close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore stored interview recordings")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    parser.add_argument("--retry-failed", action="store_true", help="Also rescore recordings that failed before")
+    parser.add_argument("--workers", type=int, default=RESCORE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=STT_ENGINE,
+                        help="Speech-to-text engine used in the workers")
+    parser.add_argument("--no-transcribe", action="store_true", help="Only score acoustic features")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.restart, args.retry_failed, args.workers, args.batch_size, None if args.no_transcribe else args.engine))
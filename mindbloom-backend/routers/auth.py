@@ -1,14 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Optional, Union
 import jwt
 import os
 from datetime import datetime
 
-from models.user import User, UserCreate, UserUpdate, UserResponse, UserRole
+from models.user import User, UserCreate, UserUpdate, UserResponse, UserRole, UserPage
 from services.auth_service import SimpleAuthService
 from database import Database, Collections
+from pagination import fetch_listing, MAX_PAGE_SIZE
 
 router = APIRouter()
 security = HTTPBearer()
@@ -105,21 +106,25 @@ async def update_user_profile(
     updated_user = await db[Collections.USERS].find_one({"_id": current_user.id})
     return UserResponse(**updated_user)
 
-@router.get("/users", response_model=List[UserResponse])
+@router.get("/users", response_model=Union[UserPage, List[UserResponse]])
 async def get_users(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get all users (admin only)"""
+    """Get a page of users (admin only)"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
+    docs, next_cursor, paged = await fetch_listing(db[Collections.USERS], {}, limit, cursor)
+    
     users = []
-    async for user in db[Collections.USERS].find():
+    for user in docs:
         user["_id"] = str(user["_id"])
         users.append(UserResponse(**user))
     
-    return users
+    return UserPage(items=users, next_cursor=next_cursor) if paged else users
 
 @router.post("/caregiver/assign")
 async def assign_caregiver(
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Dict, Optional
+from datetime import datetime, timedelta
 import json
 from services.interview_analysis import interview_analysis_service
+from services.streaming_session import StreamingTranscriptionSession, check_stream_params, STREAM_SAMPLE_RATE
+from services.interview_context import interview_context_store, CONTEXT_LISTS
+from pagination import encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.cognitive_timeseries import cognitive_score_series, to_naive_utc, GRANULARITY_RAW, GRANULARITY_DAY, GRANULARITY_WEEK
 
 router = APIRouter(prefix="/api/interview-analysis", tags=["Interview Analysis"])
 
@@ -59,7 +65,8 @@ async def get_interview_summary(patient_id: str):
         if 'error' in summary:
             raise HTTPException(status_code=404, detail=summary['error'])
         
-        return JSONResponse(content=summary)
+        # Recent entries carry datetime timestamps
+        return JSONResponse(content=jsonable_encoder(summary))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Summary generation failed: {str(e)}")
@@ -83,18 +90,114 @@ async def get_real_time_feedback(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Feedback generation failed: {str(e)}")
 
+def project_entry(entry: Dict, fields: Optional[list]) -> Dict:
+    """Keep only the requested (optionally dotted) fields of a context entry"""
+    if not fields:
+        return entry
+    projected = {"seq": entry.get("seq")}
+    for field in fields:
+        source, target = entry, projected
+        parts = field.split(".")
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            target = target.setdefault(part, {})
+        if isinstance(source, dict) and parts[-1] in source:
+            target[parts[-1]] = source[parts[-1]]
+    return projected
+
+def json_default(value):
+    """Entry timestamps are datetimes; send them as ISO strings"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def stream_context_pages(patient_id: str, pages: Dict, fields: Optional[list]):
+    """Encode one entry at a time instead of serializing the whole context at once"""
+    yield json.dumps({"patient_id": patient_id})[:-1] + ', "types": {'
+    for i, (list_name, (entries, next_cursor)) in enumerate(pages.items()):
+        yield ("," if i else "") + json.dumps(list_name) + ': {"items": ['
+        for j, entry in enumerate(entries):
+            yield ("," if j else "") + json.dumps(project_entry(entry, fields), default=json_default)
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + "}"
+    yield "}}"
+
 @router.get("/patient-context/{patient_id}")
-async def get_patient_context(patient_id: str):
+async def get_patient_context(
+    patient_id: str,
+    type: Optional[str] = Query(None, description=f"One of {', '.join(CONTEXT_LISTS)}; all types when omitted"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (requires type)"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma separated entry fields, e.g. timestamp,analysis.word_finding")
+):
     """
-    Get stored context for a patient
+    Get stored context for a patient, newest first.
+    
+    Each sample type is paginated separately with its own cursor; since/until
+    filter on the entry timestamp. The response is streamed entry by entry.
     """
+    if type is not None and type not in CONTEXT_LISTS:
+        raise HTTPException(status_code=400, detail=f"Unknown context type: {type}")
+    if cursor and type is None:
+        raise HTTPException(status_code=400, detail="cursor requires type")
+    before_seq = decode_cursor(cursor)[1] if cursor else None
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    
     try:
-        context = interview_analysis_service.get_patient_context(patient_id)
-        return JSONResponse(content=context)
+        pages = {}
+        for list_name in ([type] if type else CONTEXT_LISTS):
+            entries, has_more = await interview_context_store.page(
+                patient_id, list_name, limit, before_seq=before_seq,
+                since=to_naive_utc(since) if since else None,
+                until=to_naive_utc(until) if until else None
+            )
+            if entries is None:
+                return JSONResponse(content={})
+            next_cursor = None
+            if has_more and entries:
+                last = entries[-1]
+                next_cursor = encode_cursor({"_id": last.get("seq", 0), "timestamp": last.get("timestamp")}, "timestamp")
+            pages[list_name] = (entries, next_cursor)
+        
+        return StreamingResponse(stream_context_pages(patient_id, pages, field_list), media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get patient context: {str(e)}")
 
+@router.get("/trends/{patient_id}")
+async def get_score_trends(
+    patient_id: str,
+    days: int = Query(90, ge=1, le=3650),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[str] = Query(None, description="Comma separated score names"),
+    granularity: Optional[str] = Query(None, pattern=f"^({GRANULARITY_RAW}|{GRANULARITY_DAY}|{GRANULARITY_WEEK})$")
+):
+    """
+    Cognitive score trend for charts.
+    
+    Defaults to the last `days` days; the resolution (raw, day, week) is
+    chosen from the range unless given.
+    """
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=days)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        trend = await cognitive_score_series.trend(
+            patient_id, start, end,
+            metrics=metrics.split(",") if metrics else None,
+            granularity=granularity
+        )
+        return JSONResponse(content=trend)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get score trends: {str(e)}")
+
 @router.post("/simulate-analysis")
 async def simulate_analysis(
     response_text: str = Form(...),
@@ -144,42 +247,23 @@ async def simulate_analysis(
 async def analyze_voice_response(
     audio_file: UploadFile = File(...),
     question: str = Form(...),
-    patient_id: str = Form(...)
+    patient_id: str = Form(...),
+    transcription: Optional[str] = Form(None)
 ):
     """
-    Analyze voice response directly from audio file
+    Analyze voice response directly from audio file.
+    
+    The optional browser transcription is used when the audio cannot be
+    decoded or transcribed on the server.
     """
     try:
         audio_data = await audio_file.read()
         
-        # First analyze speech patterns
-        speech_analysis = await interview_analysis_service.analyze_speech_patterns(audio_data, patient_id)
-        
-        # For now, we'll use a placeholder transcription since we don't have speech-to-text in backend
-        # In a real implementation, you'd integrate with a speech-to-text service
-        placeholder_transcription = "Patient response to memory question about family traditions."
-        
-        # Then analyze the response content
-        response_analysis = await interview_analysis_service.analyze_response_to_question(
-            question, placeholder_transcription, patient_id
+        # Transcribe once, then fan out to the dependent stages under one deadline
+        combined_analysis = await interview_analysis_service.analyze_voice_response(
+            audio_data, question, patient_id, client_transcription=transcription
         )
         
-        # Find relevant memories
-        memory_suggestions = await interview_analysis_service.find_relevant_memories(
-            placeholder_transcription, patient_id, question
-        )
-        
-        # Combine all analyses
-        combined_analysis = {
-            "speech_analysis": speech_analysis,
-            "response_analysis": response_analysis,
-            "memory_suggestions": memory_suggestions,
-            "transcription": placeholder_transcription,
-            "question": question,
-            "patient_id": patient_id,
-            "timestamp": "2024-01-15T10:30:00Z"
-        }
-        
         return JSONResponse(content=combined_analysis)
         
     except Exception as e:
@@ -205,4 +289,54 @@ async def find_relevant_memories(
         return JSONResponse(content=memory_suggestions)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Memory search failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Memory search failed: {str(e)}") 
+
+@router.websocket("/stream")
+async def stream_voice_response(
+    websocket: WebSocket,
+    patient_id: str,
+    question: str = "",
+    format: str = "pcm16",
+    sample_rate: int = STREAM_SAMPLE_RATE
+):
+    """
+    Stream a spoken answer while the patient is talking.
+    
+    Send binary frames of 16-bit mono PCM (or raw Opus packets with format=opus)
+    and a text message {"type": "stop"} when the answer is complete. The server
+    pushes "partial" transcripts per speech segment, "feedback" on the answer so
+    far, and a "final" message with the full analysis.
+    """
+    # Refuse the handshake rather than fail on the first frame
+    error = check_stream_params(format, sample_rate)
+    if error:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=error)
+        return
+    
+    await websocket.accept()
+    session = StreamingTranscriptionSession(
+        patient_id, question, websocket.send_json, interview_analysis_service,
+        audio_format=format, sample_rate=sample_rate
+    )
+    
+    await websocket.send_json({"type": "ready", "sample_rate": sample_rate, "format": format})
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+            elif message.get("text"):
+                control = json.loads(message["text"])
+                if control.get("type") == "stop":
+                    break
+        
+        await session.finish()
+        await websocket.close()
+    except WebSocketDisconnect:
+        await session.cancel()
+    except Exception as e:
+        await session.cancel()
+        await websocket.send_json({"type": "error", "error": f"Streaming analysis failed: {str(e)}"})
+        await websocket.close(code=1011)
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 import os
 
-from models.journal import Journal, JournalCreate, JournalUpdate, JournalResponse
+from models.journal import Journal, JournalCreate, JournalUpdate, JournalResponse, JournalPage
 from models.user import User, UserRole
 from routers.auth import get_current_user, get_db
 from services.ai_service import AIService
 from database import Collections
+from pagination import fetch_listing, MAX_PAGE_SIZE
 
 router = APIRouter()
 ai_service = AIService()
@@ -41,28 +42,28 @@ async def create_journal_entry(
     
     return JournalResponse(**journal_dict)
 
-@router.get("/", response_model=List[JournalResponse])
+@router.get("/", response_model=Union[JournalPage, List[JournalResponse]])
 async def get_journal_entries(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     pinned_only: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get journal entries for current user"""
+    """Get a page of journal entries for current user, newest first"""
     query = {"user_id": current_user.auth0_id}
     
     if pinned_only:
         query["is_pinned"] = True
     
-    journals = []
-    cursor = db[Collections.JOURNALS].find(query).skip(skip).limit(limit).sort("created_at", -1)
+    docs, next_cursor, paged = await fetch_listing(db[Collections.JOURNALS], query, limit, cursor)
     
-    async for journal in cursor:
+    journals = []
+    for journal in docs:
         journal["_id"] = str(journal["_id"])
         journals.append(JournalResponse(**journal))
     
-    return journals
+    return JournalPage(items=journals, next_cursor=next_cursor) if paged else journals
 
 @router.get("/{journal_id}", response_model=JournalResponse)
 async def get_journal_entry(
@@ -153,11 +154,11 @@ async def pin_journal_entry(
     
     return {"message": f"Journal entry {'pinned' if new_pinned_status else 'unpinned'} successfully"}
 
-@router.get("/caregiver/{patient_id}", response_model=List[JournalResponse])
+@router.get("/caregiver/{patient_id}", response_model=Union[JournalPage, List[JournalResponse]])
 async def get_patient_journals(
     patient_id: str,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
@@ -169,11 +170,11 @@ async def get_patient_journals(
     if patient_id not in current_user.patients:
         raise HTTPException(status_code=403, detail="Access to patient denied")
     
-    journals = []
-    cursor = db[Collections.JOURNALS].find({"user_id": patient_id}).skip(skip).limit(limit).sort("created_at", -1)
+    docs, next_cursor, paged = await fetch_listing(db[Collections.JOURNALS], {"user_id": patient_id}, limit, cursor)
     
-    async for journal in cursor:
+    journals = []
+    for journal in docs:
         journal["_id"] = str(journal["_id"])
         journals.append(JournalResponse(**journal))
     
-    return journals 
\ No newline at end of file
+    return JournalPage(items=journals, next_cursor=next_cursor) if paged else journals 
\ No newline at end of file
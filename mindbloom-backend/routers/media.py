@@ -1,26 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 import os
-import aiofiles
+import re
+import asyncio
 from datetime import datetime
-import uuid
 
 from models.user import User
+from pagination import parse_fields, fetch_listing, listing_response, MAX_PAGE_SIZE
 from routers.auth import get_current_user, get_db
-from services.ai_service import AIService
+from services.media_store import media_store, FileTooLargeError
+from services.media_streaming import MediaFileResponse
+from services.media_analysis import image_analysis_pipeline
+from services.thumbnails import thumbnail_service, thumbnail_path, pick_thumbnail_size, remove_derivatives, THUMBNAIL_SIZES
 
 router = APIRouter()
-ai_service = AIService()
 
 # Media upload configuration
-UPLOAD_DIR = "uploads"
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".mp4", ".mov", ".wav", ".mp3"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_BATCH_FILES = 100
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("MEDIA_UPLOAD_CONCURRENCY", "4"))
 
-# Ensure upload directory exists
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Fields clients may request from the listing; ai_analysis is opt-in
+MEDIA_FIELDS = {
+    "original_filename", "stored_filename", "sha256", "file_size", "content_type",
+    "ai_analysis", "analysis_status", "thumbnails", "created_at"
+}
+MEDIA_SUMMARY_FIELDS = [
+    "original_filename", "file_size", "content_type", "analysis_status", "thumbnails", "created_at"
+]
 
 def get_file_extension(filename: str) -> str:
     """Get file extension from filename"""
@@ -30,6 +42,49 @@ def is_allowed_file(filename: str) -> bool:
     """Check if file type is allowed"""
     return get_file_extension(filename) in ALLOWED_EXTENSIONS
 
+def media_query(file_id: str, user_id: str) -> dict:
+    """Build a lookup for a user's media document by string or ObjectId id"""
+    if ObjectId.is_valid(file_id):
+        return {"_id": {"$in": [file_id, ObjectId(file_id)]}, "user_id": user_id}
+    return {"_id": file_id, "user_id": user_id}
+
+def build_file_metadata(user_id: str, filename: str, content_type: Optional[str], file_size: int, blob: dict) -> dict:
+    """Build a media document for a stored blob"""
+    # Reuse analysis and thumbnails from an earlier copy; otherwise images are processed in the background
+    ai_analysis = blob.get("ai_analysis")
+    needs_analysis = ai_analysis is None and get_file_extension(filename) in IMAGE_EXTENSIONS
+    
+    return {
+        "user_id": user_id,
+        "original_filename": filename,
+        "stored_filename": blob["_id"],
+        "sha256": blob["_id"],
+        "file_path": blob["file_path"],
+        "file_size": file_size,
+        "content_type": content_type,
+        "ai_analysis": ai_analysis,
+        "analysis_status": "pending" if needs_analysis else ("complete" if ai_analysis else None),
+        "thumbnails": blob.get("thumbnails"),
+        "created_at": datetime.utcnow()
+    }
+
+def thumbnail_links(file_id: str, thumbnails: Optional[dict]) -> Optional[dict]:
+    """Public form of a thumbnails map: byte count and endpoint URL per size"""
+    if not thumbnails:
+        return thumbnails
+    return {
+        size: {
+            "file_size": info.get("file_size"),
+            "url": f"/api/media/files/{file_id}/thumbnail?size={size}"
+        }
+        for size, info in thumbnails.items()
+    }
+
+def schedule_derivatives(file_metadata: dict):
+    """Queue thumbnail generation for new image blobs"""
+    if file_metadata["thumbnails"] is None and get_file_extension(file_metadata["original_filename"]) in IMAGE_EXTENSIONS:
+        thumbnail_service.schedule(file_metadata["file_path"], file_metadata["sha256"])
+
 @router.post("/upload")
 async def upload_media(
     file: UploadFile = File(...),
@@ -51,71 +106,182 @@ async def upload_media(
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File too large")
     
-    # Generate unique filename
-    file_extension = get_file_extension(file.filename)
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    digest = await asyncio.to_thread(media_store.compute_digest, file_content)
     
-    # Save file
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(file_content)
+    # Same user uploading the same content again: nothing to write or analyze
+    existing_file = await media_store.find_user_duplicate(db, current_user.auth0_id, digest)
+    if existing_file:
+        return {
+            "message": "File already uploaded",
+            "file_id": str(existing_file["_id"]),
+            "filename": existing_file["stored_filename"],
+            "original_filename": existing_file["original_filename"],
+            "file_size": existing_file["file_size"],
+            "ai_analysis": existing_file.get("ai_analysis"),
+            "analysis_status": existing_file.get("analysis_status"),
+            "duplicate": True
+        }
     
-    # Analyze image if it's an image file
-    ai_analysis = None
-    if file_extension in {".jpg", ".jpeg", ".png", ".gif"}:
-        try:
-            ai_analysis = await ai_service.analyze_image(file_content)
-        except Exception as e:
-            # Continue without AI analysis if it fails
-            pass
+    # Store blob once and add a reference to it
+    blob, is_new_blob = await media_store.acquire(db, file_content, digest, file.content_type)
     
     # Save file metadata to database
-    file_metadata = {
-        "user_id": current_user.auth0_id,
-        "original_filename": file.filename,
-        "stored_filename": unique_filename,
-        "file_path": file_path,
-        "file_size": file_size,
-        "content_type": file.content_type,
-        "ai_analysis": ai_analysis,
-        "created_at": datetime.utcnow()
-    }
+    file_metadata = build_file_metadata(current_user.auth0_id, file.filename, file.content_type, file_size, blob)
+    ai_analysis = file_metadata["ai_analysis"]
     
     result = await db.media.insert_one(file_metadata)
-    file_metadata["_id"] = str(result.inserted_id)
+    file_metadata["_id"] = result.inserted_id
+    
+    if file_metadata["analysis_status"] == "pending":
+        file_metadata["analysis_status"] = await image_analysis_pipeline.enqueue_media(db, file_metadata)
+    schedule_derivatives(file_metadata)
     
     return {
         "message": "File uploaded successfully",
         "file_id": str(result.inserted_id),
-        "filename": unique_filename,
+        "filename": digest,
         "original_filename": file.filename,
         "file_size": file_size,
-        "ai_analysis": ai_analysis
+        "ai_analysis": ai_analysis,
+        "analysis_status": file_metadata["analysis_status"],
+        "duplicate": not is_new_blob
+    }
+
+async def _stage_batch_file(file: UploadFile, user_id: str, db: AsyncIOMotorDatabase,
+                            semaphore: asyncio.Semaphore) -> dict:
+    """Validate, stream and deduplicate one file of a batch upload"""
+    if not file.filename or not is_allowed_file(file.filename):
+        return {"original_filename": file.filename, "status": "rejected", "error": "File type not allowed"}
+    
+    async with semaphore:
+        try:
+            tmp_path, digest, file_size = await media_store.stage_stream(file, MAX_FILE_SIZE)
+        except FileTooLargeError:
+            return {"original_filename": file.filename, "status": "rejected", "error": "File too large"}
+        except Exception as e:
+            return {"original_filename": file.filename, "status": "failed", "error": str(e)}
+        
+        existing_file = await media_store.find_user_duplicate(db, user_id, digest)
+        if existing_file:
+            media_store.discard_staged(tmp_path)
+            return {
+                "original_filename": file.filename,
+                "status": "duplicate",
+                "file_id": str(existing_file["_id"]),
+                "sha256": digest
+            }
+        
+        blob, _ = await media_store.commit_staged(db, tmp_path, digest, file_size, file.content_type)
+        return {
+            "original_filename": file.filename,
+            "status": "stored",
+            "sha256": digest,
+            "metadata": build_file_metadata(user_id, file.filename, file.content_type, file_size, blob)
+        }
+
+@router.post("/upload/batch")
+async def upload_media_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Upload many media files in one request"""
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    results = await asyncio.gather(*[
+        _stage_batch_file(file, current_user.auth0_id, db, semaphore)
+        for file in files
+    ])
+    
+    # The same content twice in one batch only gets one media document
+    documents = []
+    seen_digests = {}
+    for result in results:
+        if result["status"] != "stored":
+            continue
+        if result["sha256"] in seen_digests:
+            await media_store.release(db, result["sha256"])
+            result["status"] = "duplicate"
+            result["duplicate_of"] = seen_digests[result["sha256"]]
+            result.pop("metadata")
+            continue
+        seen_digests[result["sha256"]] = result["original_filename"]
+        documents.append(result)
+    
+    if documents:
+        failed_indexes = {}
+        try:
+            await db.media.insert_many([r["metadata"] for r in documents], ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {err["index"]: err.get("errmsg", "Insert failed") for err in e.details.get("writeErrors", [])}
+        
+        for index, result in enumerate(documents):
+            metadata = result.pop("metadata")
+            if index in failed_indexes:
+                await media_store.release(db, result["sha256"])
+                result["status"] = "failed"
+                result["error"] = failed_indexes[index]
+                continue
+            # insert_many assigns _id on the documents it was given
+            result["file_id"] = str(metadata["_id"])
+            result["file_size"] = metadata["file_size"]
+            result["analysis_status"] = metadata["analysis_status"]
+            if metadata["analysis_status"] == "pending":
+                result["analysis_status"] = await image_analysis_pipeline.enqueue_media(db, metadata)
+            schedule_derivatives(metadata)
+    
+    for result in results:
+        result.pop("sha256", None)
+    
+    return {
+        "message": "Batch upload processed",
+        "uploaded": sum(1 for r in results if r["status"] == "stored"),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "failed": sum(1 for r in results if r["status"] in ("rejected", "failed")),
+        "results": results
     }
 
-@router.get("/files", response_model=List[dict])
+@router.get("/files")
 async def get_user_files(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    content_type: Optional[str] = Query(None, description="e.g. 'image' or 'audio/mpeg'"),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get all media files for current user"""
-    files = []
-    cursor = db.media.find({"user_id": current_user.auth0_id}).sort("created_at", -1)
+    """Get a page of media files for current user, newest first"""
+    query = {"user_id": current_user.auth0_id}
+    if content_type:
+        if "/" in content_type:
+            query["content_type"] = content_type
+        else:
+            query["content_type"] = {"$regex": f"^{re.escape(content_type)}/"}
+    
+    projection = parse_fields(fields, MEDIA_FIELDS, default=MEDIA_SUMMARY_FIELDS)
+    files, next_cursor, paged = await fetch_listing(db.media, query, limit, cursor, projection)
     
-    async for file in cursor:
+    for file in files:
         file["_id"] = str(file["_id"])
-        files.append(file)
+        if "thumbnails" in file:
+            file["thumbnails"] = thumbnail_links(file["_id"], file["thumbnails"])
     
-    return files
+    return listing_response(files, next_cursor, paged)
 
 @router.get("/files/{file_id}")
 async def get_file(
     file_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get a specific file"""
-    file_data = await db.media.find_one({"_id": file_id, "user_id": current_user.auth0_id})
+    """Get a specific file (supports Range and conditional requests)"""
+    file_data = await db.media.find_one(media_query(file_id, current_user.auth0_id))
     
     if not file_data:
         raise HTTPException(status_code=404, detail="File not found")
@@ -125,10 +291,49 @@ async def get_file(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found on disk")
     
-    return FileResponse(
+    return MediaFileResponse(
+        request,
         path=file_path,
+        media_type=file_data["content_type"],
         filename=file_data["original_filename"],
-        media_type=file_data["content_type"]
+        digest=file_data.get("sha256")
+    )
+
+@router.get("/files/{file_id}/thumbnail")
+async def get_thumbnail(
+    file_id: str,
+    request: Request,
+    size: int = Query(256, ge=1, le=max(THUMBNAIL_SIZES)),
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get a WebP thumbnail of an image, generating it if needed"""
+    file_data = await db.media.find_one(media_query(file_id, current_user.auth0_id))
+    
+    if not file_data:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    if get_file_extension(file_data["original_filename"]) not in IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Thumbnails are only available for images")
+    
+    file_path = file_data["file_path"]
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found on disk")
+    
+    thumb_size = pick_thumbnail_size(size)
+    thumb_path = thumbnail_path(file_path, thumb_size)
+    if not os.path.exists(thumb_path):
+        # Older uploads, or generation has not finished yet
+        thumbnails = await thumbnail_service.generate(file_path, file_data.get("sha256"), file_data["_id"])
+        if not thumbnails or not os.path.exists(thumb_path):
+            raise HTTPException(status_code=500, detail="Failed to generate thumbnail")
+    
+    digest = file_data.get("sha256")
+    return MediaFileResponse(
+        request,
+        path=thumb_path,
+        media_type="image/webp",
+        digest=f"{digest}-w{thumb_size}" if digest else None
     )
 
 @router.delete("/files/{file_id}")
@@ -138,18 +343,22 @@ async def delete_file(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete a file"""
-    file_data = await db.media.find_one({"_id": file_id, "user_id": current_user.auth0_id})
+    file_data = await db.media.find_one(media_query(file_id, current_user.auth0_id))
     
     if not file_data:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Delete from disk
-    file_path = file_data["file_path"]
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    
     # Delete from database
-    await db.media.delete_one({"_id": file_id})
+    await db.media.delete_one({"_id": file_data["_id"]})
+    
+    # Release the shared blob, or delete legacy per-upload files directly
+    if file_data.get("sha256"):
+        await media_store.release(db, file_data["sha256"])
+    else:
+        file_path = file_data["file_path"]
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        remove_derivatives(file_path)
     
     return {"message": "File deleted successfully"}
 
@@ -160,7 +369,7 @@ async def get_file_analysis(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get AI analysis for a file"""
-    file_data = await db.media.find_one({"_id": file_id, "user_id": current_user.auth0_id})
+    file_data = await db.media.find_one(media_query(file_id, current_user.auth0_id))
     
     if not file_data:
         raise HTTPException(status_code=404, detail="File not found")
@@ -168,6 +377,7 @@ async def get_file_analysis(
     return {
         "file_id": file_id,
         "ai_analysis": file_data.get("ai_analysis"),
+        "analysis_status": file_data.get("analysis_status"),
         "original_filename": file_data["original_filename"]
     }
 
@@ -178,7 +388,7 @@ async def reanalyze_file(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Reanalyze a file with AI"""
-    file_data = await db.media.find_one({"_id": file_id, "user_id": current_user.auth0_id})
+    file_data = await db.media.find_one(media_query(file_id, current_user.auth0_id))
     
     if not file_data:
         raise HTTPException(status_code=404, detail="File not found")
@@ -189,25 +399,41 @@ async def reanalyze_file(
     
     # Check if it's an image file
     file_extension = get_file_extension(file_data["original_filename"])
-    if file_extension not in {".jpg", ".jpeg", ".png", ".gif"}:
+    if file_extension not in IMAGE_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Only image files can be analyzed")
     
-    try:
-        # Read file and analyze
-        async with aiofiles.open(file_path, 'rb') as f:
-            file_content = await f.read()
-        
-        ai_analysis = await ai_service.analyze_image(file_content)
-        
-        # Update database with new analysis
-        await db.media.update_one(
-            {"_id": file_id},
-            {"$set": {"ai_analysis": ai_analysis}}
-        )
-        
-        return {
-            "message": "File reanalyzed successfully",
-            "ai_analysis": ai_analysis
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to analyze file") 
\ No newline at end of file
+    status = await image_analysis_pipeline.enqueue_media(db, file_data, force=True)
+    
+    return {
+        "message": "File queued for reanalysis",
+        "file_id": file_id,
+        "analysis_status": status
+    }
+
+@router.post("/reanalyze")
+async def reanalyze_all_files(
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Reanalyze all of the current user's images in the background"""
+    batch = await image_analysis_pipeline.start_batch(db, current_user.auth0_id)
+    
+    return {
+        "message": "Reanalysis started",
+        "batch_id": batch["_id"],
+        "total": batch["total"]
+    }
+
+@router.get("/reanalyze/{batch_id}")
+async def get_reanalysis_progress(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get progress of a batch reanalysis"""
+    progress = await image_analysis_pipeline.get_batch_progress(db, batch_id, current_user.auth0_id)
+    
+    if not progress:
+        raise HTTPException(status_code=404, detail="Reanalysis batch not found")
+    
+    return progress
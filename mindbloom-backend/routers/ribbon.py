@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Dict, Optional
 from pydantic import BaseModel
@@ -8,6 +8,7 @@ import json
 from models.user import User
 from routers.auth import get_current_user, get_db
 from services.ribbon_service import RibbonService
+from pagination import fetch_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 
@@ -205,36 +206,50 @@ async def create_memory_interview(patient_id: str):
 
 @router.get("/interviews")
 async def get_user_interviews(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get all interviews created by the current user"""
+    """Get a page of interviews created by the current user, newest first"""
     try:
-        interviews = await db.interviews.find(
-            {"created_by": current_user.auth0_id}
-        ).sort("created_at", -1).to_list(length=50)
+        interviews, next_cursor = await fetch_page(
+            db.interviews, {"created_by": current_user.auth0_id}, limit, cursor
+        )
+        for interview in interviews:
+            interview["_id"] = str(interview["_id"])
         
         return {
             "interviews": interviews,
-            "total": len(interviews)
+            "count": len(interviews),
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get interviews: {str(e)}")
 
 @router.get("/flows")
 async def get_user_flows(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get all interview flows created by the current user"""
+    """Get a page of interview flows created by the current user, newest first"""
     try:
-        flows = await db.interview_flows.find(
-            {"created_by": current_user.auth0_id}
-        ).sort("created_at", -1).to_list(length=50)
+        flows, next_cursor = await fetch_page(
+            db.interview_flows, {"created_by": current_user.auth0_id}, limit, cursor
+        )
+        for flow in flows:
+            flow["_id"] = str(flow["_id"])
         
         return {
             "flows": flows,
-            "total": len(flows)
+            "count": len(flows),
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get flows: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,197 @@
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Bump when the features or scoring change so stored recordings get rescored
+FEATURES_VERSION = 1
+
+# Framing configuration
+FRAME_MS = 25
+HOP_MS = 10
+BLOCK_FRAMES = 4096  # Frames processed per block so long recordings stay bounded in memory
+
+# Speech / pause detection
+SILENCE_MARGIN_DB = 12.0  # Frame is speech when this far above the noise floor
+MIN_SPEECH_DB = -50.0
+MIN_PAUSE_MS = 250  # Shorter gaps are articulation, not pauses
+LONG_PAUSE_MS = 2000
+
+# Pitch search range (adult speech)
+PITCH_MIN_HZ = 75
+PITCH_MAX_HZ = 400
+VOICING_THRESHOLD = 0.45  # Normalized autocorrelation peak needed to call a frame voiced
+
+# Syllable nuclei: energy peaks this far above the local speech level
+SYLLABLE_PEAK_DB = 2.0
+
+
+def frame_view(samples: np.ndarray, frame_len: int, hop: int) -> np.ndarray:
+    """Overlapping frames as a read-only strided view, no samples are copied"""
+    if samples.size < frame_len:
+        return np.empty((0, frame_len), dtype=samples.dtype)
+    n_frames = 1 + (samples.size - frame_len) // hop
+    stride = samples.strides[0]
+    return as_strided(samples, shape=(n_frames, frame_len), strides=(hop * stride, stride), writeable=False)
+
+
+def _frame_levels(frames: np.ndarray) -> np.ndarray:
+    """RMS level in dBFS per frame, accumulated in float64 straight from int16"""
+    power = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / (frames.shape[1] * 32768.0 ** 2)
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def _frame_pitch(frames: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Fundamental frequency per frame via FFT autocorrelation.
+
+    Returns Hz for voiced frames and NaN for unvoiced ones.
+    """
+    if frames.shape[0] == 0:
+        return np.empty(0)
+    x = frames.astype(np.float32)
+    x -= x.mean(axis=1, keepdims=True)
+    n_fft = 1 << int(np.ceil(np.log2(2 * x.shape[1])))
+    spectrum = np.fft.rfft(x, n=n_fft, axis=1)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), n=n_fft, axis=1)[:, :x.shape[1]]
+
+    lag_min = int(sample_rate / PITCH_MAX_HZ)
+    lag_max = min(int(sample_rate / PITCH_MIN_HZ), x.shape[1] - 1)
+    window = acf[:, lag_min:lag_max + 1]
+    best = np.argmax(window, axis=1)
+    peak = window[np.arange(window.shape[0]), best] / (acf[:, 0] + 1e-9)
+
+    pitch = sample_rate / (best + lag_min)
+    return np.where(peak >= VOICING_THRESHOLD, pitch, np.nan)
+
+
+def _runs(mask: np.ndarray):
+    """Start and end indices of consecutive True runs"""
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[0::2], edges[1::2]
+
+
+def extract_acoustic_features(pcm: bytes, sample_rate: int = 16000,
+                              word_count: Optional[int] = None) -> Dict:
+    """
+    Prosodic and timing features over 16-bit mono PCM.
+
+    Speech rate, pause distribution, pause-to-speech ratio, energy variance
+    and pitch variability. word_count (from the transcript) turns speech
+    time into words per minute; otherwise only the syllable estimate is given.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    frame_len = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    frames = frame_view(samples, frame_len, hop)
+    n_frames = frames.shape[0]
+    duration = samples.size / sample_rate
+
+    if n_frames == 0:
+        return {"duration_seconds": round(duration, 2), "speech_detected": False}
+
+    # Levels over the whole recording, in blocks of strided views
+    levels = np.concatenate([
+        _frame_levels(frames[i:i + BLOCK_FRAMES]) for i in range(0, n_frames, BLOCK_FRAMES)
+    ])
+
+    noise_floor = float(np.percentile(levels, 10))
+    speech_mask = levels > max(noise_floor + SILENCE_MARGIN_DB, MIN_SPEECH_DB)
+    if not speech_mask.any():
+        return {"duration_seconds": round(duration, 2), "speech_detected": False}
+
+    # Ignore leading and trailing silence
+    speech_idx = np.flatnonzero(speech_mask)
+    first, last = speech_idx[0], speech_idx[-1] + 1
+    active = speech_mask[first:last]
+
+    # Pauses are silent runs inside the active span
+    starts, ends = _runs(~active)
+    pause_lengths = (ends - starts) * HOP_MS / 1000.0
+    pause_lengths = pause_lengths[pause_lengths * 1000 >= MIN_PAUSE_MS]
+    speech_time = float(active.sum()) * HOP_MS / 1000.0
+    pause_time = float(pause_lengths.sum())
+
+    # Energy variability over speech frames
+    speech_levels = levels[speech_mask]
+
+    # Pitch only on speech frames, gathered in blocks
+    pitch = np.concatenate([
+        _frame_pitch(frames[idx], sample_rate)
+        for idx in np.array_split(speech_idx, max(1, speech_idx.size // BLOCK_FRAMES))
+    ])
+    voiced_pitch = pitch[~np.isnan(pitch)]
+    if voiced_pitch.size >= 2:
+        semitones = 12.0 * np.log2(voiced_pitch / np.median(voiced_pitch))
+        pitch_stats = {
+            "pitch_mean_hz": round(float(voiced_pitch.mean()), 1),
+            "pitch_std_semitones": round(float(semitones.std()), 2),
+            "pitch_range_semitones": round(float(np.percentile(semitones, 95) - np.percentile(semitones, 5)), 2),
+        }
+    else:
+        pitch_stats = {"pitch_mean_hz": None, "pitch_std_semitones": None, "pitch_range_semitones": None}
+
+    # Syllable nuclei: local energy maxima in speech that stand out from neighbours
+    window = levels[first:last]
+    is_peak = np.zeros(window.size, dtype=bool)
+    if window.size >= 3:
+        is_peak[1:-1] = (window[1:-1] > window[:-2]) & (window[1:-1] >= window[2:])
+    speech_median = float(np.median(speech_levels))
+    syllables = int(np.count_nonzero(is_peak & active & (window > speech_median + SYLLABLE_PEAK_DB)))
+
+    features = {
+        "duration_seconds": round(duration, 2),
+        "speech_detected": True,
+        "speech_seconds": round(speech_time, 2),
+        "active_seconds": round((last - first) * HOP_MS / 1000.0, 2),
+        "pause_count": int(pause_lengths.size),
+        "long_pause_count": int(np.count_nonzero(pause_lengths * 1000 >= LONG_PAUSE_MS)),
+        "pause_total_seconds": round(pause_time, 2),
+        "pause_mean_seconds": round(float(pause_lengths.mean()), 2) if pause_lengths.size else 0.0,
+        "pause_median_seconds": round(float(np.median(pause_lengths)), 2) if pause_lengths.size else 0.0,
+        "pause_p90_seconds": round(float(np.percentile(pause_lengths, 90)), 2) if pause_lengths.size else 0.0,
+        "pause_max_seconds": round(float(pause_lengths.max()), 2) if pause_lengths.size else 0.0,
+        "pause_to_speech_ratio": round(pause_time / speech_time, 3) if speech_time else None,
+        "syllables_per_second": round(syllables / speech_time, 2) if speech_time else None,
+        "energy_std_db": round(float(speech_levels.std()), 2),
+        **pitch_stats,
+    }
+    if word_count is not None:
+        add_word_rate(features, word_count)
+    return features
+
+
+def add_word_rate(features: Dict, word_count: int) -> Dict:
+    """Words per minute over the span from first to last speech, once the transcript is known"""
+    if features.get("speech_detected") and features.get("active_seconds"):
+        features["words_per_minute"] = round(word_count * 60.0 / features["active_seconds"], 1)
+    return features
+
+
+def acoustic_scores(features: Dict) -> Dict:
+    """
+    Map acoustic features to 0-10 fluency and word-finding scores.
+
+    Long and frequent pauses lower word-finding; slow articulation and a
+    high pause ratio lower fluency.
+    """
+    if not features.get("speech_detected"):
+        return {}
+
+    ratio = features.get("pause_to_speech_ratio") or 0.0
+    rate = features.get("syllables_per_second") or 0.0
+    pauses_per_minute = features["pause_count"] / max(features["speech_seconds"] / 60.0, 1e-6)
+
+    # Typical conversational speech: ~3-5 syllables/s, pause ratio under 0.3
+    rate_score = np.clip((rate - 1.0) / 2.5, 0.0, 1.0)
+    ratio_score = np.clip(1.0 - (ratio - 0.2) / 0.8, 0.0, 1.0)
+    fluency = 10.0 * (0.5 * rate_score + 0.5 * ratio_score)
+
+    long_pause_penalty = min(features["long_pause_count"] * 1.5, 5.0)
+    word_finding = 10.0 * np.clip(1.0 - (pauses_per_minute - 10.0) / 30.0, 0.0, 1.0) - long_pause_penalty
+
+    return {
+        "speech_fluency": round(float(np.clip(fluency, 0.0, 10.0)), 1),
+        "word_finding": round(float(np.clip(word_finding, 0.0, 10.0)), 1),
+    }
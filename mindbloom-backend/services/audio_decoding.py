@@ -0,0 +1,305 @@
+import io
+import os
+import asyncio
+import shutil
+import subprocess
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from services.acoustic_features import extract_acoustic_features
+
+# Try to import PyAV for compressed containers, ffmpeg on PATH is the fallback
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Decoding configuration
+TARGET_SAMPLE_RATE = 16000
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", str(min(4, os.cpu_count() or 2))))
+RESAMPLE_HALF_WIDTH = 16  # Sinc lobes on each side of the interpolation point
+RESAMPLE_BLOCK = 8192  # Output samples computed per vectorized block
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded audio cannot be decoded"""
+
+
+def detect_container(data: bytes) -> str:
+    """Identify the audio container from its magic bytes"""
+    head = data[:16]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    # Headerless uploads are taken as 16 kHz 16-bit mono PCM, as before
+    return "pcm"
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """PCM WAV via the standard library; returns (frames x channels float32, sample rate)"""
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"Invalid WAV file: {e}")
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        # Sign-extend packed 24-bit samples through a 4-byte view
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        wide = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+        wide[:, 1:] = packed
+        samples = wide.view("<i4").ravel().astype(np.float32) / 2147483648.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise AudioDecodeError(f"Unsupported WAV sample width: {width}")
+    return samples.reshape(-1, channels), rate
+
+
+def _decode_with_av(data: bytes) -> Tuple[np.ndarray, int]:
+    """Compressed containers via PyAV; returns (frames x channels float32, sample rate)"""
+    try:
+        with av.open(io.BytesIO(data)) as container:
+            stream = container.streams.audio[0]
+            rate = stream.rate
+            chunks = []
+            for frame in container.decode(stream):
+                array = frame.to_ndarray()
+                if array.dtype.kind == "i":
+                    array = array.astype(np.float32) / float(np.iinfo(array.dtype).max)
+                # Planar frames are channels x samples, packed ones 1 x (samples * channels)
+                if frame.format.is_planar:
+                    array = array.T
+                else:
+                    array = array.reshape(-1, len(frame.layout.channels))
+                chunks.append(array.astype(np.float32, copy=False))
+    except (av.error.FFmpegError, IndexError) as e:
+        raise AudioDecodeError(f"Could not decode audio: {e}")
+    if not chunks:
+        raise AudioDecodeError("Audio stream is empty")
+    return np.concatenate(chunks), rate
+
+
+def _decode_with_ffmpeg(data: bytes) -> Tuple[np.ndarray, int]:
+    """Compressed containers via the ffmpeg binary, which also downmixes and resamples"""
+    result = subprocess.run(
+        [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "pipe:1"],
+        input=data, capture_output=True, timeout=120
+    )
+    if result.returncode != 0:
+        raise AudioDecodeError(f"Could not decode audio: {result.stderr.decode(errors='ignore').strip()}")
+    samples = np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768.0
+    return samples.reshape(-1, 1), TARGET_SAMPLE_RATE
+
+
+def decode_audio(data: bytes) -> Tuple[np.ndarray, int, str]:
+    """Decode any supported upload to (frames x channels float32, sample rate, container)"""
+    container = detect_container(data)
+    if container == "pcm":
+        samples = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+        return samples.reshape(-1, 1), TARGET_SAMPLE_RATE, container
+    if container == "wav":
+        samples, rate = _decode_wav(data)
+        return samples, rate, container
+    if AV_AVAILABLE:
+        samples, rate = _decode_with_av(data)
+    elif FFMPEG_PATH:
+        samples, rate = _decode_with_ffmpeg(data)
+    else:
+        raise AudioDecodeError(f"Decoding {container} audio requires PyAV (`pip install av`) or ffmpeg")
+    return samples, rate, container
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Average all channels into mono"""
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def resample(samples: np.ndarray, rate_in: int, rate_out: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Band-limited resampling by Hann-windowed sinc interpolation.
+
+    Output samples are computed in blocks as one gather and one weighted sum,
+    so arbitrary ratios (44.1 kHz, 48 kHz, 22.05 kHz) need no upsampling buffer.
+    When downsampling the kernel is widened so it also acts as the anti-alias filter.
+    """
+    if rate_in == rate_out or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+
+    ratio = rate_out / rate_in
+    cutoff = min(1.0, ratio)
+    half_width = int(np.ceil(RESAMPLE_HALF_WIDTH / cutoff))
+    taps = np.arange(-half_width + 1, half_width + 1)
+    padded = np.pad(samples.astype(np.float32, copy=False), half_width)
+
+    n_out = int(samples.size * ratio)
+    out = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, RESAMPLE_BLOCK):
+        positions = np.arange(start, min(start + RESAMPLE_BLOCK, n_out)) / ratio
+        base = np.floor(positions).astype(np.int64)
+        distance = (positions - base)[:, None] - taps[None, :]
+        kernel = cutoff * np.sinc(cutoff * distance) * (0.5 + 0.5 * np.cos(np.pi * distance / half_width))
+        out[start:start + base.size] = np.einsum(
+            "ij,ij->i", padded[base[:, None] + taps[None, :] + half_width], kernel.astype(np.float32)
+        )
+    return out
+
+
+def to_pcm16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+
+
+def _decode_to_shared(data: bytes) -> Dict:
+    """
+    Decode, downmix and resample to 16 kHz mono PCM (runs in a worker process).
+
+    The PCM is written to a new shared memory block; the caller takes
+    ownership and unlinks it when done.
+    """
+    samples, rate, container = decode_audio(data)
+    channels = samples.shape[1]
+    pcm = to_pcm16(resample(downmix(samples), rate))
+
+    block = shared_memory.SharedMemory(create=True, size=max(pcm.nbytes, 1))
+    try:
+        np.ndarray(pcm.shape, dtype=pcm.dtype, buffer=block.buf)[:] = pcm
+    finally:
+        block.close()
+    return {
+        "name": block.name,
+        "nbytes": pcm.nbytes,
+        "container": container,
+        "source_sample_rate": rate,
+        "source_channels": channels,
+    }
+
+
+def _features_from_shared(name: str, nbytes: int, sample_rate: int, word_count: Optional[int]) -> Dict:
+    """Acoustic features over a shared PCM block (runs in a worker process)"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        pcm = block.buf[:nbytes]
+        try:
+            return extract_acoustic_features(pcm, sample_rate, word_count)
+        finally:
+            pcm.release()
+    finally:
+        block.close()
+
+
+def _discard_decoded(future):
+    """Done callback: free the block of a decode nobody is waiting for any more"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        block = shared_memory.SharedMemory(name=future.result()["name"])
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+class DecodedAudio:
+    """
+    16 kHz mono PCM held in shared memory.
+
+    Worker processes attach by name instead of receiving a pickled copy.
+    Call close() (or use as a context manager) to free the block.
+    """
+
+    def __init__(self, info: Dict):
+        self.name = info["name"]
+        self.nbytes = info["nbytes"]
+        self.sample_rate = TARGET_SAMPLE_RATE
+        self.sample_width = 2
+        self.container = info["container"]
+        self.source_sample_rate = info["source_sample_rate"]
+        self.source_channels = info["source_channels"]
+        self.block = shared_memory.SharedMemory(name=self.name)
+        self.pcm = self.block.buf[:self.nbytes]
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.nbytes / self.sample_width / self.sample_rate
+
+    def close(self):
+        if self.block is None:
+            return
+        self.pcm.release()
+        self.block.close()
+        self.block.unlink()
+        self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AudioFrontend:
+    """
+    Decoding and signal-processing stages in a process pool.
+
+    decode() turns an upload into a DecodedAudio in shared memory; later CPU
+    stages (acoustic features) run in the same pool against that block.
+    """
+
+    def __init__(self, workers: int = AUDIO_WORKERS):
+        self.workers = max(1, workers)
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    async def decode(self, data: bytes) -> DecodedAudio:
+        future = self._get_executor().submit(_decode_to_shared, data)
+        try:
+            info = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A running decode finishes anyway (e.g. after a wait_for timeout); unlink its block then
+            future.add_done_callback(_discard_decoded)
+            raise
+        return DecodedAudio(info)
+
+    async def extract_features(self, audio: DecodedAudio, word_count: Optional[int] = None) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), _features_from_shared,
+            audio.name, audio.nbytes, audio.sample_rate, word_count
+        )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Initialize the front-end
+audio_frontend = AudioFrontend()
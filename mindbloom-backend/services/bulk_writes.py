@@ -0,0 +1,202 @@
+import os
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import Collections
+
+# Bulk write configuration
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+DUPLICATE_KEY = 11000
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+# Natural keys, the same ones cleanup_duplicates.py and prevent_duplicates.py use
+NATURAL_KEYS = {
+    Collections.JOURNALS: ("user_id", "title", "created_at"),
+    Collections.MEMORIES: ("user_id", "title", "created_at"),
+    Collections.CALENDAR: ("user_id", "title", "date"),
+}
+# Fields the caller must supply for the natural key to identify an item; a
+# created_at filled in by the server would make every re-send a new item
+CLIENT_KEY_FIELDS = {
+    Collections.JOURNALS: ("created_at",),
+    Collections.MEMORIES: ("created_at",),
+    Collections.CALENDAR: (),
+}
+
+# Set only when a document is first created; upserts never overwrite them
+INSERT_ONLY_FIELDS = ("id", "created_at")
+
+
+def journal_document(data: Dict, doc_id: str, created_at: str) -> Dict:
+    return {
+        "id": doc_id,
+        "user_id": data.get("user_id", "1"),
+        "title": data.get("title", ""),
+        "content": data.get("content", ""),
+        "mood": data.get("mood", "neutral"),
+        "tags": data.get("tags", []),
+        "media_urls": data.get("media_urls", []),
+        "location": data.get("location"),
+        "people": data.get("people", []),
+        "is_pinned": data.get("is_pinned", False),
+        "created_at": created_at,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+def memory_document(data: Dict, doc_id: str, created_at: str) -> Dict:
+    return {
+        "id": doc_id,
+        "user_id": data.get("user_id", "1"),
+        "title": data.get("title", ""),
+        "description": data.get("description", ""),
+        "category": data.get("category", "general"),
+        "importance": data.get("importance", "medium"),
+        "mood": data.get("mood", "neutral"),
+        "tags": data.get("tags", []),
+        "patient_id": data.get("patient_id"),
+        "created_at": created_at,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+def calendar_document(data: Dict, doc_id: str, created_at: str) -> Dict:
+    return {
+        "id": doc_id,
+        "user_id": data.get("user_id", "1"),
+        "title": data.get("title", ""),
+        "description": data.get("description", ""),
+        "date": data.get("date", ""),
+        "start_time": data.get("start_time", ""),
+        "end_time": data.get("end_time", ""),
+        "event_type": data.get("event_type", "activity"),
+        "priority": data.get("priority", "medium"),
+        "completed": data.get("completed", False),
+        "patient_id": data.get("patient_id"),
+        "reminders": data.get("reminders", []),
+        "created_at": created_at,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+def _check_common(item: Dict) -> Optional[str]:
+    if not isinstance(item.get("title"), str) or not item["title"].strip():
+        return "title is required"
+    for name in ("tags", "media_urls", "people", "reminders"):
+        if name in item and not isinstance(item[name], list):
+            return f"{name} must be a list"
+    return None
+
+
+def _check_calendar(item: Dict) -> Optional[str]:
+    if not DATE_RE.match(str(item.get("date", ""))):
+        return "date must be YYYY-MM-DD"
+    for name in ("start_time", "end_time"):
+        if item.get(name) and not TIME_RE.match(str(item[name])):
+            return f"{name} must be HH:MM"
+    return None
+
+
+BUILDERS: Dict[str, Tuple[Callable, List[Callable]]] = {
+    Collections.JOURNALS: (journal_document, [_check_common]),
+    Collections.MEMORIES: (memory_document, [_check_common]),
+    Collections.CALENDAR: (calendar_document, [_check_common, _check_calendar]),
+}
+
+
+def prepare_items(collection: str, items: List) -> Tuple[List[Tuple[int, Dict, bool]], List[Dict]]:
+    """
+    Validate and build documents in one pass.
+
+    Returns (index, document, keyed) triples to write and the outcomes of
+    items rejected up front: invalid items and repeats of a natural key
+    already seen earlier in the same batch. keyed is False for journals and
+    memories without a client created_at; those are always inserted.
+    Client ids are ignored, as on the single-item endpoints.
+    """
+    build, checks = BUILDERS[collection]
+    key_fields = NATURAL_KEYS[collection]
+    now = datetime.utcnow().isoformat()
+
+    docs, outcomes, seen = [], [], {}
+    for index, item in enumerate(items):
+        error = "item must be an object" if not isinstance(item, dict) else None
+        for check in checks:
+            error = error or check(item)
+        if error:
+            outcomes.append({"index": index, "status": "invalid", "error": error})
+            continue
+
+        doc = build(item, str(ObjectId()), str(item.get("created_at") or now))
+        keyed = all(item.get(f) for f in CLIENT_KEY_FIELDS[collection])
+        if keyed:
+            key = tuple(doc.get(f) for f in key_fields)
+            if key in seen:
+                outcomes.append({"index": index, "status": "duplicate",
+                                 "error": f"same {', '.join(key_fields)} as item {seen[key]}"})
+                continue
+            seen[key] = index
+        docs.append((index, doc, keyed))
+    return docs, outcomes
+
+
+async def bulk_write_items(db, collection: str, items: List, upsert: bool = False) -> Dict:
+    """
+    Write a batch of items with one unordered bulk write of upserts on the
+    natural key.
+
+    By default an item whose natural key already exists is left alone and
+    reported as a duplicate; with upsert=True it updates the existing
+    document instead. Items without a natural key (see CLIENT_KEY_FIELDS)
+    are plain inserts. Every item gets an outcome (created, updated,
+    duplicate, invalid or failed); duplicate-key errors from unique indexes
+    are reported per item and never fail the batch.
+    """
+    docs, outcomes = prepare_items(collection, items)
+    key_fields = NATURAL_KEYS[collection]
+
+    operations = []
+    for _, doc, keyed in docs:
+        if not keyed:
+            operations.append(InsertOne(doc))
+            continue
+        if upsert:
+            fields = {k: v for k, v in doc.items() if k not in INSERT_ONLY_FIELDS}
+            update = {"$set": fields, "$setOnInsert": {k: doc[k] for k in INSERT_ONLY_FIELDS}}
+        else:
+            update = {"$setOnInsert": doc}
+        operations.append(UpdateOne({f: doc[f] for f in key_fields}, update, upsert=True))
+
+    errors, upserted = {}, set()
+    if operations:
+        try:
+            result = await db[collection].bulk_write(operations, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+
+    for position, (index, doc, keyed) in enumerate(docs):
+        error = errors.get(position)
+        if error is not None:
+            status = "duplicate" if error.get("code") == DUPLICATE_KEY else "failed"
+            outcomes.append({"index": index, "status": status, "error": error.get("errmsg")})
+        elif not keyed or position in upserted:
+            outcomes.append({"index": index, "status": "created", "id": doc["id"]})
+        elif upsert:
+            outcomes.append({"index": index, "status": "updated"})
+        else:
+            outcomes.append({"index": index, "status": "duplicate", "error": "already exists"})
+
+    outcomes.sort(key=lambda outcome: outcome["index"])
+    counts = {status: 0 for status in ("created", "updated", "duplicate", "invalid", "failed")}
+    for outcome in outcomes:
+        counts[outcome["status"]] += 1
+    return {**counts, "results": outcomes}
@@ -0,0 +1,235 @@
+import os
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import Database, Collections
+
+# Change stream configuration
+CHANGE_STREAMS_ENABLED = os.getenv("CHANGE_STREAMS_ENABLED", "true").lower() == "true"
+CHANGE_STREAM_CONSUMER = os.getenv("CHANGE_STREAM_CONSUMER", "api")  # Name the resume token is stored under
+TOKEN_SAVE_SECONDS = float(os.getenv("CHANGE_STREAM_TOKEN_SAVE_SECONDS", "5"))
+MAX_AWAIT_MS = 1000  # How long an idle getMore waits before the loop can save the token
+RETRY_MAX_SECONDS = 60
+
+# Watched collections and the entity name their events carry
+ENTITY_BY_COLLECTION = {
+    Collections.MEMORIES: "memory",
+    Collections.JOURNALS: "journal",
+    Collections.CALENDAR: "calendar_event",
+    Collections.PATIENTS: "patient",
+    Collections.CAREGIVERS: "caregiver",
+    Collections.USERS: "user",
+    Collections.INTERVIEW_CONTEXTS: "interview_context",
+}
+# Lookup fields copied from the changed document so subscribers can evict by them
+KEY_FIELDS = ("id", "user_id", "patient_id", "caregiver_id")
+
+# Operations an InvalidationEvent can carry
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+OP_DROP = "drop"  # Whole collection gone or renamed: drop everything cached for the entity
+OP_RESYNC = "resync"  # Events may have been missed: drop everything cached
+
+NOT_REPLICA_SET = 40573
+HISTORY_LOST = (286, 280)  # ChangeStreamHistoryLost, ChangeStreamFatalError
+SUBSCRIBE_ALL = "*"
+
+
+@dataclass
+class InvalidationEvent:
+    entity: str
+    operation: str
+    document_id: object = None
+    keys: Dict = field(default_factory=dict)
+    cluster_time: Optional[object] = None
+
+
+def _event_from_change(change: Dict) -> Optional[InvalidationEvent]:
+    entity = ENTITY_BY_COLLECTION.get((change.get("ns") or {}).get("coll"))
+    if entity is None:
+        return None
+    op = change["operationType"]
+    if op in ("insert", "replace"):
+        operation = OP_INSERT if op == "insert" else OP_UPDATE
+    elif op == "update":
+        operation = OP_UPDATE
+    elif op == "delete":
+        operation = OP_DELETE
+    elif op in ("drop", "rename"):
+        operation = OP_DROP
+    else:
+        return None
+    document = change.get("fullDocument") or {}
+    return InvalidationEvent(
+        entity=entity,
+        operation=operation,
+        document_id=(change.get("documentKey") or {}).get("_id"),
+        keys={k: document[k] for k in KEY_FIELDS if document.get(k) is not None},
+        cluster_time=change.get("clusterTime"),
+    )
+
+
+class ChangeEventBus:
+    """
+    Cross-worker cache invalidation from MongoDB change streams.
+
+    Every process tails one database-level change stream filtered to the
+    watched collections, so writes from any API worker or from scripts such
+    as cleanup_duplicates.py reach the in-process subscribers. Update events
+    look up the changed document but only its lookup fields are returned.
+    The resume token is saved every TOKEN_SAVE_SECONDS under the consumer
+    name; a restarted process resumes from it, and if the server no longer
+    has that history subscribers get a resync event and flush everything.
+
+    Change streams need a replica set (a single-node one is enough); on a
+    standalone server the bus stays off and caches fall back to their own
+    freshness checks.
+    """
+
+    def __init__(self, consumer: str = CHANGE_STREAM_CONSUMER):
+        self.consumer = consumer
+        self.subscribers: Dict[str, List[Callable]] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.live = False
+        self.stats = {"events": 0, "resyncs": 0, "errors": 0, "last_event_at": None}
+
+    def subscribe(self, entity: str, callback: Callable):
+        """Call callback(event) for every event of entity ("*" for all); callback may be async"""
+        self.subscribers.setdefault(entity, []).append(callback)
+
+    async def publish(self, event: InvalidationEvent):
+        callbacks = self.subscribers.get(event.entity, []) + self.subscribers.get(SUBSCRIBE_ALL, [])
+        for callback in callbacks:
+            try:
+                result = callback(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"⚠️ Cache subscriber failed on {event.entity} {event.operation}: {e}")
+
+    async def _resync(self):
+        self.stats["resyncs"] += 1
+        for entity in set(ENTITY_BY_COLLECTION.values()):
+            await self.publish(InvalidationEvent(entity=entity, operation=OP_RESYNC))
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Start tailing on the running event loop, unless CHANGE_STREAMS_ENABLED=false"""
+        if not CHANGE_STREAMS_ENABLED or self.task is not None or Database.database is None:
+            return None
+        self.task = asyncio.create_task(self._run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.live = False
+
+    def _tokens(self):
+        return Database.get_db()[Collections.CHANGE_STREAM_TOKENS]
+
+    async def _load_token(self) -> Optional[Dict]:
+        doc = await self._tokens().find_one({"_id": self.consumer})
+        return doc.get("token") if doc else None
+
+    async def _save_token(self, token: Optional[Dict]):
+        if token is None:
+            return
+        await self._tokens().update_one(
+            {"_id": self.consumer},
+            {"$set": {"token": token, "saved_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def _run(self):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(ENTITY_BY_COLLECTION)}}},
+            {"$project": {
+                "operationType": 1, "ns": 1, "documentKey": 1, "clusterTime": 1,
+                **{f"fullDocument.{k}": 1 for k in KEY_FIELDS},
+            }},
+        ]
+        delay = 1
+        try:
+            token = await self._load_token()
+        except PyMongoError as e:
+            print(f"⚠️ Could not load change stream resume token: {e}")
+            token = None
+        if token is None:
+            # Nothing to resume from, so nothing cached can be trusted either
+            await self._resync()
+
+        while True:
+            try:
+                db = Database.get_db()
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=token,
+                                    max_await_time_ms=MAX_AWAIT_MS) as stream:
+                    self.live = True
+                    delay = 1
+                    print(f"📡 Change stream bus listening ({'resumed' if token else 'from now'})")
+                    saved_at = time.monotonic()
+                    while stream.alive:
+                        change = await stream.try_next()
+                        if change is not None:
+                            if change["operationType"] == "invalidate":
+                                # Database dropped: the stream cannot continue from this token
+                                token = None
+                                await self._resync()
+                                break
+                            event = _event_from_change(change)
+                            if event is not None:
+                                self.stats["events"] += 1
+                                self.stats["last_event_at"] = datetime.utcnow()
+                                await self.publish(event)
+                        token = stream.resume_token or token
+                        if time.monotonic() - saved_at >= TOKEN_SAVE_SECONDS:
+                            await self._save_token(token)
+                            saved_at = time.monotonic()
+                self.live = False
+                continue
+            except asyncio.CancelledError:
+                await asyncio.shield(self._save_token(token))
+                raise
+            except OperationFailure as e:
+                self.live = False
+                if e.code == NOT_REPLICA_SET:
+                    print("⚠️ Change streams need a replica set; cache invalidation bus disabled")
+                    return
+                if e.code in HISTORY_LOST:
+                    print("⚠️ Change stream resume point is gone; resyncing caches")
+                    token = None
+                    await self._resync()
+                    continue
+                self.stats["errors"] += 1
+                print(f"⚠️ Change stream failed: {e}")
+            except PyMongoError as e:
+                self.live = False
+                self.stats["errors"] += 1
+                print(f"⚠️ Change stream interrupted: {e}")
+
+            # Resuming replays what happened while the stream was down; without a token it cannot
+            if token is None:
+                await self._resync()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+    def snapshot(self) -> Dict:
+        return {
+            "enabled": CHANGE_STREAMS_ENABLED,
+            "live": self.live,
+            "consumer": self.consumer,
+            "subscribers": {entity: len(callbacks) for entity, callbacks in self.subscribers.items()},
+            **self.stats,
+        }
+
+
+# Initialize the bus
+change_event_bus = ChangeEventBus()
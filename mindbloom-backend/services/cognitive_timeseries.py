@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from database import Database, Collections
+from services.interview_context import analysis_scores, SCORE_DIMENSIONS
+
+# Rollup granularities and the longest range each one serves
+GRANULARITY_RAW = "raw"
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+RAW_MAX_RANGE = timedelta(days=14)
+DAILY_MAX_RANGE = timedelta(days=180)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; convert aware datetimes to match"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def period_start(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the day, or of the ISO week (Monday), containing timestamp"""
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == GRANULARITY_WEEK:
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def pick_granularity(start: datetime, end: datetime) -> str:
+    """Coarsest useful resolution for a range: raw points, daily or weekly rollups"""
+    span = end - start
+    if span <= RAW_MAX_RANGE:
+        return GRANULARITY_RAW
+    if span <= DAILY_MAX_RANGE:
+        return GRANULARITY_DAY
+    return GRANULARITY_WEEK
+
+
+class CognitiveScoreSeries:
+    """
+    Score history per patient for trend charts.
+
+    Every analysis result is inserted into the cognitive_scores time-series
+    collection and folded into daily and weekly rollups (count, sum, min,
+    max per dimension) with one upsert each. Trend queries read raw points
+    for short ranges and the matching rollup otherwise, so a year of data
+    is at most 53 documents.
+    """
+
+    def _db(self):
+        return Database.get_db()
+
+    async def record(self, patient_id: str, analysis: Dict, source: str,
+                     timestamp: Optional[datetime] = None):
+        """Store the scores of one analysis result"""
+        scores = analysis_scores(analysis)
+        if not scores:
+            return
+        timestamp = timestamp or datetime.utcnow()
+        db = self._db()
+
+        await db[Collections.COGNITIVE_SCORES].insert_one({
+            "timestamp": timestamp,
+            "meta": {"patient_id": patient_id, "source": source},
+            **scores
+        })
+
+        updates = []
+        for granularity in (GRANULARITY_DAY, GRANULARITY_WEEK):
+            increments = {"count": 1}
+            minimums, maximums = {}, {}
+            for name, value in scores.items():
+                increments[f"scores.{name}.count"] = 1
+                increments[f"scores.{name}.sum"] = value
+                minimums[f"scores.{name}.min"] = value
+                maximums[f"scores.{name}.max"] = value
+            updates.append(UpdateOne(
+                {
+                    "patient_id": patient_id,
+                    "granularity": granularity,
+                    "period_start": period_start(timestamp, granularity),
+                },
+                {"$inc": increments, "$min": minimums, "$max": maximums},
+                upsert=True
+            ))
+        await db[Collections.COGNITIVE_SCORE_ROLLUPS].bulk_write(updates, ordered=False)
+
+    async def trend(self, patient_id: str, start: datetime, end: datetime,
+                    metrics: Optional[Iterable[str]] = None, granularity: Optional[str] = None) -> Dict:
+        """
+        Points per metric between start and end at raw, daily or weekly resolution.
+
+        Raw points are only served for ranges up to RAW_MAX_RANGE; longer
+        ranges raise ValueError.
+        """
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        metrics = [m for m in (metrics or SCORE_DIMENSIONS) if m in SCORE_DIMENSIONS]
+        granularity = granularity or pick_granularity(start, end)
+        if granularity == GRANULARITY_RAW and end - start > RAW_MAX_RANGE:
+            raise ValueError(f"granularity=raw is limited to {RAW_MAX_RANGE.days} days; use day or week")
+
+        if granularity == GRANULARITY_RAW:
+            points = await self._raw_points(patient_id, start, end, metrics)
+        else:
+            points = await self._rollup_points(patient_id, start, end, metrics, granularity)
+
+        return {
+            "patient_id": patient_id,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "metrics": metrics,
+            "points": points,
+        }
+
+    async def _raw_points(self, patient_id: str, start: datetime, end: datetime,
+                          metrics: List[str]) -> List[Dict]:
+        projection = {"_id": 0, "timestamp": 1, **{m: 1 for m in metrics}}
+        cursor = self._db()[Collections.COGNITIVE_SCORES].find(
+            {"meta.patient_id": patient_id, "timestamp": {"$gte": start, "$lt": end}},
+            projection
+        ).sort("timestamp", 1)
+
+        points = []
+        async for doc in cursor:
+            values = {m: doc[m] for m in metrics if m in doc}
+            if values:
+                points.append({"t": doc["timestamp"].isoformat(), "values": values})
+        return points
+
+    async def _rollup_points(self, patient_id: str, start: datetime, end: datetime,
+                             metrics: List[str], granularity: str) -> List[Dict]:
+        projection = {"_id": 0, "period_start": 1, "count": 1, **{f"scores.{m}": 1 for m in metrics}}
+        cursor = self._db()[Collections.COGNITIVE_SCORE_ROLLUPS].find(
+            {
+                "patient_id": patient_id,
+                "granularity": granularity,
+                "period_start": {"$gte": period_start(start, granularity), "$lt": end},
+            },
+            projection
+        ).sort("period_start", 1)
+
+        points = []
+        async for doc in cursor:
+            values = {}
+            for name, stats in (doc.get("scores") or {}).items():
+                values[name] = {
+                    "mean": round(stats["sum"] / stats["count"], 2),
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "count": stats["count"],
+                }
+            if values:
+                points.append({"t": doc["period_start"].isoformat(), "values": values})
+        return points
+
+
+# Initialize the series
+cognitive_score_series = CognitiveScoreSeries()
@@ -3,6 +3,7 @@ import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime
 import os
+import time
 import httpx
 
 # Try to import Gemini AI, with fallback if grpc is not available
@@ -20,13 +21,15 @@ if GEMINI_API_KEY and not GEMINI_AVAILABLE:
     print("🔑 Gemini API Key found, will use direct HTTP requests")
     GEMINI_AVAILABLE = True
 
-# import speech recognition
-try:
-    import speech_recognition as sr
-    SPEECH_RECOGNITION_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: speech_recognition not available: {e}")
-    SPEECH_RECOGNITION_AVAILABLE = False
+from services.transcription import transcription_pool
+from services.acoustic_features import acoustic_scores, add_word_rate
+from services.audio_decoding import audio_frontend
+from services.linguistic_features import extract_linguistic_features, linguistic_assessment, LINGUISTIC_SKIP_LLM
+from services.interview_context import interview_context_store
+from services.cognitive_timeseries import cognitive_score_series
+
+# Shared time budget for all stages of a voice response analysis
+VOICE_ANALYSIS_DEADLINE = float(os.getenv("VOICE_ANALYSIS_DEADLINE_SECONDS", "25"))
 
 if GEMINI_AVAILABLE and GEMINI_API_KEY:
     if 'genai' in locals():
@@ -51,31 +54,140 @@ class InterviewAnalysisService:
                 print(f"Warning: Could not initialize Gemini model: {e}")
                 self.model = None
         
-        # Initialize speech recognition
-        self.recognizer = None
-        if SPEECH_RECOGNITION_AVAILABLE:
-            try:
-                self.recognizer = sr.Recognizer()
-            except Exception as e:
-                print(f"Warning: Could not initialize speech recognition: {e}")
+        # Speech recognition runs in a worker pool, see services/transcription.py
+        self.transcriber = transcription_pool
         
-        self.interview_context = {}
+        # Shared across workers and restarts, see services/interview_context.py
+        self.context_store = interview_context_store
+        self.score_series = cognitive_score_series
         
     async def analyze_speech_patterns(self, audio_data: bytes, patient_id: str) -> Dict:
         """
         Analyze speech patterns for dementia indicators
         """
         try:
-            # Convert audio to text
-            if SPEECH_RECOGNITION_AVAILABLE and self.recognizer:
-                audio = sr.AudioData(audio_data, sample_rate=16000, sample_width=2)
-                text = self.recognizer.recognize_google(audio)
-            else:
-                # Fallback: simulate speech recognition
-                text = "Patient response to memory question about family traditions."
+            # Decode WAV/WebM/Ogg/MP3 to 16 kHz mono PCM in shared memory
+            with await audio_frontend.decode(audio_data) as audio:
+                # Transcription and acoustic features read the same buffer concurrently
+                text, features = await asyncio.gather(
+                    self.transcriber.transcribe_audio(audio),
+                    audio_frontend.extract_features(audio)
+                )
+            add_word_rate(features, len(text.split()))
+            return await self.analyze_speech_text(text, patient_id, features)
             
-            # Analyze with Gemini if available
-            if GEMINI_AVAILABLE and self.model:
+        except Exception as e:
+            return {
+                'error': str(e),
+                'transcribed_text': '',
+                'analysis': {}
+            }
+    
+    async def analyze_voice_response(self, audio_data: bytes, question: str, patient_id: str,
+                                     deadline_seconds: float = VOICE_ANALYSIS_DEADLINE,
+                                     client_transcription: Optional[str] = None) -> Dict:
+        """
+        Full analysis of a recorded answer under one deadline.
+        
+        Stages run as soon as their inputs exist: transcription and acoustic
+        features in parallel after decoding, then speech analysis, response
+        analysis and memory retrieval in parallel on the transcript. A stage
+        that misses the deadline or fails is reported in timings and its
+        result left as None, so the caller still gets everything else.
+        When the audio cannot be decoded or transcribed, the transcript the
+        browser produced (if any) drives the text-only stages instead.
+        """
+        started = time.monotonic()
+        deadline = started + deadline_seconds
+        timings = {}
+        
+        async def stage(name: str, awaitable):
+            stage_start = time.monotonic()
+            result, status, error = None, "ok", None
+            try:
+                result = await asyncio.wait_for(awaitable, timeout=max(0.0, deadline - stage_start))
+            except asyncio.TimeoutError:
+                status = "timeout"
+            except Exception as e:
+                status, error = "error", str(e)
+            timings[name] = {
+                "status": status,
+                "started_ms": round((stage_start - started) * 1000, 1),
+                "duration_ms": round((time.monotonic() - stage_start) * 1000, 1),
+            }
+            if error:
+                timings[name]["error"] = error
+            return result
+        
+        def skipped(*names):
+            for name in names:
+                timings.setdefault(name, {"status": "skipped"})
+        
+        async def analyze_text(text: str, features_task: Optional[asyncio.Task] = None):
+            async def speech():
+                features = await features_task if features_task else None
+                if features is not None:
+                    add_word_rate(features, len(text.split()))
+                return await self.analyze_speech_text(text, patient_id, features)
+            
+            return await asyncio.gather(
+                stage("speech_analysis", speech()),
+                stage("response_analysis", self.analyze_response_to_question(question, text, patient_id)),
+                stage("memory_retrieval", self.find_relevant_memories(text, patient_id, question))
+            )
+        
+        results = {"speech_analysis": None, "response_analysis": None, "memory_suggestions": None}
+        text = None
+        transcription_source = None
+        features_task = None
+        audio = await stage("decode", audio_frontend.decode(audio_data))
+        if audio is None:
+            skipped("transcription", "acoustic_features")
+        else:
+            with audio:
+                features_task = asyncio.create_task(stage("acoustic_features", audio_frontend.extract_features(audio)))
+                text = await stage("transcription", self.transcriber.transcribe_audio(audio))
+                if text is not None:
+                    transcription_source = "server"
+                    (results["speech_analysis"], results["response_analysis"],
+                     results["memory_suggestions"]) = await analyze_text(text, features_task)
+                else:
+                    # Features read the shared buffer, so they finish before it is released
+                    await features_task
+        
+        if text is None and client_transcription and client_transcription.strip():
+            text = client_transcription
+            transcription_source = "client"
+            (results["speech_analysis"], results["response_analysis"],
+             results["memory_suggestions"]) = await analyze_text(text, features_task)
+        elif text is None:
+            skipped("speech_analysis", "response_analysis", "memory_retrieval")
+        
+        return {
+            **results,
+            "transcription": text,
+            "transcription_source": transcription_source,
+            "question": question,
+            "patient_id": patient_id,
+            "partial": any(t["status"] != "ok" for t in timings.values()),
+            "timings": timings,
+            "total_ms": round((time.monotonic() - started) * 1000, 1),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    async def analyze_speech_text(self, text: str, patient_id: str,
+                                  acoustic_features: Optional[Dict] = None) -> Dict:
+        """
+        Analyze an already transcribed speech sample for dementia indicators
+        """
+        try:
+            measured = acoustic_scores(acoustic_features) if acoustic_features else {}
+            lexical = extract_linguistic_features(text)
+            local = linguistic_assessment(lexical)
+            
+            # Analyze with Gemini if available and the local features are not conclusive
+            use_llm = GEMINI_AVAILABLE and self.model and not (LINGUISTIC_SKIP_LLM and local["confident"])
+            if use_llm:
                 analysis_prompt = f"""
                 Analyze this speech sample for dementia indicators. Focus on:
                 1. Speech fluency and coherence
@@ -86,42 +198,43 @@ class InterviewAnalysisService:
                 
                 Speech: "{text}"
                 
+                Measured acoustic features (pauses, speech rate, prosody): {json.dumps(acoustic_features or {})}
+                Measured lexical features: {json.dumps(lexical)}
+                
                 Provide analysis in JSON format with scores (0-10) and detailed observations.
                 """
                 
                 response = await self._get_gemini_response(analysis_prompt)
                 analysis = json.loads(response)
             else:
-                # Fallback analysis
+                # Local analysis: only what the lexical features measure
                 analysis = {
-                    "speech_fluency": 8.5,
-                    "word_finding": 7.0,
-                    "memory_recall": 8.0,
-                    "emotional_state": "positive",
-                    "cognitive_coherence": 8.5,
-                    "dementia_risk": "low",
-                    "observations": [
-                        "Clear speech patterns",
-                        "Good word-finding abilities",
-                        "Coherent memory recall",
-                        "Positive emotional engagement"
-                    ]
+                    "speech_fluency": local["speech_fluency"],
+                    "word_finding": local["word_finding"],
+                    "cognitive_coherence": local["cognitive_coherence"],
+                    "word_finding_difficulty": local["word_finding_difficulty"],
+                    "observations": local["observations"]
                 }
             
-            # Store context for patient
-            if patient_id not in self.interview_context:
-                self.interview_context[patient_id] = {
-                    'speech_samples': [],
-                    'cognitive_scores': [],
-                    'emotional_states': [],
-                    'memory_patterns': []
-                }
+            # Measured fluency and word-finding take precedence over text-only estimates
+            if measured:
+                analysis.update(measured)
+            analysis["linguistic_features"] = lexical
+            analysis["analysis_source"] = "gemini" if use_llm else "local"
+            if acoustic_features:
+                analysis["acoustic_features"] = acoustic_features
             
-            self.interview_context[patient_id]['speech_samples'].append({
-                'text': text,
-                'analysis': analysis,
-                'timestamp': datetime.now().isoformat()
-            })
+            # Store context for patient and the scores for trend charts
+            await asyncio.gather(
+                self.context_store.append(patient_id, {
+                    'speech_samples': {
+                        'text': text,
+                        'analysis': analysis,
+                        'timestamp': datetime.utcnow()
+                    }
+                }),
+                self.score_series.record(patient_id, analysis, 'speech')
+            )
             
             return {
                 'transcribed_text': text,
@@ -141,13 +254,19 @@ class InterviewAnalysisService:
         Analyze patient's response to specific memory questions
         """
         try:
-            if GEMINI_AVAILABLE and self.model:
+            lexical = extract_linguistic_features(response_text)
+            local = linguistic_assessment(lexical)
+            
+            use_llm = GEMINI_AVAILABLE and self.model and not (LINGUISTIC_SKIP_LLM and local["confident"])
+            if use_llm:
                 analysis_prompt = f"""
                 Analyze this dementia patient's response to a memory question.
                 
                 Question: "{question}"
                 Patient Response: "{response_text}"
                 
+                Measured lexical features: {json.dumps(lexical)}
+                
                 Analyze for:
                 1. Memory recall accuracy (0-10)
                 2. Emotional engagement (0-10)
@@ -162,38 +281,30 @@ class InterviewAnalysisService:
                 response = await self._get_gemini_response(analysis_prompt)
                 analysis = json.loads(response)
             else:
-                # Fallback analysis
+                # Local analysis: only what the lexical features measure
                 analysis = {
-                    "memory_recall_accuracy": 8.5,
-                    "emotional_engagement": 9.0,
-                    "cognitive_coherence": 8.0,
-                    "memory_type": "episodic",
+                    "cognitive_coherence": local["cognitive_coherence"],
                     "dementia_indicators": {
-                        "word_finding_difficulty": "low",
-                        "memory_consistency": "high",
-                        "emotional_stability": "stable"
+                        "word_finding_difficulty": local["word_finding_difficulty"]
                     },
-                    "care_recommendations": [
-                        "Continue memory exercises",
-                        "Encourage social interaction",
-                        "Monitor for any changes in speech patterns"
-                    ],
-                    "observations": [
-                        "Patient shows strong episodic memory recall",
-                        "Emotional engagement is high and positive",
-                        "Speech patterns are clear and coherent",
-                        "Good word-finding abilities demonstrated"
-                    ]
+                    "observations": local["observations"]
                 }
             
-            # Update patient context
-            if patient_id in self.interview_context:
-                self.interview_context[patient_id]['memory_patterns'].append({
-                    'question': question,
-                    'response': response_text,
-                    'analysis': analysis,
-                    'timestamp': datetime.now().isoformat()
-                })
+            analysis["linguistic_features"] = lexical
+            analysis["analysis_source"] = "gemini" if use_llm else "local"
+            
+            # Update patient context and the score history
+            await asyncio.gather(
+                self.context_store.append(patient_id, {
+                    'memory_patterns': {
+                        'question': question,
+                        'response': response_text,
+                        'analysis': analysis,
+                        'timestamp': datetime.utcnow()
+                    }
+                }),
+                self.score_series.record(patient_id, analysis, 'response')
+            )
             
             return {
                 'question': question,
@@ -213,17 +324,19 @@ class InterviewAnalysisService:
         Generate comprehensive interview summary and recommendations
         """
         try:
-            if patient_id not in self.interview_context:
+            # Running aggregates and a bounded recent window, never the full history
+            context = await self.context_store.get_summary_view(patient_id)
+            if context is None:
                 return {'error': 'No interview data found for patient'}
-            
-            context = self.interview_context[patient_id]
+            aggregates = context['aggregates']
             
             if GEMINI_AVAILABLE and self.model:
                 summary_prompt = f"""
                 Generate a comprehensive dementia assessment summary based on interview data.
                 
-                Speech Samples: {len(context['speech_samples'])}
-                Memory Responses: {len(context['memory_patterns'])}
+                Sample counts: {json.dumps(aggregates['sample_counts'])}
+                Score statistics (0-10, mean/std/min/max over all sessions): {json.dumps(aggregates['scores'])}
+                Emotional states observed: {json.dumps(aggregates['emotional_states'])}
                 
                 Analyze patterns across all responses and provide:
                 1. Overall cognitive assessment
@@ -260,7 +373,8 @@ class InterviewAnalysisService:
             return {
                 'patient_id': patient_id,
                 'summary': summary,
-                'interview_data': context,
+                'aggregates': aggregates,
+                'recent': context['recent'],
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -309,6 +423,7 @@ class InterviewAnalysisService:
             
             return {
                 'feedback': feedback,
+                'linguistic_features': extract_linguistic_features(current_response),
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -383,11 +498,11 @@ class InterviewAnalysisService:
             print(f"Gemini HTTP request error: {str(e)}")
             return '{"error": "Gemini HTTP request error"}'
     
-    def get_patient_context(self, patient_id: str) -> Dict:
+    async def get_patient_context(self, patient_id: str) -> Dict:
         """
         Get stored context for a patient
         """
-        return self.interview_context.get(patient_id, {})
+        return self.context_store.lists(await self.context_store.get(patient_id))
     
     async def find_relevant_memories(self, current_response: str, patient_id: str, question: str) -> Dict:
         """
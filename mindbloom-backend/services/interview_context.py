@@ -0,0 +1,260 @@
+import os
+import re
+import math
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from database import Database, Collections
+from services.change_events import change_event_bus, InvalidationEvent, OP_DROP, OP_RESYNC
+
+# Context store configuration
+CONTEXT_CACHE_SIZE = int(os.getenv("INTERVIEW_CONTEXT_CACHE_SIZE", "512"))  # Patients kept per process
+CONTEXT_MAX_SAMPLES = int(os.getenv("INTERVIEW_CONTEXT_MAX_SAMPLES", "200"))  # Entries kept per list
+
+CONTEXT_RECENT_WINDOW = int(os.getenv("INTERVIEW_SUMMARY_WINDOW", "5"))  # Entries per list in summaries
+
+CONTEXT_LISTS = ("speech_samples", "cognitive_scores", "emotional_states", "memory_patterns")
+
+# 0-10 scores tracked with running aggregates
+SCORE_DIMENSIONS = (
+    "speech_fluency", "word_finding", "memory_recall", "memory_recall_accuracy",
+    "cognitive_coherence", "emotional_engagement",
+)
+
+
+def analysis_scores(analysis: Dict) -> Dict[str, float]:
+    """Numeric score dimensions present in an analysis result"""
+    scores = {}
+    for name in SCORE_DIMENSIONS:
+        value = analysis.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+            scores[name] = float(value)
+    return scores
+
+
+def analysis_emotional_state(analysis: Dict) -> Optional[str]:
+    """Emotional state label of an analysis result, safe to use as a field name"""
+    state = analysis.get("emotional_state") or (analysis.get("dementia_indicators") or {}).get("emotional_stability")
+    if not isinstance(state, str) or not state.strip():
+        return None
+    return re.sub(r"[^a-z0-9]+", "_", state.strip().lower())[:40].strip("_") or None
+
+
+def _welford_update(field: str, value: float) -> Dict:
+    """
+    Pipeline expressions applying one Welford step to {n, mean, m2, min, max} at field.
+
+    All expressions read the pre-update document, so the new mean is
+    computed inline where M2 needs it.
+    """
+    n = {"$ifNull": [f"${field}.n", 0]}
+    mean = {"$ifNull": [f"${field}.mean", 0.0]}
+    delta = {"$subtract": [value, mean]}
+    new_mean = {"$add": [mean, {"$divide": [delta, {"$add": [n, 1]}]}]}
+    return {
+        f"{field}.n": {"$add": [n, 1]},
+        f"{field}.mean": new_mean,
+        f"{field}.m2": {"$add": [{"$ifNull": [f"${field}.m2", 0.0]},
+                                 {"$multiply": [delta, {"$subtract": [value, new_mean]}]}]},
+        f"{field}.min": {"$min": [{"$ifNull": [f"${field}.min", value]}, value]},
+        f"{field}.max": {"$max": [{"$ifNull": [f"${field}.max", value]}, value]},
+    }
+
+
+def summarize_aggregates(aggregates: Optional[Dict]) -> Dict:
+    """Mean, sample standard deviation and range per score, plus emotional state counts"""
+    aggregates = aggregates or {}
+    scores = {}
+    for name, stats in (aggregates.get("scores") or {}).items():
+        n = stats.get("n", 0)
+        scores[name] = {
+            "count": n,
+            "mean": round(stats.get("mean", 0.0), 2),
+            "std": round(math.sqrt(stats.get("m2", 0.0) / (n - 1)), 2) if n > 1 else 0.0,
+            "min": stats.get("min"),
+            "max": stats.get("max"),
+        }
+    return {
+        "sample_counts": aggregates.get("counts") or {},
+        "scores": scores,
+        "emotional_states": aggregates.get("emotional_states") or {},
+    }
+
+
+class InterviewContextStore:
+    """
+    Per-patient interview context in the interview_contexts collection.
+
+    Appends are single atomic pipeline updates, so concurrent uvicorn
+    workers never lose samples, each list keeps only the newest
+    CONTEXT_MAX_SAMPLES entries and running aggregates (Welford mean and
+    variance per score, emotional state counts) cover the full history. Every
+    process keeps a bounded LRU of the documents it has read, and summaries
+    and pages are cut from it. While the change event bus is live,
+    writes from any worker evict the entry and cached reads need no round
+    trip; otherwise a read first compares the cached version with the
+    stored one (an _id lookup returning one field), so all workers serve
+    the same context. A read that overlaps an eviction of its key is
+    returned but not cached, since it may predate the write.
+    """
+
+    def __init__(self, cache_size: int = CONTEXT_CACHE_SIZE, max_samples: int = CONTEXT_MAX_SAMPLES):
+        self.cache_size = max(1, cache_size)
+        self.max_samples = max_samples
+        self.cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self.fills: Dict[str, object] = {}  # Token of the read in flight per key; evictions drop it
+        change_event_bus.subscribe("interview_context", self._on_change)
+
+    def _on_change(self, event: InvalidationEvent):
+        if event.operation in (OP_DROP, OP_RESYNC):
+            self.cache.clear()
+            self.fills.clear()
+        else:
+            self._evict(event.document_id)
+
+    def _evict(self, patient_id: str):
+        self.cache.pop(patient_id, None)
+        self.fills.pop(patient_id, None)
+
+    def _collection(self):
+        return Database.get_db()[Collections.INTERVIEW_CONTEXTS]
+
+    def _remember(self, patient_id: str, doc: Dict):
+        self.cache[patient_id] = doc
+        self.cache.move_to_end(patient_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def append(self, patient_id: str, entries: Dict[str, Dict]) -> Dict:
+        """
+        Append entries ({list name: entry}) for a patient.
+
+        The capped lists, the running aggregates of every entry's analysis
+        and the version all change in one pipeline update. Returns the new
+        version and aggregates only; the lists are not sent back, so the
+        cached copy is dropped and the next get() reloads it.
+        """
+        new_version = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+        update = {
+            "version": new_version,
+            "updated_at": datetime.utcnow(),
+        }
+        for name, entry in entries.items():
+            # seq (the new version) gives entries a stable position for pagination
+            stored = {"$mergeObjects": [{"$literal": entry}, {"seq": new_version}]}
+            update[name] = {"$slice": [
+                {"$concatArrays": [{"$ifNull": [f"${name}", []]}, [stored]]},
+                -self.max_samples
+            ]}
+            update[f"aggregates.counts.{name}"] = {"$add": [{"$ifNull": [f"$aggregates.counts.{name}", 0]}, 1]}
+
+        # One Welford step per score dimension; several entries in one call update the same field only once
+        scores, states = {}, {}
+        for entry in entries.values():
+            analysis = entry.get("analysis") or {}
+            scores.update(analysis_scores(analysis))
+            state = analysis_emotional_state(analysis)
+            if state:
+                states[state] = states.get(state, 0) + 1
+        for name, value in scores.items():
+            update.update(_welford_update(f"aggregates.scores.{name}", value))
+        for state, count in states.items():
+            field = f"aggregates.emotional_states.{state}"
+            update[field] = {"$add": [{"$ifNull": [f"${field}", 0]}, count]}
+
+        doc = await self._collection().find_one_and_update(
+            {"_id": patient_id},
+            [{"$set": update}],
+            projection={"_id": 0, "version": 1, "aggregates": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._evict(patient_id)
+        return doc
+
+    async def get(self, patient_id: str) -> Optional[Dict]:
+        """Current context for a patient, or None if there is none"""
+        collection = self._collection()
+        cached = self.cache.get(patient_id)
+        if cached is not None and change_event_bus.live:
+            self.cache.move_to_end(patient_id)
+            return cached
+        if cached is not None:
+            stored = await collection.find_one({"_id": patient_id}, {"version": 1})
+            if stored is not None and stored.get("version") == cached.get("version"):
+                self.cache.move_to_end(patient_id)
+                return cached
+
+        token = object()
+        self.fills[patient_id] = token
+        try:
+            doc = await collection.find_one({"_id": patient_id})
+        finally:
+            # Still ours only if nothing evicted the key (or started a newer read) meanwhile
+            fresh = self.fills.get(patient_id) is token
+            if fresh:
+                del self.fills[patient_id]
+        if doc is None:
+            self.cache.pop(patient_id, None)
+            return None
+        if fresh:
+            self._remember(patient_id, doc)
+        return doc
+
+    async def get_summary_view(self, patient_id: str, recent: int = CONTEXT_RECENT_WINDOW) -> Optional[Dict]:
+        """
+        Aggregates plus the newest entries of each list.
+
+        Served from the cached document, whose lists are capped at
+        max_samples, so the payload does not depend on how much history the
+        patient has.
+        """
+        doc = await self.get(patient_id)
+        if doc is None:
+            return None
+        return {
+            "aggregates": summarize_aggregates(doc.get("aggregates")),
+            "recent": {name: doc.get(name, [])[-recent:] if recent > 0 else [] for name in CONTEXT_LISTS},
+        }
+
+    async def page(self, patient_id: str, list_name: str, limit: int, before_seq: Optional[int] = None,
+                   since: Optional[datetime] = None, until: Optional[datetime] = None) -> Tuple[Optional[List[Dict]], bool]:
+        """
+        Newest-first page of one list, filtered from the cached document.
+
+        since/until are naive UTC and compared with the entry timestamps.
+        Returns (entries, has_more); entries is None when the patient has no
+        context.
+        """
+        doc = await self.get(patient_id)
+        if doc is None:
+            return None, False
+
+        entries = []
+        for entry in reversed(doc.get(list_name) or []):
+            if before_seq is not None and entry.get("seq", 0) >= before_seq:
+                continue
+            if since or until:
+                timestamp = entry.get("timestamp")
+                if not isinstance(timestamp, datetime):
+                    continue
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+            entries.append(entry)
+            if len(entries) > limit:
+                break
+        return entries[:limit], len(entries) > limit
+
+    @staticmethod
+    def lists(doc: Optional[Dict]) -> Dict:
+        """The sample lists of a context document, as the API has always returned them"""
+        if doc is None:
+            return {}
+        return {name: doc.get(name, []) for name in CONTEXT_LISTS}
+
+
+# Initialize the store
+interview_context_store = InterviewContextStore()
@@ -0,0 +1,190 @@
+import os
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Local analysis configuration
+LINGUISTIC_SKIP_LLM = os.getenv("LINGUISTIC_SKIP_LLM", "true").lower() == "true"
+MIN_TOKENS_FOR_LOCAL = 25  # Shorter answers are too noisy to judge without the LLM
+MATTR_WINDOW = 25
+
+# Words, ellipses, dashes and cut-off words ("I- I went"); hyphenated words stay whole
+TOKEN_RE = re.compile(r"[a-z]+(?:['-][a-z]+)*|\.{3}|…|--|(?<=[a-z])-(?![a-z])")
+UTTERANCE_RE = re.compile(r"[.!?]+|\n+")
+
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "er", "erm", "ah", "hmm", "mm"}
+VAGUE_WORDS = {"thing", "things", "stuff", "something", "whatsit", "whatchamacallit", "thingy"}
+HESITATION_TOKENS = {"...", "…", "-", "--"}
+HESITATION_PHRASES = ("you know", "i mean", "what's it called", "what is it called",
+                      "i don't remember", "i can't remember", "i forget", "let me think")
+PRONOUNS = {
+    "i", "me", "my", "mine", "you", "your", "yours", "he", "him", "his", "she", "her", "hers",
+    "it", "its", "we", "us", "our", "ours", "they", "them", "their", "theirs",
+    "this", "that", "these", "those", "there", "here", "someone", "somebody",
+}
+# Closed-class words and common verbs; what is left approximates the nouns
+FUNCTION_WORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "if", "then", "because", "of", "in", "on", "at",
+    "to", "for", "with", "from", "by", "about", "as", "into", "up", "down", "out", "over", "after",
+    "before", "not", "no", "yes", "very", "just", "really", "too", "also", "all", "some", "any",
+    "is", "am", "are", "was", "were", "be", "been", "being", "do", "did", "does", "done", "have",
+    "has", "had", "go", "went", "gone", "get", "got", "make", "made", "say", "said", "see", "saw",
+    "know", "knew", "think", "thought", "remember", "like", "would", "could", "should", "will",
+    "can", "may", "might", "must", "what", "when", "where", "who", "why", "how", "which", "well",
+    "oh", "yeah", "okay", "ok", "more", "most", "much", "many", "one", "two", "back", "again",
+    "always", "never", "still", "now", "than", "there's", "it's", "i'm", "don't", "didn't", "can't",
+    "we'd", "we'll", "i'd", "i've", "used", "lot", "little", "big", "good", "great", "nice",
+}
+
+# Token classes looked up by vocabulary id
+CLASS_FILLER, CLASS_VAGUE, CLASS_HESITATION, CLASS_PRONOUN, CLASS_FUNCTION, CLASS_CONTENT = range(6)
+
+
+def _token_class(token: str) -> int:
+    if token in FILLER_WORDS:
+        return CLASS_FILLER
+    if token in VAGUE_WORDS:
+        return CLASS_VAGUE
+    if token in HESITATION_TOKENS:
+        return CLASS_HESITATION
+    if token in PRONOUNS:
+        return CLASS_PRONOUN
+    if token in FUNCTION_WORDS or token.endswith("ly"):
+        return CLASS_FUNCTION
+    return CLASS_CONTENT
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray, n_docs: int) -> np.ndarray:
+    """Per-document sums of a flat token array"""
+    return np.bincount(offsets, weights=values, minlength=n_docs).astype(np.float64)
+
+
+def _mattr(ids: np.ndarray, window: int) -> float:
+    """Moving-average type-token ratio; stable across answer lengths unlike plain TTR"""
+    if ids.size <= window:
+        return float(np.unique(ids).size / ids.size) if ids.size else 0.0
+    windows = np.lib.stride_tricks.sliding_window_view(ids, window)
+    sorted_windows = np.sort(windows, axis=1)
+    types = 1 + np.count_nonzero(sorted_windows[:, 1:] != sorted_windows[:, :-1], axis=1)
+    return float(types.mean() / window)
+
+
+def extract_linguistic_features_batch(transcripts: Sequence[str]) -> List[Dict]:
+    """
+    Lexical features for many transcripts at once.
+
+    All tokens are mapped to vocabulary ids in one flat array with a document
+    index, so counts, type counts and repetitions are computed with a handful
+    of NumPy reductions regardless of how many transcripts are passed.
+    """
+    n_docs = len(transcripts)
+    lowered = [text.lower() for text in transcripts]
+    tokenized = [TOKEN_RE.findall(text) for text in lowered]
+
+    vocab: Dict[str, int] = {}
+    flat_ids = []
+    for tokens in tokenized:
+        flat_ids.extend(vocab.setdefault(token, len(vocab)) for token in tokens)
+    ids = np.asarray(flat_ids, dtype=np.int64)
+    lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.int64, count=n_docs)
+    doc = np.repeat(np.arange(n_docs), lengths)
+    starts = np.concatenate([[0], np.cumsum(lengths)])
+
+    classes = np.fromiter((_token_class(token) for token in vocab), dtype=np.int8, count=len(vocab))
+    token_class = classes[ids] if ids.size else np.empty(0, dtype=np.int8)
+    is_word = token_class != CLASS_HESITATION
+
+    words = _segment_sums(is_word.astype(np.float64), doc, n_docs)
+    fillers = _segment_sums((token_class == CLASS_FILLER).astype(np.float64), doc, n_docs)
+    vague = _segment_sums((token_class == CLASS_VAGUE).astype(np.float64), doc, n_docs)
+    hesitation_marks = _segment_sums((token_class == CLASS_HESITATION).astype(np.float64), doc, n_docs)
+    pronouns = _segment_sums((token_class == CLASS_PRONOUN).astype(np.float64), doc, n_docs)
+    nouns = _segment_sums(((token_class == CLASS_CONTENT) | (token_class == CLASS_VAGUE)).astype(np.float64), doc, n_docs)
+
+    # Distinct word types per document: unique (document, token) pairs
+    word_pairs = doc[is_word] * max(len(vocab), 1) + ids[is_word]
+    types = np.bincount(np.unique(word_pairs) // max(len(vocab), 1), minlength=n_docs).astype(np.float64)
+
+    # Immediate repetitions ("the the", "I I") within a document
+    same_doc = doc[1:] == doc[:-1]
+    repeated = same_doc & (ids[1:] == ids[:-1]) & is_word[1:]
+    repetitions = _segment_sums(repeated.astype(np.float64), doc[1:], n_docs)
+
+    results = []
+    for i in range(n_docs):
+        n_words = words[i]
+        utterances = [u for u in UTTERANCE_RE.split(transcripts[i]) if u.strip()]
+        phrase_hits = sum(lowered[i].count(phrase) for phrase in HESITATION_PHRASES)
+        word_ids = ids[starts[i]:starts[i + 1]][is_word[starts[i]:starts[i + 1]]]
+        results.append({
+            "word_count": int(n_words),
+            "utterance_count": len(utterances),
+            "mean_utterance_length": round(n_words / len(utterances), 2) if utterances else 0.0,
+            "type_token_ratio": round(types[i] / n_words, 3) if n_words else 0.0,
+            "mattr": round(_mattr(word_ids, MATTR_WINDOW), 3),
+            "filler_rate": round(fillers[i] / n_words, 3) if n_words else 0.0,
+            "vague_word_rate": round(vague[i] / n_words, 3) if n_words else 0.0,
+            "repetition_rate": round(repetitions[i] / n_words, 3) if n_words else 0.0,
+            "pronoun_noun_ratio": round(pronouns[i] / nouns[i], 2) if nouns[i] else None,
+            "hesitation_markers": int(hesitation_marks[i] + phrase_hits),
+        })
+    return results
+
+
+def extract_linguistic_features(transcript: str) -> Dict:
+    """Lexical features for a single transcript"""
+    return extract_linguistic_features_batch([transcript])[0]
+
+
+def linguistic_assessment(features: Dict) -> Dict:
+    """
+    Local 0-10 scores and observations from lexical features.
+
+    confident is True only when the answer is long enough and every
+    indicator is clearly inside the typical range, in which case an LLM
+    opinion adds little. Atypical answers always deserve a closer look.
+    Nothing is reported that the features do not measure.
+    """
+    n_words = features["word_count"]
+    filler = features["filler_rate"] + features["vague_word_rate"]
+    diversity = features["mattr"]
+    pronoun_ratio = features["pronoun_noun_ratio"] if features["pronoun_noun_ratio"] is not None else 3.0
+    hesitation_rate = features["hesitation_markers"] / n_words if n_words else 0.0
+
+    # Typical conversational speech: MATTR around 0.7+, filler+vague under 5%, pronouns ~1 per noun
+    diversity_score = np.clip((diversity - 0.45) / 0.3, 0.0, 1.0)
+    filler_score = np.clip(1.0 - (filler - 0.03) / 0.12, 0.0, 1.0)
+    pronoun_score = np.clip(1.0 - (pronoun_ratio - 1.0) / 2.0, 0.0, 1.0)
+    fluency_score = np.clip(1.0 - (features["repetition_rate"] + hesitation_rate - 0.02) / 0.1, 0.0, 1.0)
+
+    word_finding = 10.0 * (0.6 * filler_score + 0.4 * pronoun_score)
+    coherence = 10.0 * (0.4 * diversity_score + 0.3 * fluency_score + 0.3 * pronoun_score)
+    components = np.array([diversity_score, filler_score, pronoun_score, fluency_score])
+
+    if word_finding >= 7.0:
+        difficulty = "low"
+    elif word_finding >= 4.0:
+        difficulty = "moderate"
+    else:
+        difficulty = "high"
+
+    observations = [
+        f"{n_words} words in {features['utterance_count']} utterances "
+        f"({features['mean_utterance_length']} words per utterance)",
+        f"Lexical diversity (MATTR) {diversity:.2f}",
+        f"Fillers and vague words make up {filler:.0%} of words",
+        f"{features['hesitation_markers']} hesitation markers, "
+        f"{features['repetition_rate']:.0%} immediate repetitions",
+    ]
+    if features["pronoun_noun_ratio"] is not None:
+        observations.append(f"{features['pronoun_noun_ratio']} pronouns per noun")
+
+    return {
+        "speech_fluency": round(float(10.0 * fluency_score), 1),
+        "word_finding": round(float(word_finding), 1),
+        "cognitive_coherence": round(float(coherence), 1),
+        "word_finding_difficulty": difficulty,
+        "observations": observations,
+        "confident": bool(n_words >= MIN_TOKENS_FOR_LOCAL and components.min() >= 0.8),
+    }
@@ -0,0 +1,477 @@
+import os
+import asyncio
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import aiofiles
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from database import Database, Collections
+from services.ai_service import AIService
+
+# Analysis pipeline configuration
+ANALYSIS_WORKERS = int(os.getenv("MEDIA_ANALYSIS_WORKERS", "4"))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("MEDIA_ANALYSIS_QUEUE_SIZE", "256"))
+ANALYSIS_LEASE_SECONDS = int(os.getenv("MEDIA_ANALYSIS_LEASE_SECONDS", "600"))  # Claimed jobs not finished by then are retried
+ANALYSIS_SWEEP_SECONDS = int(os.getenv("MEDIA_ANALYSIS_SWEEP_SECONDS", "60"))  # How often deferred and expired jobs are claimed
+
+# Values of media.analysis_status
+STATUS_PENDING = "pending"
+STATUS_DEFERRED = "deferred"
+STATUS_QUEUED = "queued"  # Claimed by analysis_owner until analysis_lease_until
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class AnalysisJob:
+    file_path: str
+    digest: Optional[str] = None  # Content-addressed upload: the claim lives on the blob
+    media_id: object = None  # Legacy upload without a blob: the claim lives on the media document
+
+
+class ImageAnalysisPipeline:
+    """
+    Background image analysis.
+
+    Jobs go into a bounded queue that a fixed pool of worker tasks drains, so
+    uploads never wait for analyze_image. Results are written back to
+    media.ai_analysis (and cached on the blob for deduplicated uploads). Batch
+    progress is kept in the media_analysis_batches collection so every API
+    worker reports the same numbers.
+
+    Analysis is per content, not per upload: a job is claimed on the blob
+    with one conditional update (status queued, owner and lease) before it
+    enters a queue, and every media document with that digest receives the
+    result. An upload of content that is already being analyzed, by any
+    user or API worker, attaches to the claim instead of starting another
+    analyze_image call. A sweeper claims deferred jobs and jobs whose lease
+    expired (their worker died) while there is queue space, and fails
+    batches whose producer stopped making progress.
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, queue_size: int = ANALYSIS_QUEUE_SIZE):
+        self.ai_service = AIService()
+        self.worker_count = max(1, workers)
+        self.queue_size = queue_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.sweeper: Optional[asyncio.Task] = None
+        self.batch_tasks: set = set()
+
+    def start(self):
+        """Start worker tasks and the sweeper on the running event loop"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.worker_count)
+        ]
+        self.sweeper = asyncio.create_task(self._sweep())
+        print(f"🖼️ Image analysis pipeline started with {self.worker_count} workers")
+
+    async def stop(self):
+        """Cancel workers; unfinished jobs are claimed again once their lease expires"""
+        tasks = list(self.batch_tasks) + self.workers + ([self.sweeper] if self.sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.sweeper = None
+        self.batch_tasks = set()
+        self.queue = None
+
+    @staticmethod
+    def _target(job: AnalysisJob) -> Tuple[str, object]:
+        """Collection and _id of the document holding the job's claim"""
+        if job.digest:
+            return Collections.MEDIA_BLOBS, job.digest
+        return Collections.MEDIA, job.media_id
+
+    @staticmethod
+    def _job_for(file_data: Dict) -> AnalysisJob:
+        return AnalysisJob(
+            file_path=file_data["file_path"],
+            digest=file_data.get("sha256"),
+            media_id=file_data["_id"]
+        )
+
+    def _lease(self) -> Dict:
+        return {
+            "analysis_status": STATUS_QUEUED,
+            "analysis_owner": self.owner,
+            "analysis_lease_until": datetime.utcnow() + timedelta(seconds=ANALYSIS_LEASE_SECONDS),
+        }
+
+    @staticmethod
+    def _claimable(include_new: bool = False) -> Dict:
+        """
+        Claims that may be taken: waiting or expired ones, and with
+        include_new blobs that were never analyzed at all.
+        """
+        conditions = [
+            {"analysis_status": {"$in": [STATUS_PENDING, STATUS_DEFERRED]}},
+            {"analysis_status": STATUS_QUEUED, "analysis_lease_until": {"$lt": datetime.utcnow()}},
+        ]
+        if include_new:
+            conditions.append({"analysis_status": {"$exists": False}, "ai_analysis": None})
+        return {"$or": conditions}
+
+    @staticmethod
+    def _reclaimable() -> Dict:
+        """For explicit reanalysis: anything except a live claim"""
+        return {"$or": [
+            {"analysis_status": {"$ne": STATUS_QUEUED}},
+            {"analysis_lease_until": {"$lt": datetime.utcnow()}},
+        ]}
+
+    async def _claim(self, db, job: AnalysisJob, condition: Dict, batch_id: Optional[str] = None) -> bool:
+        collection, key = self._target(job)
+        update = {"$set": self._lease()}
+        if batch_id:
+            update["$addToSet"] = {"analysis_batch_ids": batch_id}
+        result = await db[collection].update_one({"_id": key, **condition}, update)
+        return result.matched_count == 1
+
+    async def _join_claim(self, db, job: AnalysisJob, batch_id: str) -> bool:
+        """Count a batch in on a live claim; its job increments the batch when it finishes"""
+        collection, key = self._target(job)
+        result = await db[collection].update_one(
+            {"_id": key, "analysis_status": STATUS_QUEUED, "analysis_lease_until": {"$gte": datetime.utcnow()}},
+            {"$addToSet": {"analysis_batch_ids": batch_id}}
+        )
+        return result.matched_count == 1
+
+    async def _mirror(self, db, job: AnalysisJob, status: str):
+        """Show the claim's state on the media documents waiting for it"""
+        if job.digest:
+            await db[Collections.MEDIA].update_many(
+                {"sha256": job.digest, "analysis_status": {"$in": [STATUS_PENDING, STATUS_DEFERRED, STATUS_QUEUED]}},
+                {"$set": {"analysis_status": status}}
+            )
+
+    async def _release(self, db, job: AnalysisJob):
+        """Give back a claim that could not be queued"""
+        collection, key = self._target(job)
+        await db[collection].update_one(
+            {"_id": key, "analysis_owner": self.owner},
+            {"$set": {"analysis_status": STATUS_DEFERRED},
+             "$unset": {"analysis_owner": "", "analysis_lease_until": ""}}
+        )
+        await self._mirror(db, job, STATUS_DEFERRED)
+
+    async def _attach(self, db, media_id, job: AnalysisJob) -> str:
+        """Point a media document at an existing claim or result for its content"""
+        if not job.digest:
+            # Legacy upload: the document itself is held by another job
+            return STATUS_QUEUED
+        blob = await db[Collections.MEDIA_BLOBS].find_one(
+            {"_id": job.digest}, {"ai_analysis": 1, "analysis_status": 1}
+        )
+        if blob is None:
+            return STATUS_PENDING
+        if blob.get("analysis_status") == STATUS_QUEUED:
+            update = {"analysis_status": STATUS_QUEUED}
+        elif blob.get("ai_analysis") is not None:
+            update = {"analysis_status": STATUS_COMPLETE, "ai_analysis": blob["ai_analysis"]}
+        else:
+            update = {"analysis_status": blob.get("analysis_status") or STATUS_PENDING}
+        # A result written since the blob was read wins
+        await db[Collections.MEDIA].update_one(
+            {"_id": media_id, "analysis_status": {"$in": [STATUS_PENDING, STATUS_DEFERRED, STATUS_QUEUED]}},
+            {"$set": update}
+        )
+        return update["analysis_status"]
+
+    async def _sweep(self):
+        while True:
+            try:
+                db = Database.get_db()
+                claimed = await self.claim_unfinished(db)
+                if claimed:
+                    print(f"🖼️ Claimed {claimed} unfinished image analyses")
+                await self._fail_stale_batches(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Image analysis sweep failed: {e}")
+            await asyncio.sleep(ANALYSIS_SWEEP_SECONDS)
+
+    def submit(self, job: AnalysisJob) -> bool:
+        """Queue a job without waiting. Returns False if the queue is full."""
+        self.start()
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def submit_wait(self, job: AnalysisJob):
+        """Queue a job, waiting for space (used by batch producers)"""
+        self.start()
+        await self.queue.put(job)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Image analysis worker {worker_id} failed on {job.digest or job.media_id}: {e}")
+                try:
+                    await self._abandon(Database.get_db(), job)
+                except Exception as e:
+                    # The lease expires and the sweeper retries the job with its batches
+                    print(f"⚠️ Could not release image analysis claim {job.digest or job.media_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, job: AnalysisJob):
+        db = Database.get_db()
+        ai_analysis = None
+        status = STATUS_FAILED
+        try:
+            async with aiofiles.open(job.file_path, 'rb') as f:
+                file_content = await f.read()
+            ai_analysis = await self.ai_service.analyze_image(file_content)
+            status = STATUS_COMPLETE
+        except Exception as e:
+            print(f"⚠️ Image analysis failed for {job.digest or job.media_id}: {e}")
+
+        update = {
+            "analysis_status": status,
+            "analyzed_at": datetime.utcnow()
+        }
+        if status == STATUS_COMPLETE:
+            update["ai_analysis"] = ai_analysis
+        await self._finish(db, job, update)
+
+    async def _finish(self, db, job: AnalysisJob, update: Dict):
+        """Write a result to the claim and every media document of the content, then count batches"""
+        collection, key = self._target(job)
+        claim = await db[collection].find_one_and_update(
+            {"_id": key},
+            {"$set": update,
+             "$unset": {"analysis_owner": "", "analysis_lease_until": "", "analysis_batch_ids": ""}},
+            projection={"analysis_batch_ids": 1}
+        )
+
+        # The batch ids are off the claim now, so they are counted even if the media write fails
+        counter = "failed"
+        try:
+            if job.digest:
+                media_query = {"sha256": job.digest}
+                if update["analysis_status"] != STATUS_COMPLETE:
+                    # A failed rerun keeps the analysis documents already have
+                    media_query["analysis_status"] = {"$in": [STATUS_PENDING, STATUS_DEFERRED, STATUS_QUEUED]}
+                await db[Collections.MEDIA].update_many(media_query, {"$set": update})
+            if update["analysis_status"] == STATUS_COMPLETE:
+                counter = "completed"
+        finally:
+            await self._count_batches(db, (claim or {}).get("analysis_batch_ids", []), counter)
+
+    async def _abandon(self, db, job: AnalysisJob):
+        """Mark a job that raised as failed and count it against the batches still on its claim"""
+        collection, key = self._target(job)
+        claim = await db[collection].find_one_and_update(
+            {"_id": key, "analysis_owner": self.owner, "analysis_status": STATUS_QUEUED},
+            {"$set": {"analysis_status": STATUS_FAILED, "analyzed_at": datetime.utcnow()},
+             "$unset": {"analysis_owner": "", "analysis_lease_until": "", "analysis_batch_ids": ""}},
+            projection={"analysis_batch_ids": 1}
+        )
+        if claim is None:
+            # Already finished, or the lease passed to another worker
+            return
+        try:
+            await self._mirror(db, job, STATUS_FAILED)
+        finally:
+            await self._count_batches(db, claim.get("analysis_batch_ids", []), "failed")
+
+    async def _count_batches(self, db, batch_ids: List[str], counter: str):
+        if batch_ids:
+            await db[Collections.MEDIA_ANALYSIS_BATCHES].update_many(
+                {"_id": {"$in": batch_ids}},
+                {"$inc": {counter: 1}, "$set": {"updated_at": datetime.utcnow()}}
+            )
+
+    async def _queue_claimed(self, db, job: AnalysisJob) -> bool:
+        if self.submit(job):
+            await self._mirror(db, job, STATUS_QUEUED)
+            return True
+        await self._release(db, job)
+        return False
+
+    async def claim_unfinished(self, db) -> int:
+        """
+        Claim and queue pending, deferred and lease-expired jobs while the queue has room.
+
+        Each claim is one find_one_and_update, so concurrent API workers never
+        queue the same content. Media documents left pending by a process
+        that died before queueing them are attached or claimed afterwards.
+        """
+        self.start()
+        claimed = 0
+        for collection, query in (
+            (Collections.MEDIA_BLOBS, {}),
+            (Collections.MEDIA, {"sha256": {"$exists": False}}),  # Legacy uploads
+        ):
+            while not self.queue.full():
+                doc = await db[collection].find_one_and_update(
+                    {**query, **self._claimable()},
+                    {"$set": self._lease()},
+                    projection={"file_path": 1},
+                    sort=[("_id", 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if doc is None:
+                    break
+                if collection == Collections.MEDIA_BLOBS:
+                    job = AnalysisJob(file_path=doc["file_path"], digest=doc["_id"])
+                else:
+                    job = AnalysisJob(file_path=doc["file_path"], media_id=doc["_id"])
+                if not await self._queue_claimed(db, job):
+                    return claimed
+                claimed += 1
+
+        room = self.queue_size - self.queue.qsize()
+        if room <= 0:
+            return claimed
+        orphaned_before = datetime.utcnow() - timedelta(seconds=ANALYSIS_SWEEP_SECONDS)
+        cursor = db[Collections.MEDIA].find(
+            {"analysis_status": STATUS_PENDING, "sha256": {"$exists": True}, "created_at": {"$lt": orphaned_before}},
+            {"file_path": 1, "sha256": 1}
+        ).limit(room)
+        async for file_data in cursor:
+            if await self.enqueue_media(db, file_data) == STATUS_QUEUED:
+                claimed += 1
+        return claimed
+
+    async def enqueue_media(self, db, file_data: Dict, force: bool = False) -> str:
+        """
+        Claim a media document's content and queue it. Returns the new status.
+
+        If the content is already being analyzed (or has been), the document
+        attaches to that claim or result instead. force also claims analyzed
+        content, for reanalysis; a live claim held by another job is always
+        respected.
+        """
+        job = self._job_for(file_data)
+        condition = self._reclaimable() if force else self._claimable(include_new=True)
+        if not await self._claim(db, job, condition):
+            return await self._attach(db, file_data["_id"], job)
+        if force and job.digest:
+            await db[Collections.MEDIA].update_one(
+                {"_id": file_data["_id"]}, {"$set": {"analysis_status": STATUS_QUEUED}}
+            )
+        return STATUS_QUEUED if await self._queue_claimed(db, job) else STATUS_DEFERRED
+
+    async def start_batch(self, db, user_id: str) -> Dict:
+        """Queue reanalysis of every image owned by a user"""
+        query = {
+            "user_id": user_id,
+            "$or": [
+                {"content_type": {"$regex": "^image/"}},
+                {"original_filename": {"$regex": r"\.(jpe?g|png|gif)$", "$options": "i"}}
+            ]
+        }
+        total = await db[Collections.MEDIA].count_documents(query)
+        batch = {
+            "_id": str(ObjectId()),
+            "user_id": user_id,
+            "total": total,
+            "queued": 0,
+            "completed": 0,
+            "failed": 0,
+            "status": "running" if total else "complete",
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        await db[Collections.MEDIA_ANALYSIS_BATCHES].insert_one(batch)
+
+        if total:
+            task = asyncio.create_task(self._produce_batch(db, batch["_id"], query))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+        return batch
+
+    async def _produce_batch(self, db, batch_id: str, query: Dict):
+        """Feed a batch into the queue with backpressure"""
+        cursor = db[Collections.MEDIA].find(query, {"file_path": 1, "sha256": 1})
+        async for file_data in cursor:
+            job = self._job_for(file_data)
+            # The batch id travels with the claim, so a job retried after a lost lease still
+            # counts; content already being analyzed counts the batch in on that job
+            for _ in range(3):
+                if await self._claim(db, job, self._reclaimable(), batch_id):
+                    await db[Collections.MEDIA].update_one(
+                        {"_id": file_data["_id"]}, {"$set": {"analysis_status": STATUS_QUEUED}}
+                    )
+                    await self.submit_wait(job)
+                    counter = "queued"
+                    break
+                if await self._join_claim(db, job, batch_id):
+                    counter = "queued"
+                    break
+            else:
+                # Blob gone (file deleted meanwhile)
+                counter = "failed"
+            await db[Collections.MEDIA_ANALYSIS_BATCHES].update_one(
+                {"_id": batch_id}, {"$inc": {counter: 1}, "$set": {"updated_at": datetime.utcnow()}}
+            )
+        await db[Collections.MEDIA_ANALYSIS_BATCHES].update_one(
+            {"_id": batch_id}, {"$set": {"produced": True, "updated_at": datetime.utcnow()}}
+        )
+
+    async def _fail_stale_batches(self, db):
+        """
+        Fail running batches whose producer died before queueing every image.
+
+        Produced batches finish through their jobs (retried after lease expiry)
+        and are left alone; unproduced ones with no progress for a lease
+        period lost their producer with the process that ran it.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=ANALYSIS_LEASE_SECONDS)
+        result = await db[Collections.MEDIA_ANALYSIS_BATCHES].update_many(
+            {"status": "running", "produced": {"$ne": True}, "updated_at": {"$lt": stale_before}},
+            {"$set": {"status": "failed", "error": "interrupted before all images were queued",
+                      "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            print(f"⚠️ Marked {result.modified_count} interrupted reanalysis batches failed")
+
+    async def get_batch_progress(self, db, batch_id: str, user_id: str) -> Optional[Dict]:
+        """Get progress for a batch owned by a user"""
+        batch = await db[Collections.MEDIA_ANALYSIS_BATCHES].find_one({"_id": batch_id, "user_id": user_id})
+        if not batch:
+            return None
+
+        done = batch["completed"] + batch["failed"]
+        if batch["status"] == "running" and done >= batch["total"]:
+            batch["status"] = "complete"
+            await db[Collections.MEDIA_ANALYSIS_BATCHES].update_one(
+                {"_id": batch_id}, {"$set": {"status": "complete"}}
+            )
+
+        return {
+            "batch_id": batch["_id"],
+            "status": batch["status"],
+            "error": batch.get("error"),
+            "total": batch["total"],
+            "queued": batch["queued"],
+            "completed": batch["completed"],
+            "failed": batch["failed"],
+            "progress": round(done / batch["total"], 3) if batch["total"] else 1.0,
+            "created_at": batch["created_at"].isoformat(),
+            "updated_at": batch["updated_at"].isoformat()
+        }
+
+
+# Initialize the pipeline
+image_analysis_pipeline = ImageAnalysisPipeline()
@@ -0,0 +1,341 @@
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from database import Collections
+from services.media_store import UPLOAD_DIR, BLOB_FANOUT
+
+# Reconciliation configuration
+RECONCILE_BATCH_SIZE = 500  # Actions buffered before they are applied
+RECONCILE_GRACE_SECONDS = 3600  # Younger files may belong to an in-flight upload
+REPORT_SAMPLE_SIZE = 20  # Examples kept per category in the report
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+DERIVATIVE_RE = re.compile(r"^(.+)\.w\d+\.webp$")
+SHARDS = [f"{i:0{BLOB_FANOUT}x}" for i in range(16 ** BLOB_FANOUT)]
+
+
+@dataclass
+class ReconcileReport:
+    counts: Dict[str, int] = field(default_factory=dict)
+    samples: Dict[str, List[str]] = field(default_factory=dict)
+    applied: bool = False
+
+    def add(self, category: str, item: str):
+        self.counts[category] = self.counts.get(category, 0) + 1
+        bucket = self.samples.setdefault(category, [])
+        if len(bucket) < REPORT_SAMPLE_SIZE:
+            bucket.append(item)
+
+    def to_dict(self) -> Dict:
+        return {"applied": self.applied, "counts": self.counts, "samples": self.samples}
+
+
+class MediaReconciler:
+    """
+    Streaming reconciliation of the upload directory against the database.
+
+    Blob shards are processed one at a time: the shard directory listing, the
+    media_blobs records and the media documents for that hash prefix are each
+    read in digest order and merge-joined, so memory is bounded by one shard
+    plus one action batch no matter how large the library is.
+
+    Categories reported:
+      orphan_file         blob on disk with no blob record and no media document
+      stale_tmp           temporary upload file older than the grace period
+      missing_blob_record blob on disk referenced by media but with no blob record
+      dangling_blob       blob record older than the grace period whose file is gone
+      dangling_media      media document whose content is gone
+      unreferenced_blob   blob record and file with no media document
+      refcount_drift      blob refcount differs from its media document count
+      orphan_derivative   thumbnail whose original is gone
+    """
+
+    def __init__(self, db, upload_dir: str = UPLOAD_DIR, delete: bool = False,
+                 grace_seconds: int = RECONCILE_GRACE_SECONDS, batch_size: int = RECONCILE_BATCH_SIZE):
+        self.db = db
+        self.upload_dir = upload_dir
+        self.delete = delete
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.report = ReconcileReport(applied=delete)
+        self.cutoff = time.time() - grace_seconds
+        self._reset_batch()
+
+    def _reset_batch(self):
+        self.files_to_remove: List[str] = []
+        self.blob_ids_to_delete: List[str] = []
+        self.digests_to_unlink: List[str] = []
+        self.legacy_media_to_delete: List = []
+        self.blob_updates: List[UpdateOne] = []
+
+    def _pending_actions(self) -> int:
+        return (len(self.files_to_remove) + len(self.blob_ids_to_delete) + len(self.digests_to_unlink)
+                + len(self.legacy_media_to_delete) + len(self.blob_updates))
+
+    async def _maybe_flush(self):
+        if self._pending_actions() >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        """Apply buffered actions in batches"""
+        if self.delete:
+            for path in self.files_to_remove:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if self.blob_ids_to_delete:
+                await self.db[Collections.MEDIA_BLOBS].delete_many({"_id": {"$in": self.blob_ids_to_delete}})
+            if self.digests_to_unlink:
+                await self.db[Collections.MEDIA].delete_many({"sha256": {"$in": self.digests_to_unlink}})
+            if self.legacy_media_to_delete:
+                await self.db[Collections.MEDIA].delete_many({"_id": {"$in": self.legacy_media_to_delete}})
+            if self.blob_updates:
+                await self.db[Collections.MEDIA_BLOBS].bulk_write(self.blob_updates, ordered=False)
+        self._reset_batch()
+
+    async def run(self) -> ReconcileReport:
+        for shard in SHARDS:
+            await self._reconcile_shard(shard)
+        await self._reconcile_root()
+        await self._flush()
+        return self.report
+
+    def _scan_shard(self, shard: str) -> Tuple[List[Tuple[str, float]], Dict[str, List[str]]]:
+        """
+        List blob files (digest, mtime) of one shard directory in digest order,
+        plus the derivative files of each digest
+        """
+        shard_dir = os.path.join(self.upload_dir, shard)
+        entries = []
+        derivatives: Dict[str, List[str]] = {}
+        try:
+            with os.scandir(shard_dir) as it:
+                for entry in it:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        self._check_tmp(entry)
+                    elif DIGEST_RE.match(entry.name):
+                        entries.append((entry.name, entry.stat().st_mtime))
+                    else:
+                        match = DERIVATIVE_RE.match(entry.name)
+                        if match and DIGEST_RE.match(match.group(1)):
+                            derivatives.setdefault(match.group(1), []).append(entry.path)
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        return entries, derivatives
+
+    def _remove_blob_file(self, file_path: str, derivatives: Dict[str, List[str]], digest: str):
+        self.files_to_remove.append(file_path)
+        self.files_to_remove.extend(derivatives.pop(digest, []))
+
+    def _check_tmp(self, entry: os.DirEntry):
+        if entry.stat().st_mtime < self.cutoff:
+            self.report.add("stale_tmp", entry.path)
+            self.files_to_remove.append(entry.path)
+
+    async def _media_groups(self, shard: str) -> AsyncIterator[Tuple[str, int]]:
+        """Yield (digest, media document count) for a shard in digest order"""
+        cursor = self.db[Collections.MEDIA].find(
+            {"sha256": {"$regex": f"^{shard}"}},
+            {"sha256": 1, "_id": 0}
+        ).sort("sha256", 1)
+        current, count = None, 0
+        async for doc in cursor:
+            if doc["sha256"] != current:
+                if current is not None:
+                    yield current, count
+                current, count = doc["sha256"], 0
+            count += 1
+        if current is not None:
+            yield current, count
+
+    async def _blobs(self, shard: str) -> AsyncIterator[Dict]:
+        cursor = self.db[Collections.MEDIA_BLOBS].find(
+            {"_id": {"$regex": f"^{shard}"}},
+            {"refcount": 1, "file_path": 1, "created_at": 1}
+        ).sort("_id", 1)
+        async for blob in cursor:
+            yield blob
+
+    async def _legacy_media(self) -> AsyncIterator[Dict]:
+        cursor = self.db[Collections.MEDIA].find(
+            {"sha256": {"$exists": False}},
+            {"file_path": 1, "created_at": 1}
+        )
+        async for doc in cursor:
+            yield doc
+
+    @staticmethod
+    async def _next(iterator):
+        try:
+            return await iterator.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def _reconcile_shard(self, shard: str):
+        file_entries, derivatives = self._scan_shard(shard)
+        files = iter(file_entries)
+        blobs = self._blobs(shard)
+        media = self._media_groups(shard)
+
+        cur_file = next(files, None)
+        cur_blob = await self._next(blobs)
+        cur_media = await self._next(media)
+
+        while cur_file or cur_blob or cur_media:
+            key = min(
+                item for item in (
+                    cur_file[0] if cur_file else None,
+                    cur_blob["_id"] if cur_blob else None,
+                    cur_media[0] if cur_media else None
+                ) if item is not None
+            )
+            file_entry = cur_file if cur_file and cur_file[0] == key else None
+            blob = cur_blob if cur_blob and cur_blob["_id"] == key else None
+            ref_count = cur_media[1] if cur_media and cur_media[0] == key else 0
+
+            self._classify(shard, key, file_entry, blob, ref_count, derivatives)
+            await self._maybe_flush()
+
+            if file_entry:
+                cur_file = next(files, None)
+            if blob:
+                cur_blob = await self._next(blobs)
+            if ref_count:
+                cur_media = await self._next(media)
+
+        # Thumbnails whose original is not on disk
+        on_disk = {digest for digest, _ in file_entries}
+        for digest, paths in derivatives.items():
+            if digest not in on_disk:
+                for path in paths:
+                    self.report.add("orphan_derivative", path)
+                    self.files_to_remove.append(path)
+        await self._maybe_flush()
+
+    def _classify(self, shard: str, digest: str, file_entry: Optional[Tuple[str, float]],
+                  blob: Optional[Dict], ref_count: int, derivatives: Dict[str, List[str]]):
+        file_path = os.path.join(self.upload_dir, shard, digest)
+
+        if file_entry and not blob:
+            if ref_count:
+                # Crash between the blob write and its refcount upsert
+                self.report.add("missing_blob_record", digest)
+                self.blob_updates.append(UpdateOne(
+                    {"_id": digest},
+                    {"$set": {"refcount": ref_count, "file_path": file_path}},
+                    upsert=True
+                ))
+            elif file_entry[1] < self.cutoff:
+                self.report.add("orphan_file", file_path)
+                self._remove_blob_file(file_path, derivatives, digest)
+            return
+
+        if blob and not file_entry:
+            # A young record may belong to an upload whose file is being rewritten
+            created_at = blob.get("created_at")
+            if created_at and created_at.replace(tzinfo=timezone.utc).timestamp() >= self.cutoff:
+                return
+            self.report.add("dangling_blob", digest)
+            self.blob_ids_to_delete.append(digest)
+            if ref_count:
+                self.report.add("dangling_media", digest)
+                self.digests_to_unlink.append(digest)
+            return
+
+        if not file_entry and not blob:
+            self.report.add("dangling_media", digest)
+            self.digests_to_unlink.append(digest)
+            return
+
+        if ref_count == 0:
+            if file_entry[1] < self.cutoff:
+                self.report.add("unreferenced_blob", digest)
+                self.blob_ids_to_delete.append(digest)
+                self._remove_blob_file(file_path, derivatives, digest)
+        elif blob.get("refcount") != ref_count:
+            self.report.add("refcount_drift", digest)
+            # Only if no upload or delete changed the count since it was read
+            self.blob_updates.append(UpdateOne(
+                {"_id": digest, "refcount": blob.get("refcount")},
+                {"$set": {"refcount": ref_count}}
+            ))
+
+    def _is_young(self, doc: Dict) -> bool:
+        """Whether a media document was created within the grace period"""
+        created_at = doc.get("created_at")
+        if not isinstance(created_at, datetime):
+            created_at = doc["_id"].generation_time if isinstance(doc["_id"], ObjectId) else None
+        if created_at is None:
+            return False
+        return created_at.replace(tzinfo=timezone.utc).timestamp() >= self.cutoff
+
+    async def _reconcile_root(self):
+        """
+        Reconcile pre-content-addressing uploads stored directly in the upload directory.
+
+        Media paths are compared in absolute, normalized form. Documents whose
+        file lies outside the directory being scanned are never touched, and
+        files and documents younger than the grace period are skipped.
+        """
+        root = os.path.abspath(self.upload_dir)
+        unreferenced: Dict[str, float] = {}
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        self._check_tmp(entry)
+                    elif DERIVATIVE_RE.match(entry.name):
+                        # Thumbnail of a legacy upload
+                        base_path = os.path.join(root, DERIVATIVE_RE.match(entry.name).group(1))
+                        if not os.path.exists(base_path) and entry.stat().st_mtime < self.cutoff:
+                            self.report.add("orphan_derivative", entry.path)
+                            self.files_to_remove.append(entry.path)
+                    else:
+                        unreferenced[entry.name] = entry.stat().st_mtime
+        except FileNotFoundError:
+            return
+        await self._maybe_flush()
+
+        async for doc in self._legacy_media():
+            if not doc.get("file_path"):
+                continue
+            doc_path = os.path.abspath(os.path.normpath(doc["file_path"]))
+            if os.path.dirname(doc_path) != root:
+                # Stored elsewhere; not ours to judge
+                continue
+            name = os.path.basename(doc_path)
+            if unreferenced.pop(name, None) is not None:
+                continue
+            # The file may have been written after the directory was listed
+            if self._is_young(doc) or os.path.exists(doc_path):
+                continue
+            self.report.add("dangling_media", str(doc["_id"]))
+            self.legacy_media_to_delete.append(doc["_id"])
+            await self._maybe_flush()
+
+        for name, mtime in sorted(unreferenced.items()):
+            if mtime < self.cutoff:
+                path = os.path.join(root, name)
+                self.report.add("orphan_file", path)
+                self.files_to_remove.append(path)
+                await self._maybe_flush()
+
+
+async def reconcile_media(db, delete: bool = False, **kwargs) -> Dict:
+    """Run a reconciliation pass and return its report"""
+    reconciler = MediaReconciler(db, delete=delete, **kwargs)
+    report = await reconciler.run()
+    return report.to_dict()
@@ -0,0 +1,178 @@
+import os
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from database import Collections
+from services.thumbnails import remove_derivatives
+
+# Content-addressed blob storage configuration
+UPLOAD_DIR = "uploads"
+BLOB_FANOUT = 2  # Number of hash characters used for the shard directory
+STREAM_CHUNK_SIZE = 1024 * 1024  # Bytes read per chunk when streaming uploads
+
+
+class FileTooLargeError(Exception):
+    """Raised when a streamed upload exceeds the size limit"""
+
+
+class MediaStore:
+    """
+    Content-addressed media store.
+
+    Every blob is stored once under its SHA-256 digest and reference counted in
+    the media_blobs collection. Per-user documents in the media collection point
+    at a blob through their ``sha256`` field.
+    """
+
+    def __init__(self, upload_dir: str = UPLOAD_DIR):
+        self.upload_dir = upload_dir
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+    @staticmethod
+    def compute_digest(content: bytes) -> str:
+        """Return the hex SHA-256 digest of the content"""
+        return hashlib.sha256(content).hexdigest()
+
+    def blob_path(self, digest: str) -> str:
+        """Get the on-disk path for a blob digest"""
+        return os.path.join(self.upload_dir, digest[:BLOB_FANOUT], digest)
+
+    async def _write_blob(self, digest: str, content: bytes) -> str:
+        """Write blob atomically if it is not already on disk"""
+        file_path = self.blob_path(digest)
+        if os.path.exists(file_path):
+            return file_path
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(content)
+        # Concurrent writers of the same digest produce identical bytes,
+        # so whichever rename lands last is still correct
+        os.replace(tmp_path, file_path)
+        return file_path
+
+    async def stage_stream(self, upload, max_size: int) -> Tuple[str, str, int]:
+        """
+        Stream an upload into a temporary file while hashing it.
+
+        Returns (tmp_path, digest, size). The caller must either commit_staged
+        or discard_staged the temporary file.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}.tmp")
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = await upload.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeError()
+                    await asyncio.to_thread(hasher.update, chunk)
+                    await f.write(chunk)
+        except BaseException:
+            self.discard_staged(tmp_path)
+            raise
+        return tmp_path, hasher.hexdigest(), size
+
+    def discard_staged(self, tmp_path: str):
+        """Remove a staged temporary file"""
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    async def commit_staged(self, db: AsyncIOMotorDatabase, tmp_path: str, digest: str, size: int,
+                            content_type: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Move a staged file into place (unless the blob exists) and add a reference"""
+        file_path = self.blob_path(digest)
+        if os.path.exists(file_path):
+            self.discard_staged(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(tmp_path, file_path)
+        return await self._add_reference(db, digest, file_path, size, content_type)
+
+    async def find_user_duplicate(self, db: AsyncIOMotorDatabase, user_id: str, digest: str) -> Optional[Dict]:
+        """Find an existing media document of this user with the same content"""
+        return await db[Collections.MEDIA].find_one({"user_id": user_id, "sha256": digest})
+
+    async def get_blob(self, db: AsyncIOMotorDatabase, digest: str) -> Optional[Dict]:
+        """Get the blob record for a digest"""
+        return await db[Collections.MEDIA_BLOBS].find_one({"_id": digest})
+
+    async def acquire(self, db: AsyncIOMotorDatabase, content: bytes, digest: Optional[str] = None,
+                      content_type: Optional[str] = None) -> Tuple[Dict, bool]:
+        """
+        Store content (if new) and add a reference to its blob.
+
+        Returns the blob record and whether the blob was newly created.
+        """
+        if digest is None:
+            digest = await asyncio.to_thread(self.compute_digest, content)
+
+        file_path = await self._write_blob(digest, content)
+        blob, is_new = await self._add_reference(db, digest, file_path, len(content), content_type)
+
+        # A concurrent release may have removed the file between write and $inc
+        if not os.path.exists(file_path):
+            await self._write_blob(digest, content)
+
+        return blob, is_new
+
+    async def _add_reference(self, db: AsyncIOMotorDatabase, digest: str, file_path: str, size: int,
+                             content_type: Optional[str]) -> Tuple[Dict, bool]:
+        blob = await db[Collections.MEDIA_BLOBS].find_one_and_update(
+            {"_id": digest},
+            {
+                "$inc": {"refcount": 1},
+                "$setOnInsert": {
+                    "file_path": file_path,
+                    "file_size": size,
+                    "content_type": content_type,
+                    "ai_analysis": None,
+                    "created_at": datetime.utcnow()
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return blob, blob.get("refcount", 1) == 1
+
+    async def release(self, db: AsyncIOMotorDatabase, digest: str) -> bool:
+        """
+        Drop a reference to a blob.
+
+        The blob file is removed only when the refcount reaches zero. Returns
+        True if the blob was deleted.
+        """
+        blob = await db[Collections.MEDIA_BLOBS].find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refcount": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not blob or blob.get("refcount", 0) > 0:
+            return False
+
+        deleted = await db[Collections.MEDIA_BLOBS].delete_one({"_id": digest, "refcount": {"$lte": 0}})
+        if deleted.deleted_count == 0:
+            # Re-referenced by a concurrent upload
+            return False
+
+        file_path = blob.get("file_path") or self.blob_path(digest)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        remove_derivatives(file_path)
+        return True
+
+
+# Initialize the store
+media_store = MediaStore()
@@ -0,0 +1,267 @@
+import os
+import stat
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Streaming configuration
+CHUNK_SIZE = 256 * 1024  # Bytes read per chunk when zero-copy is unavailable
+MAX_RANGES = 16  # Upper bound on ranges honoured in a single multipart request
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse an HTTP Range header into inclusive (start, end) byte ranges.
+
+    Returns None when the header is malformed (the full file should be served)
+    and an empty list when no range is satisfiable.
+    """
+    units, _, range_spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or not range_spec:
+        return None
+
+    ranges = []
+    for part in range_spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_str, sep, end_str = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if start_str == "":
+                # Suffix range: last N bytes
+                suffix = int(end_str)
+                if suffix <= 0:
+                    continue
+                start = max(file_size - suffix, 0)
+                end = file_size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else file_size - 1
+                end = min(end, file_size - 1)
+        except ValueError:
+            return None
+        if start < 0 or start > end or start >= file_size:
+            continue
+        ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return _coalesce_ranges(ranges)
+
+
+def _coalesce_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or adjacent ranges"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def make_etag(stat_result: os.stat_result, digest: Optional[str] = None) -> str:
+    """Strong ETag for content-addressed blobs, weak ETag from mtime/size otherwise"""
+    if digest:
+        return f'"{digest}"'
+    return f'W/"{int(stat_result.st_mtime):x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(header_value: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match value with our ETag"""
+    if header_value.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def _etag_matches_strong(header_value: str, etag: str) -> bool:
+    """Strong comparison of an If-Range value with our ETag (RFC 9110 13.1.5)"""
+    candidate = header_value.strip()
+    if candidate.startswith("W/") or etag.startswith("W/"):
+        return False
+    return candidate == etag
+
+
+def _not_modified_since(header_value: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header_value)
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= int(since.timestamp())
+
+
+class MediaFileResponse(Response):
+    """
+    File response with conditional requests and byte-range support.
+
+    Serves 200, 206 (single range or multipart/byteranges), 304 and 416
+    responses. Bodies are sent as positional reads in a worker thread; the
+    ASGI zero-copy send extension is only used if the server advertises it,
+    which uvicorn does not.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        path: str,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        digest: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None,
+    ):
+        self.path = path
+        self.stat_result = stat_result or os.stat(path)
+        if not stat.S_ISREG(self.stat_result.st_mode):
+            raise RuntimeError(f"{path} is not a regular file")
+
+        self.media_type = media_type or "application/octet-stream"
+        self.background = None
+        self.file_size = self.stat_result.st_size
+        self.etag = make_etag(self.stat_result, digest)
+        self.last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+
+        self.status_code = 200
+        self.ranges: List[Tuple[int, int]] = []
+        self.boundary: Optional[str] = None
+        self._evaluate_request(request.headers)
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": self.last_modified,
+        }
+        if filename:
+            headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        self.init_headers(headers)
+        self._set_body_headers()
+
+    def _evaluate_request(self, headers):
+        """Decide between 304, 206, 416 and a full 200 response"""
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            if _etag_matches(if_none_match, self.etag):
+                self.status_code = 304
+                return
+        elif headers.get("if-modified-since") and _not_modified_since(
+            headers["if-modified-since"], self.stat_result.st_mtime
+        ):
+            self.status_code = 304
+            return
+
+        range_header = headers.get("range")
+        if not range_header:
+            return
+
+        # If-Range: only honour the range if the representation is unchanged
+        if_range = headers.get("if-range")
+        if if_range:
+            if if_range.startswith('"') or if_range.startswith("W/"):
+                if not _etag_matches_strong(if_range, self.etag):
+                    return
+            elif not _not_modified_since(if_range, self.stat_result.st_mtime):
+                return
+
+        ranges = parse_range_header(range_header, self.file_size)
+        if ranges is None:
+            return
+        if not ranges:
+            self.status_code = 416
+            return
+
+        self.status_code = 206
+        self.ranges = ranges
+        if len(ranges) > 1:
+            self.boundary = uuid.uuid4().hex
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _set_body_headers(self):
+        if self.status_code == 304:
+            return
+        if self.status_code == 416:
+            self.headers["content-range"] = f"bytes */{self.file_size}"
+            self.headers["content-length"] = "0"
+            return
+
+        if self.status_code == 200:
+            self.headers["content-type"] = self.media_type
+            self.headers["content-length"] = str(self.file_size)
+        elif self.boundary is None:
+            start, end = self.ranges[0]
+            self.headers["content-type"] = self.media_type
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            length = len(f"--{self.boundary}--\r\n")
+            for start, end in self.ranges:
+                length += len(self._part_header(start, end)) + (end - start + 1) + 2
+            self.headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+            self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.status_code in (304, 416) or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        spans = self.ranges or [(0, self.file_size - 1)]
+
+        with open(self.path, "rb") as file:
+            for start, end in spans:
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                await self._send_span(send, file, start, end - start + 1, zerocopy)
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+            closing = f"--{self.boundary}--\r\n".encode("latin-1") if self.boundary else b""
+            await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+    async def _send_span(self, send: Send, file, offset: int, count: int, zerocopy: bool):
+        """Send count bytes starting at offset"""
+        if count <= 0:
+            return
+        if zerocopy:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": True,
+            })
+            return
+
+        remaining = count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, file.fileno(), min(CHUNK_SIZE, remaining), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,252 @@
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateMany, UpdateOne
+
+from database import Collections
+from services.acoustic_features import FEATURES_VERSION, extract_acoustic_features, add_word_rate, acoustic_scores
+from services.audio_decoding import decode_audio, downmix, resample, to_pcm16, TARGET_SAMPLE_RATE
+from services import transcription
+
+# Rescoring configuration
+RESCORE_WORKERS = int(os.getenv("RESCORE_WORKERS", str(os.cpu_count() or 2)))
+RESCORE_BATCH_SIZE = 200  # Results buffered per bulk_write
+RESCORE_REPORT_SECONDS = 10
+RESCORE_JOB_ID = "speech_rescore"
+
+AUDIO_FILENAME_RE = r"\.(wav|mp3)$"
+
+
+def _init_rescore_worker(engine: Optional[str]):
+    """Build the speech engine once per worker; without one only acoustics are scored"""
+    transcription._worker_state.engine = None
+    if engine:
+        try:
+            transcription._init_worker(engine)
+        except Exception as e:
+            print(f"⚠️ Speech engine '{engine}' unavailable in worker: {e}")
+
+
+def _rescore_file(file_path: str) -> Dict:
+    """
+    Decode, extract features and transcribe one recording (runs in a worker process).
+
+    The worker reads the file itself so audio never crosses the process boundary.
+    """
+    cpu_start = time.process_time()
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    samples, rate, container = decode_audio(data)
+    pcm = to_pcm16(resample(downmix(samples), rate)).tobytes()
+    features = extract_acoustic_features(pcm, TARGET_SAMPLE_RATE)
+
+    text = None
+    engine = transcription._worker_state.engine
+    if engine is not None:
+        try:
+            text = engine.transcribe(pcm, TARGET_SAMPLE_RATE, 2)
+            add_word_rate(features, len(text.split()))
+        except transcription.TranscriptionError:
+            text = ""
+
+    return {
+        "container": container,
+        "transcribed_text": text,
+        "acoustic_features": features,
+        "scores": acoustic_scores(features),
+        "cpu_seconds": time.process_time() - cpu_start,
+    }
+
+
+class SpeechRescoringJob:
+    """
+    Rescore every stored interview recording with the current speech heuristics.
+
+    Recordings are read in digest order (deduplicated uploads are scored once)
+    and fanned out across a process pool with a bounded number in flight.
+    Results are written with batched bulk_write. Documents already at
+    FEATURES_VERSION are skipped and the last fully written digest is
+    checkpointed, so an interrupted run resumes where it stopped. Failures
+    are stored in speech_analysis_error, leaving any earlier result in
+    place; they are skipped until a run with retry_failed.
+    """
+
+    def __init__(self, db, workers: int = RESCORE_WORKERS, batch_size: int = RESCORE_BATCH_SIZE,
+                 engine: Optional[str] = None):
+        self.db = db
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.engine = engine
+
+        self.pending_writes = []
+        self.in_order = deque()  # Keys in submission order, for the checkpoint
+        self.written = set()
+        self.stats = {"processed": 0, "failed": 0, "skipped_missing": 0, "cpu_seconds": 0.0}
+        self.started = 0.0
+        self.last_report = 0.0
+
+    async def _load_checkpoint(self, restart: bool) -> Optional[str]:
+        jobs = self.db[Collections.MEDIA_RESCORE_JOBS]
+        if restart:
+            await jobs.delete_one({"_id": RESCORE_JOB_ID})
+            return None
+        job = await jobs.find_one({"_id": RESCORE_JOB_ID})
+        if job and job.get("version") == FEATURES_VERSION:
+            return job.get("checkpoint")
+        return None
+
+    async def _save_checkpoint(self, checkpoint: str):
+        await self.db[Collections.MEDIA_RESCORE_JOBS].update_one(
+            {"_id": RESCORE_JOB_ID},
+            {"$set": {"version": FEATURES_VERSION, "checkpoint": checkpoint, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def _recordings(self, checkpoint: Optional[str], retry_failed: bool = False):
+        """Distinct recordings still below the current version, in digest order"""
+        query = {
+            "original_filename": {"$regex": AUDIO_FILENAME_RE, "$options": "i"},
+            "speech_analysis.version": {"$ne": FEATURES_VERSION},
+        }
+        if not retry_failed:
+            query["speech_analysis_error.version"] = {"$ne": FEATURES_VERSION}
+        if checkpoint:
+            query["sha256"] = {"$gt": checkpoint}
+        cursor = self.db[Collections.MEDIA].find(query, {"sha256": 1, "file_path": 1}).sort("sha256", 1)
+
+        last_digest = None
+        async for doc in cursor:
+            digest = doc.get("sha256")
+            if digest and digest == last_digest:
+                continue
+            last_digest = digest
+            yield doc
+
+    def _result_writes(self, doc: Dict, update: Dict):
+        if doc.get("sha256"):
+            return [
+                UpdateMany({"sha256": doc["sha256"]}, update),
+                UpdateOne({"_id": doc["sha256"]}, update),
+            ]
+        # Legacy documents without a content digest
+        return [UpdateOne({"_id": doc["_id"]}, update)]
+
+    async def _record(self, doc: Dict, result: Optional[Dict], error: Optional[str]):
+        if result is not None:
+            self.stats["processed"] += 1
+            self.stats["cpu_seconds"] += result.pop("cpu_seconds")
+            update = {
+                "$set": {"speech_analysis": {**result, "version": FEATURES_VERSION, "scored_at": datetime.utcnow()}},
+                "$unset": {"speech_analysis_error": ""}
+            }
+        else:
+            self.stats["failed"] += 1
+            # Kept apart from speech_analysis so the recording still counts as not rescored
+            update = {"$set": {"speech_analysis_error": {
+                "version": FEATURES_VERSION, "error": error, "failed_at": datetime.utcnow()
+            }}}
+
+        self.pending_writes.append((doc, update))
+        if len(self.pending_writes) >= self.batch_size:
+            await self._flush()
+        self._report()
+
+    async def _flush(self):
+        if not self.pending_writes:
+            return
+        media_ops, blob_ops = [], []
+        for doc, update in self.pending_writes:
+            ops = self._result_writes(doc, update)
+            media_ops.append(ops[0])
+            blob_ops.extend(ops[1:])
+        await self.db[Collections.MEDIA].bulk_write(media_ops, ordered=False)
+        if blob_ops:
+            await self.db[Collections.MEDIA_BLOBS].bulk_write(blob_ops, ordered=False)
+
+        self.written.update(self._key(doc) for doc, _ in self.pending_writes)
+        self.pending_writes = []
+
+        # Advance the checkpoint over the prefix whose results are all stored
+        checkpoint = None
+        while self.in_order and self.in_order[0] in self.written:
+            key = self.in_order.popleft()
+            self.written.discard(key)
+            if isinstance(key, str):
+                checkpoint = key
+        if checkpoint:
+            await self._save_checkpoint(checkpoint)
+
+    @staticmethod
+    def _key(doc: Dict):
+        return doc.get("sha256") or doc["_id"]
+
+    def _rates(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        done = self.stats["processed"] + self.stats["failed"]
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "files_per_second": round(done / elapsed, 2),
+            # Worker CPU time over wall time of the whole pool
+            "cpu_utilization": round(self.stats["cpu_seconds"] / (elapsed * self.workers), 3),
+        }
+
+    def _report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.last_report < RESCORE_REPORT_SECONDS:
+            return
+        self.last_report = now
+        rates = self._rates()
+        print(f"🎧 Rescored {self.stats['processed']} ({self.stats['failed']} failed) - "
+              f"{rates['files_per_second']} files/s, CPU {rates['cpu_utilization']:.0%} of {self.workers} workers")
+
+    async def run(self, restart: bool = False, retry_failed: bool = False) -> Dict:
+        # Failures can sit before the checkpoint, so a retry scans from the start
+        checkpoint = await self._load_checkpoint(restart or retry_failed)
+        if checkpoint:
+            print(f"↪️ Resuming after {checkpoint[:12]}")
+
+        loop = asyncio.get_running_loop()
+        self.started = self.last_report = time.monotonic()
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_rescore_worker,
+                                 initargs=(self.engine,)) as executor:
+            async for doc in self._recordings(checkpoint, retry_failed):
+                if not doc.get("file_path") or not os.path.exists(doc["file_path"]):
+                    self.stats["skipped_missing"] += 1
+                    continue
+
+                # Keep every worker busy without queueing the whole library
+                while len(in_flight) >= self.workers * 2:
+                    await self._drain(in_flight, asyncio.FIRST_COMPLETED)
+
+                self.in_order.append(self._key(doc))
+                future = loop.run_in_executor(executor, _rescore_file, doc["file_path"])
+                in_flight[future] = doc
+
+            while in_flight:
+                await self._drain(in_flight, asyncio.ALL_COMPLETED)
+            await self._flush()
+
+        self._report(force=True)
+        return {**self.stats, "cpu_seconds": round(self.stats["cpu_seconds"], 1), **self._rates()}
+
+    async def _drain(self, in_flight: Dict, return_when):
+        done, _ = await asyncio.wait(in_flight, return_when=return_when)
+        for future in done:
+            doc = in_flight.pop(future)
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, str(e)
+            await self._record(doc, result, error)
+
+
+async def rescore_recordings(db, restart: bool = False, retry_failed: bool = False, **kw) -> Dict:
+    """Rescore stored recordings; see SpeechRescoringJob"""
+    return await SpeechRescoringJob(db, **kw).run(restart=restart, retry_failed=retry_failed)
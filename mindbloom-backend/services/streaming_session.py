@@ -0,0 +1,260 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.transcription import transcription_pool
+
+# Try to import an Opus decoder, streams must be PCM without it
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except ImportError:
+    OPUS_AVAILABLE = False
+
+# Voice activity detection configuration
+VAD_FRAME_MS = 30
+VAD_SPEECH_MARGIN_DB = 10.0  # Frame is speech when this far above the noise floor
+VAD_MIN_SPEECH_DB = -50.0  # Absolute floor in dBFS
+VAD_SILENCE_MS = 600  # Trailing silence that closes a segment
+VAD_MIN_SPEECH_MS = 250  # Shorter bursts are treated as noise
+VAD_PREROLL_MS = 200  # Audio kept before speech onset
+VAD_MAX_SEGMENT_S = 15  # Force a cut so long monologues still stream
+
+STREAM_SAMPLE_RATE = 16000
+PCM_SAMPLE_RATES = (8000, 48000)  # Accepted range for pcm16 streams
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)  # The only rates libopus decodes to
+OPUS_MAX_FRAME_MS = 120
+
+
+class EnergyVAD:
+    """
+    Energy based voice activity detector over 16-bit mono PCM.
+
+    Frames of each incoming chunk are scored at once with NumPy. The noise
+    floor adapts on non-speech frames. feed() returns completed speech
+    segments as (start_seconds, pcm_bytes).
+    """
+
+    def __init__(self, sample_rate: int = STREAM_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * VAD_FRAME_MS // 1000
+        self.silence_frames = VAD_SILENCE_MS // VAD_FRAME_MS
+        self.min_speech_frames = VAD_MIN_SPEECH_MS // VAD_FRAME_MS
+        self.preroll_frames = VAD_PREROLL_MS // VAD_FRAME_MS
+        self.max_segment_frames = VAD_MAX_SEGMENT_S * 1000 // VAD_FRAME_MS
+
+        self.noise_db = -60.0
+        self.odd_byte = b""  # Half a sample left over when a chunk has an odd length
+        self.remainder = np.empty(0, dtype=np.int16)
+        self.frames_seen = 0
+
+        self.preroll: List[np.ndarray] = []
+        self.segment: List[np.ndarray] = []
+        self.segment_start = 0
+        self.speech_frames = 0
+        self.trailing_silence = 0
+
+    def _frame_energies(self, frames: np.ndarray) -> np.ndarray:
+        """RMS level in dBFS per frame"""
+        samples = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(samples * samples, axis=1) + 1e-12)
+        return 20.0 * np.log10(rms)
+
+    def feed(self, pcm: bytes) -> List[Tuple[float, bytes]]:
+        if self.odd_byte:
+            pcm = self.odd_byte + pcm
+        cut = len(pcm) - len(pcm) % 2
+        self.odd_byte = pcm[cut:]
+        samples = np.frombuffer(pcm, dtype="<i2", count=cut // 2)
+        if self.remainder.size:
+            samples = np.concatenate([self.remainder, samples])
+        n_frames = samples.size // self.frame_len
+        self.remainder = samples[n_frames * self.frame_len:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        energies = self._frame_energies(frames)
+
+        completed = []
+        for frame, level in zip(frames, energies):
+            is_speech = level > max(self.noise_db + VAD_SPEECH_MARGIN_DB, VAD_MIN_SPEECH_DB)
+            if not is_speech:
+                # Slow adaptation of the noise floor on non-speech frames
+                self.noise_db = 0.95 * self.noise_db + 0.05 * float(level)
+
+            if self.segment:
+                self.segment.append(frame)
+                if is_speech:
+                    self.speech_frames += 1
+                    self.trailing_silence = 0
+                else:
+                    self.trailing_silence += 1
+                if self.trailing_silence >= self.silence_frames or len(self.segment) >= self.max_segment_frames:
+                    segment = self._close_segment()
+                    if segment:
+                        completed.append(segment)
+            elif is_speech:
+                self.segment = self.preroll + [frame]
+                self.segment_start = self.frames_seen - len(self.preroll)
+                self.preroll = []
+                self.speech_frames = 1
+                self.trailing_silence = 0
+            else:
+                self.preroll.append(frame)
+                if len(self.preroll) > self.preroll_frames:
+                    self.preroll.pop(0)
+            self.frames_seen += 1
+        return completed
+
+    def _close_segment(self) -> Optional[Tuple[float, bytes]]:
+        segment, speech_frames = self.segment, self.speech_frames
+        self.segment = []
+        self.speech_frames = 0
+        self.trailing_silence = 0
+        if speech_frames < self.min_speech_frames:
+            return None
+        start = self.segment_start * VAD_FRAME_MS / 1000.0
+        return start, np.concatenate(segment).astype("<i2").tobytes()
+
+    def flush(self) -> Optional[Tuple[float, bytes]]:
+        """Close any open segment at end of stream"""
+        if self.remainder.size and self.segment:
+            self.segment.append(self.remainder)
+        self.remainder = np.empty(0, dtype=np.int16)
+        self.odd_byte = b""
+        if not self.segment:
+            return None
+        return self._close_segment()
+
+
+def check_stream_params(audio_format: str, sample_rate: int) -> Optional[str]:
+    """Why a stream cannot be decoded with these parameters, or None if it can"""
+    if audio_format not in ("pcm16", "opus"):
+        return f"Unsupported audio format: {audio_format}"
+    if audio_format == "opus":
+        if not OPUS_AVAILABLE:
+            return "Opus streams require opuslib; send pcm16 instead"
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            return f"Opus sample_rate must be one of {', '.join(map(str, OPUS_SAMPLE_RATES))}"
+    elif not PCM_SAMPLE_RATES[0] <= sample_rate <= PCM_SAMPLE_RATES[1]:
+        return f"sample_rate must be between {PCM_SAMPLE_RATES[0]} and {PCM_SAMPLE_RATES[1]}"
+    return None
+
+
+class StreamingTranscriptionSession:
+    """
+    Incremental transcription of one live interview answer.
+
+    Audio chunks go through the VAD; each closed segment is transcribed in
+    the transcription pool while more audio arrives. Partial transcripts and
+    real-time feedback are pushed back through the send callback, so when
+    the patient stops only the last segment and the final analysis remain.
+    """
+
+    def __init__(self, patient_id: str, question: str, send: Callable[[Dict], Awaitable[None]],
+                 analysis_service, audio_format: str = "pcm16", sample_rate: int = STREAM_SAMPLE_RATE):
+        error = check_stream_params(audio_format, sample_rate)
+        if error:
+            raise ValueError(error)
+
+        self.patient_id = patient_id
+        self.question = question
+        self.send = send
+        self.analysis_service = analysis_service
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD(sample_rate)
+        self.decoder = opuslib.Decoder(sample_rate, 1) if audio_format == "opus" else None
+
+        self.segments: Dict[int, str] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.feedback_task: Optional[asyncio.Task] = None
+        self.send_lock = asyncio.Lock()
+        self.started_at = time.monotonic()
+
+    async def _emit(self, message: Dict):
+        async with self.send_lock:
+            await self.send(message)
+
+    def _decode(self, chunk: bytes) -> bytes:
+        if self.decoder is not None:
+            return self.decoder.decode(chunk, self.sample_rate * OPUS_MAX_FRAME_MS // 1000)
+        return chunk
+
+    async def feed(self, chunk: bytes):
+        """Accept one audio chunk"""
+        for start, pcm in self.vad.feed(self._decode(chunk)):
+            self._start_segment(start, pcm)
+
+    def _start_segment(self, start: float, pcm: bytes):
+        index = len(self.tasks)
+        self.tasks.append(asyncio.create_task(self._transcribe_segment(index, start, pcm)))
+
+    async def _transcribe_segment(self, index: int, start: float, pcm: bytes):
+        duration = len(pcm) / 2 / self.sample_rate
+        try:
+            text = await transcription_pool.transcribe(pcm, sample_rate=self.sample_rate)
+        except Exception as e:
+            text = ""
+            await self._emit({"type": "segment_error", "segment": index, "error": str(e)})
+        self.segments[index] = text
+        await self._emit({
+            "type": "partial",
+            "segment": index,
+            "start": round(start, 2),
+            "end": round(start + duration, 2),
+            "text": text,
+            "transcript": self.transcript
+        })
+        if text:
+            self._schedule_feedback()
+
+    def _schedule_feedback(self):
+        """Real-time feedback on the transcript so far; newer segments supersede older requests"""
+        if self.feedback_task and not self.feedback_task.done():
+            self.feedback_task.cancel()
+        self.feedback_task = asyncio.create_task(self._send_feedback(self.transcript))
+
+    async def _send_feedback(self, transcript: str):
+        feedback = await self.analysis_service.get_real_time_feedback(transcript, self.question)
+        await self._emit({"type": "feedback", "transcript": transcript, **feedback})
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.segments[i] for i in sorted(self.segments) if self.segments[i])
+
+    async def finish(self) -> Dict:
+        """Flush the last segment, wait for transcription and run the final analysis"""
+        tail = self.vad.flush()
+        if tail:
+            self._start_segment(*tail)
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.feedback_task and not self.feedback_task.done():
+            self.feedback_task.cancel()
+
+        transcript = self.transcript
+        result = {
+            "type": "final",
+            "transcript": transcript,
+            "segments": len(self.tasks),
+            "question": self.question,
+            "patient_id": self.patient_id,
+            "duration_seconds": round(self.vad.frames_seen * VAD_FRAME_MS / 1000.0, 2),
+        }
+        if transcript:
+            result["speech_analysis"], result["response_analysis"] = await asyncio.gather(
+                self.analysis_service.analyze_speech_text(transcript, self.patient_id),
+                self.analysis_service.analyze_response_to_question(self.question, transcript, self.patient_id)
+            )
+        await self._emit(result)
+        return result
+
+    async def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.feedback_task:
+            self.feedback_task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
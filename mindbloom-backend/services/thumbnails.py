@@ -0,0 +1,142 @@
+import os
+import asyncio
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set
+
+from database import Database, Collections
+
+# Try to import Pillow, thumbnails are skipped if it is not available
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: Pillow not available: {e}")
+    PIL_AVAILABLE = False
+
+# Thumbnail configuration
+THUMBNAIL_SIZES = (128, 256, 512)  # Longest edge in pixels, ascending
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", str(os.cpu_count() or 2)))
+
+
+def thumbnail_path(blob_path: str, size: int) -> str:
+    """Derivatives live next to the original as <digest>.w<size>.webp"""
+    return f"{blob_path}.w{size}.webp"
+
+
+def _render_thumbnails(src_path: str, sizes) -> Dict[str, int]:
+    """
+    Render WebP thumbnails for an image (runs in a worker process).
+
+    Returns {size: bytes written}. Sizes are rendered largest first, each
+    from the previous result, so the original is decoded only once.
+    """
+    written = {}
+    with Image.open(src_path) as img:
+        largest = max(sizes)
+        # Let JPEG decode directly at a reduced scale
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+        for size in sorted(sizes, reverse=True):
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            dest = thumbnail_path(src_path, size)
+            tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+            img.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(tmp_path, dest)
+            written[str(size)] = os.path.getsize(dest)
+    return written
+
+
+class ThumbnailService:
+    """
+    Generates image derivatives in a process pool.
+
+    Thumbnails are recorded on the blob (shared by deduplicated uploads) and
+    on every media document pointing at it.
+    """
+
+    def __init__(self, workers: int = THUMBNAIL_WORKERS):
+        self.workers = max(1, workers)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.tasks: Set[asyncio.Task] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def shutdown(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def generate(self, file_path: str, digest: Optional[str] = None,
+                       media_id=None) -> Optional[Dict[str, Dict]]:
+        """Render thumbnails for a file and record them. Concurrent calls share one render."""
+        if not PIL_AVAILABLE:
+            return None
+
+        key = digest or file_path
+        if key in self.in_flight:
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            loop = asyncio.get_running_loop()
+            written = await loop.run_in_executor(
+                self._get_executor(), _render_thumbnails, file_path, THUMBNAIL_SIZES
+            )
+            # Paths follow from the blob path, so only byte counts are stored
+            thumbnails = {size: {"file_size": file_size} for size, file_size in written.items()}
+            await self._record(thumbnails, digest, media_id)
+            future.set_result(thumbnails)
+            return thumbnails
+        except Exception as e:
+            print(f"⚠️ Thumbnail generation failed for {file_path}: {e}")
+            return None
+        finally:
+            # Also on cancellation, so callers sharing this render never hang
+            if not future.done():
+                future.set_result(None)
+            self.in_flight.pop(key, None)
+
+    def schedule(self, file_path: str, digest: Optional[str] = None, media_id=None):
+        """Generate thumbnails in the background"""
+        task = asyncio.create_task(self.generate(file_path, digest, media_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _record(self, thumbnails: Dict, digest: Optional[str], media_id):
+        db = Database.get_db()
+        if digest:
+            await db[Collections.MEDIA_BLOBS].update_one({"_id": digest}, {"$set": {"thumbnails": thumbnails}})
+            await db[Collections.MEDIA].update_many({"sha256": digest}, {"$set": {"thumbnails": thumbnails}})
+        elif media_id is not None:
+            await db[Collections.MEDIA].update_one({"_id": media_id}, {"$set": {"thumbnails": thumbnails}})
+
+
+def pick_thumbnail_size(requested: int) -> int:
+    """Smallest configured size that covers the requested size"""
+    for size in THUMBNAIL_SIZES:
+        if size >= requested:
+            return size
+    return THUMBNAIL_SIZES[-1]
+
+
+def remove_derivatives(blob_path: str):
+    """Delete all thumbnails of a blob"""
+    for size in THUMBNAIL_SIZES:
+        path = thumbnail_path(blob_path, size)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Initialize the service
+thumbnail_service = ThumbnailService()
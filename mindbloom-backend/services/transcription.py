@@ -0,0 +1,207 @@
+import os
+import json
+import asyncio
+import threading
+import importlib.util
+from multiprocessing import shared_memory
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+# import speech recognition
+try:
+    import speech_recognition as sr
+    SPEECH_RECOGNITION_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: speech_recognition not available: {e}")
+    SPEECH_RECOGNITION_AVAILABLE = False
+
+# Transcription configuration
+STT_ENGINE = os.getenv("STT_ENGINE", "google").lower()  # google, sphinx or vosk
+STT_WORKERS = int(os.getenv("STT_WORKERS", "0")) or None
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk")
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en-US")
+
+OFFLINE_ENGINES = {"sphinx", "vosk"}
+# Modules each engine imports when a worker builds it
+ENGINE_MODULES = {
+    "google": (),
+    "sphinx": ("pocketsphinx",),
+    "vosk": ("vosk",),
+}
+DEFAULT_SAMPLE_RATE = 16000
+DEFAULT_SAMPLE_WIDTH = 2
+
+FALLBACK_TRANSCRIPT = "Patient response to memory question about family traditions."
+
+
+class TranscriptionError(Exception):
+    """Raised when the engine could not produce a transcript"""
+
+
+class GoogleEngine:
+    """Google Web Speech API via speech_recognition (network I/O)"""
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm: bytes, sample_rate: int, sample_width: int) -> str:
+        audio = sr.AudioData(pcm, sample_rate=sample_rate, sample_width=sample_width)
+        try:
+            return self.recognizer.recognize_google(audio, language=STT_LANGUAGE)
+        except sr.UnknownValueError:
+            raise TranscriptionError("Speech could not be understood")
+        except sr.RequestError as e:
+            raise TranscriptionError(f"Speech service unavailable: {e}")
+
+
+class SphinxEngine:
+    """Offline CMU PocketSphinx via speech_recognition"""
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm: bytes, sample_rate: int, sample_width: int) -> str:
+        audio = sr.AudioData(pcm, sample_rate=sample_rate, sample_width=sample_width)
+        try:
+            return self.recognizer.recognize_sphinx(audio, language=STT_LANGUAGE)
+        except sr.UnknownValueError:
+            raise TranscriptionError("Speech could not be understood")
+        except sr.RequestError as e:
+            raise TranscriptionError(f"PocketSphinx unavailable: {e}")
+
+
+class VoskEngine:
+    """Offline Kaldi/Vosk recognizer; the model is loaded once per worker"""
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, pcm: bytes, sample_rate: int, sample_width: int) -> str:
+        if sample_width != 2:
+            raise TranscriptionError("Vosk requires 16-bit PCM")
+        recognizer = self.vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise TranscriptionError("Speech could not be understood")
+        return text
+
+
+ENGINES = {
+    "google": GoogleEngine,
+    "sphinx": SphinxEngine,
+    "vosk": VoskEngine,
+}
+
+# Per-worker engine instance (one per process, or per thread for network engines)
+_worker_state = threading.local()
+
+
+def _init_worker(engine_name: str):
+    """Executor initializer: build the engine once and reuse it for every job"""
+    _worker_state.engine = ENGINES[engine_name]()
+
+
+def _transcribe_in_worker(pcm: bytes, sample_rate: int, sample_width: int) -> str:
+    return _worker_state.engine.transcribe(pcm, sample_rate, sample_width)
+
+
+def _transcribe_shared_in_worker(name: str, nbytes: int, sample_rate: int, sample_width: int) -> str:
+    """Attach to decoded audio in shared memory instead of receiving a pickled copy"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return _worker_state.engine.transcribe(bytes(block.buf[:nbytes]), sample_rate, sample_width)
+    finally:
+        block.close()
+
+
+class TranscriptionPool:
+    """
+    Runs speech-to-text off the event loop.
+
+    Offline engines are CPU bound and run in a process pool so throughput
+    scales with cores; the Google engine is network bound and runs in a
+    thread pool. Each worker keeps its own recognizer instance.
+    """
+
+    def __init__(self, engine: str = STT_ENGINE, workers: Optional[int] = STT_WORKERS):
+        if engine not in ENGINES:
+            print(f"Warning: unknown STT_ENGINE '{engine}', using google")
+            engine = "google"
+        self.engine = engine
+        if not workers:
+            workers = (os.cpu_count() or 2) if engine in OFFLINE_ENGINES else 4
+        self.workers = workers
+        self.executor: Optional[Executor] = None
+        self._available: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether workers can build the engine; checked once, without starting the pool"""
+        if self._available is None:
+            missing = [m for m in ENGINE_MODULES[self.engine] if importlib.util.find_spec(m) is None]
+            if missing:
+                print(f"Warning: STT_ENGINE '{self.engine}' needs {', '.join(missing)}, using fallback transcripts")
+            self._available = not missing and (
+                os.path.isdir(VOSK_MODEL_PATH) if self.engine == "vosk" else SPEECH_RECOGNITION_AVAILABLE
+            )
+        return self._available
+
+    def _get_executor(self) -> Executor:
+        if self.executor is None:
+            pool_class = ProcessPoolExecutor if self.engine in OFFLINE_ENGINES else ThreadPoolExecutor
+            self.executor = pool_class(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.engine,)
+            )
+            print(f"🎙️ Transcription pool started ({self.engine}, {self.workers} workers)")
+        return self.executor
+
+    async def transcribe(self, pcm: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                         sample_width: int = DEFAULT_SAMPLE_WIDTH) -> str:
+        """Transcribe raw PCM audio"""
+        if not self.available:
+            # Fallback: simulate speech recognition
+            return FALLBACK_TRANSCRIPT
+
+        return await self._run(_transcribe_in_worker, pcm, sample_rate, sample_width)
+
+    async def _run(self, fn, *args) -> str:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenExecutor as e:
+            # A worker died or its initializer failed; start a fresh pool on the next call
+            if self.executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+            raise TranscriptionError(f"Transcription workers failed: {e}")
+
+    async def transcribe_audio(self, audio) -> str:
+        """Transcribe a DecodedAudio held in shared memory"""
+        if not self.available:
+            return FALLBACK_TRANSCRIPT
+
+        if self.engine in OFFLINE_ENGINES:
+            return await self._run(
+                _transcribe_shared_in_worker,
+                audio.name, audio.nbytes, audio.sample_rate, audio.sample_width
+            )
+        # Network engines run in threads, speech_recognition wants a bytes object
+        return await self._run(
+            _transcribe_in_worker, bytes(audio.pcm), audio.sample_rate, audio.sample_width
+        )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Initialize the pool
+transcription_pool = TranscriptionPool()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy audio helpers: voice activity detection, resampling and framing
+"""
+
+import sys
+sys.path.append('.')
+
+import numpy as np
+
+from services.streaming_session import EnergyVAD, VAD_FRAME_MS, VAD_SILENCE_MS
+from services.audio_decoding import resample
+from services.acoustic_features import frame_view
+
+RATE = 16000
+
+def _tone(seconds: float, freq: float = 440.0, rate: int = RATE, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+def _pcm(samples: np.ndarray) -> bytes:
+    return (samples * 32767).astype("<i2").tobytes()
+
+def _speech_clip() -> bytes:
+    silence = np.zeros(RATE, dtype=np.float32)
+    return _pcm(np.concatenate([silence, _tone(1.0), silence]))
+
+def _run_vad(chunks):
+    vad = EnergyVAD(RATE)
+    segments = []
+    for chunk in chunks:
+        segments.extend(vad.feed(chunk))
+    final = vad.flush()
+    if final:
+        segments.append(final)
+    return segments
+
+def test_vad_finds_one_segment():
+    """One second of tone between silences is one segment with preroll and trailing silence"""
+    segments = _run_vad([_speech_clip()])
+    assert len(segments) == 1
+    start, pcm = segments[0]
+    assert 0.7 <= start <= 1.0
+    seconds = len(pcm) / 2 / RATE
+    assert 1.0 + VAD_SILENCE_MS / 1000 <= seconds <= 1.0 + (VAD_SILENCE_MS + 300) / 1000
+
+def test_vad_ignores_silence_and_short_bursts():
+    assert _run_vad([_pcm(np.zeros(RATE * 2, dtype=np.float32))]) == []
+    blip = np.concatenate([np.zeros(RATE, dtype=np.float32), _tone(VAD_FRAME_MS * 2 / 1000),
+                           np.zeros(RATE, dtype=np.float32)])
+    assert _run_vad([_pcm(blip)]) == []
+
+def test_vad_odd_length_chunks():
+    """Chunks that split samples give the same segments as one whole buffer"""
+    clip = _speech_clip()
+    chunks = [clip[i:i + 333] for i in range(0, len(clip), 333)]
+    assert _run_vad(chunks) == _run_vad([clip])
+
+def test_resample_same_rate_is_a_no_op():
+    samples = _tone(0.1)
+    assert resample(samples, RATE, RATE) is samples
+    assert resample(np.empty(0, dtype=np.float32), 44100).size == 0
+
+def test_resample_length_and_pitch():
+    """A 440 Hz tone keeps its frequency at the new rate"""
+    for rate_in in (8000, 22050, 44100, 48000):
+        out = resample(_tone(1.0, rate=rate_in), rate_in)
+        assert out.dtype == np.float32
+        assert out.size == RATE
+        spectrum = np.abs(np.fft.rfft(out * np.hanning(out.size)))
+        assert abs(np.argmax(spectrum) * RATE / out.size - 440.0) <= 2.0
+        # Away from the edges the waveform matches the tone generated at 16 kHz
+        assert np.max(np.abs(out[200:-200] - _tone(1.0)[200:-200])) < 0.02
+
+def test_resample_removes_content_above_nyquist():
+    """Downsampling filters out a tone the new rate cannot represent"""
+    out = resample(_tone(1.0, freq=12000.0, rate=48000), 48000)
+    assert np.sqrt(np.mean(out[200:-200] ** 2)) < 0.01
+
+def test_frame_view():
+    samples = np.arange(10, dtype=np.int16)
+    frames = frame_view(samples, 4, 2)
+    assert frames.shape == (4, 4)
+    assert frames[1].tolist() == [2, 3, 4, 5]
+    assert frames[-1].tolist() == [6, 7, 8, 9]
+    assert np.shares_memory(frames, samples)
+    assert not frames.flags.writeable
+
+def test_frame_view_short_input():
+    frames = frame_view(np.arange(3, dtype=np.int16), 4, 2)
+    assert frames.shape == (0, 4)
+    assert frame_view(np.arange(4, dtype=np.int16), 4, 2).shape == (1, 4)
+
+if __name__ == "__main__":
+    for test in (test_vad_finds_one_segment, test_vad_ignores_silence_and_short_bursts, test_vad_odd_length_chunks,
+                 test_resample_same_rate_is_a_no_op, test_resample_length_and_pitch,
+                 test_resample_removes_content_above_nyquist, test_frame_view, test_frame_view_short_input):
+        test()
+        print(f"✓ {test.__name__}")
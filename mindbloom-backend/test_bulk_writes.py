@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk write item validation and natural-key deduplication
+"""
+
+import sys
+sys.path.append('.')
+
+from database import Collections
+from services.bulk_writes import prepare_items
+
+def test_invalid_items_are_reported():
+    items = [
+        "not an object",
+        {"title": "  "},
+        {"title": "Trip", "tags": "beach"},
+        {"title": "Trip", "created_at": "2024-05-01T10:00:00"},
+    ]
+    docs, outcomes = prepare_items(Collections.JOURNALS, items)
+    assert [index for index, _, _ in docs] == [3]
+    assert outcomes == [
+        {"index": 0, "status": "invalid", "error": "item must be an object"},
+        {"index": 1, "status": "invalid", "error": "title is required"},
+        {"index": 2, "status": "invalid", "error": "tags must be a list"},
+    ]
+
+def test_calendar_checks():
+    items = [
+        {"title": "Doctor", "date": "2024-5-1"},
+        {"title": "Doctor", "date": "2024-05-01", "start_time": "25:00"},
+        {"title": "Doctor", "date": "2024-05-01", "start_time": "09:30", "end_time": "10:00"},
+    ]
+    docs, outcomes = prepare_items(Collections.CALENDAR, items)
+    assert [o["error"] for o in outcomes] == ["date must be YYYY-MM-DD", "start_time must be HH:MM"]
+    assert len(docs) == 1 and docs[0][1]["start_time"] == "09:30"
+
+def test_repeated_natural_key_in_batch():
+    """The second item with the same user_id, title and created_at is a duplicate"""
+    item = {"user_id": "u1", "title": "Picnic", "created_at": "2024-05-01T10:00:00"}
+    docs, outcomes = prepare_items(Collections.MEMORIES, [item, dict(item), {**item, "title": "Lunch"}])
+    assert [index for index, _, keyed in docs if keyed] == [0, 2]
+    assert outcomes == [{"index": 1, "status": "duplicate", "error": "same user_id, title, created_at as item 0"}]
+
+def test_items_without_created_at_are_unkeyed():
+    """Journals and memories without a client created_at are always inserted"""
+    item = {"user_id": "u1", "title": "Picnic"}
+    docs, outcomes = prepare_items(Collections.MEMORIES, [item, dict(item)])
+    assert outcomes == []
+    assert [keyed for _, _, keyed in docs] == [False, False]
+
+def test_calendar_is_keyed_on_date():
+    item = {"user_id": "u1", "title": "Doctor", "date": "2024-05-01"}
+    docs, outcomes = prepare_items(Collections.CALENDAR, [item, dict(item)])
+    assert [keyed for _, _, keyed in docs] == [True]
+    assert outcomes[0]["status"] == "duplicate"
+
+def test_client_ids_are_ignored():
+    docs, _ = prepare_items(Collections.JOURNALS, [{"id": "client-id", "title": "Trip"}])
+    _, doc, _ = docs[0]
+    assert doc["id"] != "client-id"
+    assert doc["title"] == "Trip" and doc["created_at"]
+
+if __name__ == "__main__":
+    for test in (test_invalid_items_are_reported, test_calendar_checks, test_repeated_natural_key_in_batch,
+                 test_items_without_created_at_are_unkeyed, test_calendar_is_keyed_on_date,
+                 test_client_ids_are_ignored):
+        test()
+        print(f"✓ {test.__name__}")
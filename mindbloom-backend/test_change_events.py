@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for turning change stream documents into cache invalidation events
+"""
+
+import sys
+sys.path.append('.')
+
+from database import Collections
+from services.change_events import (
+    _event_from_change, OP_INSERT, OP_UPDATE, OP_DELETE, OP_DROP
+)
+
+def _change(op: str, coll: str = Collections.MEMORIES, **extra):
+    return {"operationType": op, "ns": {"db": "mindbloom", "coll": coll}, **extra}
+
+def test_insert_carries_lookup_keys():
+    event = _event_from_change(_change(
+        "insert", documentKey={"_id": "m1"}, clusterTime=42,
+        fullDocument={"id": "abc", "user_id": "u1", "patient_id": None, "title": "ignored"}
+    ))
+    assert event.entity == "memory"
+    assert event.operation == OP_INSERT
+    assert event.document_id == "m1"
+    # Only non-null lookup fields are copied
+    assert event.keys == {"id": "abc", "user_id": "u1"}
+    assert event.cluster_time == 42
+
+def test_update_and_replace_are_updates():
+    for op in ("update", "replace"):
+        event = _event_from_change(_change(op, Collections.INTERVIEW_CONTEXTS, documentKey={"_id": "p1"}))
+        assert event.entity == "interview_context"
+        assert event.operation == OP_UPDATE
+        assert event.document_id == "p1"
+
+def test_update_without_full_document():
+    """An updateLookup finds nothing when the document was deleted meanwhile"""
+    event = _event_from_change(_change("update", documentKey={"_id": "m1"}, fullDocument=None))
+    assert event.keys == {}
+
+def test_delete():
+    event = _event_from_change(_change("delete", Collections.PATIENTS, documentKey={"_id": "p1"}))
+    assert (event.entity, event.operation, event.document_id) == ("patient", OP_DELETE, "p1")
+
+def test_drop_and_rename_drop_everything():
+    for op in ("drop", "rename"):
+        event = _event_from_change(_change(op, Collections.JOURNALS))
+        assert event.operation == OP_DROP
+        assert event.document_id is None
+
+def test_ignored_changes():
+    assert _event_from_change(_change("insert", "some_other_collection")) is None
+    assert _event_from_change({"operationType": "insert"}) is None
+    assert _event_from_change(_change("dropDatabase")) is None
+    assert _event_from_change(_change("createIndexes")) is None
+
+if __name__ == "__main__":
+    for test in (test_insert_carries_lookup_keys, test_update_and_replace_are_updates,
+                 test_update_without_full_document, test_delete, test_drop_and_rename_drop_everything,
+                 test_ignored_changes):
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the local linguistic feature engine
+"""
+
+import sys
+sys.path.append('.')
+
+from services.linguistic_features import (
+    extract_linguistic_features, extract_linguistic_features_batch, linguistic_assessment
+)
+
+SAMPLE = "Um, I went to the the store... you know, to get some stuff. It was nice."
+
+def test_counts_on_a_known_answer():
+    features = extract_linguistic_features(SAMPLE)
+    # 17 tokens, the ellipsis is a hesitation mark rather than a word
+    assert features["word_count"] == 16
+    assert features["utterance_count"] == 3
+    assert features["mean_utterance_length"] == 5.33
+    # 14 distinct words; "the the" is the only immediate repetition
+    assert features["type_token_ratio"] == 0.875
+    assert features["repetition_rate"] == 0.062
+    assert features["filler_rate"] == 0.062  # um
+    assert features["vague_word_rate"] == 0.062  # stuff
+    # I, you, it against store and stuff
+    assert features["pronoun_noun_ratio"] == 1.5
+    # The ellipsis plus "you know"
+    assert features["hesitation_markers"] == 2
+
+def test_cut_off_words_and_hyphens():
+    features = extract_linguistic_features("I- I went to the well-known bakery")
+    assert features["hesitation_markers"] == 1
+    assert features["word_count"] == 7
+
+def test_empty_transcript():
+    features = extract_linguistic_features("")
+    assert features["word_count"] == 0
+    assert features["type_token_ratio"] == 0.0
+    assert features["mattr"] == 0.0
+    assert features["pronoun_noun_ratio"] is None
+
+def test_batch_matches_single_transcripts():
+    """Per-document sums must not leak between transcripts sharing one token array"""
+    transcripts = [SAMPLE, "", "the the", "We walked along the river and fed the ducks. Lovely day."]
+    batch = extract_linguistic_features_batch(transcripts)
+    assert batch == [extract_linguistic_features(text) for text in transcripts]
+    # "the" ends the first document and starts none of the others; no repetition across the boundary
+    assert batch[2]["repetition_rate"] == 0.5
+
+def test_mattr_uses_moving_windows():
+    """Long answers are judged on windows, so repeating an answer keeps its MATTR"""
+    answer = " ".join(f"word{chr(97 + i % 26)}" for i in range(26))
+    once = extract_linguistic_features(answer)
+    twice = extract_linguistic_features(answer + " " + answer)
+    assert once["mattr"] == twice["mattr"] == 1.0
+    assert twice["type_token_ratio"] == 0.5
+
+def test_assessment_confidence():
+    short = linguistic_assessment(extract_linguistic_features(SAMPLE))
+    assert short["confident"] is False
+    assert 0.0 <= short["word_finding"] <= 10.0
+    assert short["word_finding_difficulty"] in ("low", "moderate", "high")
+
+if __name__ == "__main__":
+    for test in (test_counts_on_a_known_answer, test_cut_off_words_and_hyphens, test_empty_transcript,
+                 test_batch_matches_single_transcripts, test_mattr_uses_moving_windows, test_assessment_confidence):
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for HTTP range parsing and validator comparison in media streaming
+"""
+
+import sys
+sys.path.append('.')
+
+from services.media_streaming import (
+    parse_range_header, _coalesce_ranges, _etag_matches, _etag_matches_strong, MAX_RANGES
+)
+
+def test_single_ranges():
+    """Closed, open-ended and suffix ranges"""
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+    assert parse_range_header("bytes=500-", 1000) == [(500, 999)]
+    assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+    # Ends past the file are clamped, suffixes longer than the file cover it all
+    assert parse_range_header("bytes=900-5000", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=-5000", 1000) == [(0, 999)]
+
+def test_unsatisfiable_ranges():
+    """Ranges outside the file are dropped; none left means 416"""
+    assert parse_range_header("bytes=1000-1100", 1000) == []
+    assert parse_range_header("bytes=50-10", 1000) == []
+    assert parse_range_header("bytes=-0", 1000) == []
+
+def test_malformed_ranges():
+    """Malformed headers serve the full file"""
+    assert parse_range_header("items=0-10", 1000) is None
+    assert parse_range_header("bytes=", 1000) is None
+    assert parse_range_header("bytes=abc-10", 1000) is None
+    assert parse_range_header("bytes=10", 1000) is None
+    too_many = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+    assert parse_range_header(f"bytes={too_many}", 1000) is None
+
+def test_multiple_ranges_are_coalesced():
+    """Overlapping and adjacent ranges merge, disjoint ones stay sorted"""
+    assert parse_range_header("bytes=500-599, 0-99, 50-149", 1000) == [(0, 149), (500, 599)]
+    assert parse_range_header("bytes=0-99,100-199", 1000) == [(0, 199)]
+
+def test_coalesce_ranges():
+    assert _coalesce_ranges([]) == []
+    assert _coalesce_ranges([(10, 20), (0, 5)]) == [(0, 5), (10, 20)]
+    assert _coalesce_ranges([(0, 5), (6, 9)]) == [(0, 9)]
+    assert _coalesce_ranges([(0, 50), (10, 20)]) == [(0, 50)]
+
+def test_weak_comparison():
+    """If-None-Match ignores the W/ prefix on either side"""
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('W/"abc"', '"abc"')
+    assert _etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abd"', '"abc"')
+
+def test_strong_comparison():
+    """If-Range never matches a weak validator"""
+    assert _etag_matches_strong('"abc"', '"abc"')
+    assert _etag_matches_strong(' "abc" ', '"abc"')
+    assert not _etag_matches_strong('W/"abc"', '"abc"')
+    assert not _etag_matches_strong('"abc"', 'W/"abc"')
+    assert not _etag_matches_strong('W/"abc"', 'W/"abc"')
+    assert not _etag_matches_strong('"abd"', '"abc"')
+
+if __name__ == "__main__":
+    for test in (test_single_ranges, test_unsatisfiable_ranges, test_malformed_ranges,
+                 test_multiple_ranges_are_coalesced, test_coalesce_ranges,
+                 test_weak_comparison, test_strong_comparison):
+        test()
+        print(f"✓ {test.__name__}")
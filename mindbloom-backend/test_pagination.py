@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination cursors and filters
+"""
+
+import sys
+sys.path.append('.')
+
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from pagination import encode_cursor, decode_cursor, keyset_filter
+
+def test_cursor_round_trip():
+    """Dates, ObjectIds and plain values decode to the same values and types"""
+    doc_id = ObjectId()
+    created = datetime(2024, 5, 17, 9, 30, 15, 123000)
+    assert decode_cursor(encode_cursor({"_id": doc_id, "created_at": created})) == (created, doc_id)
+    assert decode_cursor(encode_cursor({"_id": "abc", "created_at": "2024-05-17T09:30:15"})) == \
+        ("2024-05-17T09:30:15", "abc")
+    assert decode_cursor(encode_cursor({"_id": 7, "timestamp": 1.5}, "timestamp")) == (1.5, 7)
+    # A missing sort field is carried as null
+    assert decode_cursor(encode_cursor({"_id": 7})) == (None, 7)
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"_id": ObjectId(), "created_at": datetime(2024, 1, 1)})
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+def test_invalid_cursor():
+    for cursor in ("not-a-cursor", "e30", encode_cursor({"_id": 1})[:-3]):
+        try:
+            decode_cursor(cursor)
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"{cursor!r} was accepted")
+
+def test_keyset_filter_without_cursor():
+    assert keyset_filter(None) == {}
+    assert keyset_filter("") == {}
+
+def test_keyset_filter_descending_date():
+    """After a date come the lower BSON types, which sort after dates in descending order"""
+    doc_id = ObjectId()
+    created = datetime(2024, 5, 17)
+    query = keyset_filter(encode_cursor({"_id": doc_id, "created_at": created}))
+    assert query == {"$or": [
+        {"created_at": {"$lt": created}},
+        {"created_at": created, "_id": {"$lt": doc_id}},
+        {"created_at": None},
+        {"created_at": {"$type": ["number", "string", "objectId", "bool"]}},
+    ]}
+
+def test_keyset_filter_ascending_string():
+    """Ascending from a string continues into the higher BSON types"""
+    query = keyset_filter(encode_cursor({"_id": 3, "timestamp": "b"}, "timestamp"), "timestamp", descending=False)
+    assert query == {"$or": [
+        {"timestamp": {"$gt": "b"}},
+        {"timestamp": "b", "_id": {"$gt": 3}},
+        {"timestamp": {"$type": ["objectId", "bool", "date"]}},
+    ]}
+
+def test_keyset_filter_descending_null():
+    """Null sorts last in descending order, so only ties on _id remain"""
+    query = keyset_filter(encode_cursor({"_id": 3}))
+    assert query == {"$or": [
+        {"created_at": {"$lt": None}},
+        {"created_at": None, "_id": {"$lt": 3}},
+    ]}
+
+if __name__ == "__main__":
+    for test in (test_cursor_round_trip, test_cursor_is_url_safe, test_invalid_cursor,
+                 test_keyset_filter_without_cursor, test_keyset_filter_descending_date,
+                 test_keyset_filter_ascending_string, test_keyset_filter_descending_null):
+        test()
+        print(f"✓ {test.__name__}")
@@ -11,6 +11,7 @@ import {
   UserIcon,
   ArrowPathIcon
 } from '@heroicons/react/24/outline';
+import { collectPages, PAGE_SIZE } from '../config';
 
 // Brand Colors
 const BRAND_COLORS = {
@@ -62,12 +63,13 @@ const Calendar = ({ selectedPatient }) => {
       try {
         console.log(`Loading events for patient: ${selectedPatient}`);
         // Load from backend API
-        const response = await fetch(`http://localhost:8000/api/calendar?patient_id=${selectedPatient}`);
+        const eventsUrl = `http://localhost:8000/api/calendar?patient_id=${selectedPatient}&limit=${PAGE_SIZE}`;
+        const response = await fetch(eventsUrl);
         
         console.log(`Response status: ${response.status}`);
         
         if (response.ok) {
-          const backendEvents = await response.json();
+          const backendEvents = await collectPages(eventsUrl, await response.json());
           console.log('Received events:', backendEvents);
           
           // Transform the data to match the frontend structure
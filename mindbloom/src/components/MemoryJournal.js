@@ -14,7 +14,7 @@ import {
   FunnelIcon
 } from '@heroicons/react/24/outline';
 import MemoryVisualization from './MemoryVisualization';
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, collectPages, PAGE_SIZE } from '../config';
 
 // Brand Colors
 const BRAND_COLORS = {
@@ -135,7 +135,8 @@ const MemoryJournal = ({ selectedPatient }) => {
 
     try {
       console.log(`Fetching memories for patient: ${selectedPatient}`);
-      const response = await fetch(`${API_BASE_URL}/api/memories?patient_id=${selectedPatient}`);
+      const memoriesUrl = `${API_BASE_URL}/api/memories?patient_id=${selectedPatient}&limit=${PAGE_SIZE}`;
+      const response = await fetch(memoriesUrl);
       
       console.log(`Response status: ${response.status}`);
       
@@ -145,7 +146,7 @@ const MemoryJournal = ({ selectedPatient }) => {
         throw new Error(`HTTP error! status: ${response.status}, message: ${errorText}`);
       }
       
-      const data = await response.json();
+      const data = await collectPages(memoriesUrl, await response.json());
       console.log('Received data:', data);
       
       // Transform the data to match the frontend structure
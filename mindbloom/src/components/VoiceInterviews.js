@@ -315,6 +315,9 @@ const VoiceInterviews = ({ selectedPatient }) => {
       formData.append('audio_file', audioBlob, 'recording.webm');
       formData.append('question', interviewQuestions[currentQuestion]);
       formData.append('patient_id', selectedPatient);
+      if (transcription) {
+        formData.append('transcription', transcription);
+      }
 
       const response = await fetch(`${API_BASE_URL}/api/interview-analysis/analyze-voice-response`, {
         method: 'POST',
@@ -22,4 +22,24 @@ export const getApiUrl = (endpoint) => {
   return `${API_BASE_URL}${endpoint}`;
 };
 
+// Page size requested from list endpoints; without limit or cursor they return a bare list
+export const PAGE_SIZE = 200;
+
+// Collect every item of a paginated list endpoint ({ items, next_cursor })
+export const collectPages = async (url, firstPage) => {
+  const items = [...firstPage.items];
+  let cursor = firstPage.next_cursor;
+  while (cursor) {
+    const separator = url.includes('?') ? '&' : '?';
+    const response = await fetch(`${url}${separator}cursor=${encodeURIComponent(cursor)}`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const page = await response.json();
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  }
+  return items;
+};
+
 export default config[environment]; 
\ No newline at end of file